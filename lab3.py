@@ -3,6 +3,108 @@ import cv2
 import numpy as np
 from PIL import Image
 import matplotlib.pyplot as plt
+import os
+import time
+import threading
+import queue
+import tempfile
+import json
+import tracemalloc
+from contextlib import contextmanager
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+def process_in_strips(image, halo, func, workers=None, align=1, min_rows=64):
+    h = image.shape[0]
+    workers = workers or os.cpu_count() or 1
+    n_strips = max(1, min(workers, h // max(min_rows, 1)))
+    if n_strips == 1:
+        return func(image)
+
+    halo = -(-halo // align) * align
+    bounds = [min(h, (h * i // n_strips) // align * align) for i in range(n_strips)] + [h]
+    out = np.empty_like(image)
+
+    def run(i):
+        y0, y1 = bounds[i], bounds[i + 1]
+        if y0 >= y1:
+            return
+        a0, a1 = max(0, y0 - halo), min(h, y1 + halo)
+        res = func(image[a0:a1])
+        out[y0:y1] = res[y0 - a0:y1 - a0]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, range(n_strips)))
+    return out
+
+def fast_median_filter(image, ksize, workers=None):
+    # Для 8-битных изображений и ksize > 5 OpenCV использует гистограммный
+    # медианный фильтр с постоянным временем (Perreault–Hébert), поэтому
+    # полосы обрабатываются им же, а выигрыш даёт параллельность по ядрам.
+    return process_in_strips(image, ksize // 2,
+                             lambda strip: cv2.medianBlur(strip, ksize),
+                             workers)
+
+def _bilateral_grid(image, d, sigma_color, sigma_space, ds, sampling):
+    h, w = image.shape[:2]
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    sw, sh = -(-w // ds), -(-h // ds)
+    small = cv2.resize(image, (sw, sh), interpolation=cv2.INTER_AREA) if ds > 1 else image
+
+    if channels == 1:
+        guide = image.astype(np.float32)
+        guide_small = small.astype(np.float32)
+    else:
+        guide = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        guide_small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    values = small.astype(np.float32).reshape(sh, sw, channels)
+
+    # cv2.bilateralFilter считает цветовое расстояние как сумму модулей по каналам
+    sigma = max(sigma_color / channels, 1e-3)
+    radius = max(1, int(round((d // 2) / ds)))
+    kernel = cv2.getGaussianKernel(2 * radius + 1, sigma_space / ds).astype(np.float32)
+
+    n_levels = int(np.ceil(255.0 / (sigma * sampling))) + 1
+    levels = np.linspace(0, 255, n_levels, dtype=np.float32)
+    step = float(levels[1] - levels[0])
+
+    out = np.zeros((h, w, channels), np.float32)
+    hat = np.empty((h, w), np.float32)
+    stack = np.empty((sh, sw, channels + 1), np.float32)
+    for level in levels:
+        weight = cv2.subtract(guide_small, float(level))
+        cv2.multiply(weight, weight, dst=weight, scale=-1.0 / (2 * sigma * sigma))
+        cv2.exp(weight, dst=weight)
+        stack[..., :channels] = values * weight[..., None]
+        stack[..., channels] = weight
+
+        blurred = cv2.sepFilter2D(stack, -1, kernel, kernel, borderType=cv2.BORDER_REFLECT_101)
+        level_img = blurred[..., :channels] / (blurred[..., channels:] + 1e-6)
+        if ds > 1:
+            level_img = cv2.resize(level_img, (w, h), interpolation=cv2.INTER_LINEAR)
+        level_img = level_img.reshape(h, w, channels)
+
+        cv2.absdiff(guide, float(level), dst=hat)
+        cv2.addWeighted(hat, -1.0 / step, hat, 0, 1.0, dst=hat)
+        cv2.max(hat, 0, dst=hat)
+        out += level_img * hat[..., None]
+
+    result = np.clip(out + 0.5, 0, 255).astype(np.uint8)
+    return result[..., 0] if image.ndim == 2 else result
+
+def fast_bilateral_filter(image, d, sigma_color=75, sigma_space=75, workers=None, sampling=1.5):
+    ds = d // 6
+    if ds < 2:
+        # на малых окнах точный фильтр быстрее сетки
+        return process_in_strips(
+            image, d // 2,
+            lambda strip: cv2.bilateralFilter(strip, d=d, sigmaColor=sigma_color, sigmaSpace=sigma_space),
+            workers)
+    return process_in_strips(
+        image, d // 2 + 2 * ds,
+        lambda strip: _bilateral_grid(strip, d, sigma_color, sigma_space, ds, sampling),
+        workers, align=ds)
 
 def apply_smoothing(image, method, ksize):
     if method == "Усредняющий фильтр (Mean)":
@@ -11,10 +113,524 @@ def apply_smoothing(image, method, ksize):
         return cv2.GaussianBlur(image, (ksize, ksize), 0)
     elif method == "Медианный фильтр (Median)":
         return cv2.medianBlur(image, ksize)
+    elif method == "Медианный фильтр (быстрый, многопоточный)":
+        return fast_median_filter(image, ksize)
     elif method == "Билатеральный фильтр":
         return cv2.bilateralFilter(image, d=ksize, sigmaColor=75, sigmaSpace=75)
+    elif method == "Билатеральный фильтр (быстрый, приближённый)":
+        return fast_bilateral_filter(image, ksize, 75, 75)
     return image
 
+def benchmark_smoothing(image, ksizes, repeats=3):
+    pairs = [
+        ("Медианный", lambda img, k: cv2.medianBlur(img, k), fast_median_filter),
+        ("Билатеральный",
+         lambda img, k: cv2.bilateralFilter(img, d=k, sigmaColor=75, sigmaSpace=75),
+         lambda img, k: fast_bilateral_filter(img, k, 75, 75)),
+    ]
+
+    def best_time(func, k):
+        best = float("inf")
+        result = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = func(image, k)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000, result
+
+    rows = []
+    for name, exact, fast in pairs:
+        for k in ksizes:
+            exact_ms, exact_img = best_time(exact, k)
+            fast_ms, fast_img = best_time(fast, k)
+            diff = np.abs(exact_img.astype(np.int16) - fast_img.astype(np.int16))
+            rows.append({
+                "Фильтр": name,
+                "ksize": k,
+                "Точный, мс": round(exact_ms, 2),
+                "Быстрый, мс": round(fast_ms, 2),
+                "Ускорение": round(exact_ms / fast_ms, 2) if fast_ms > 0 else None,
+                "PSNR, дБ": round(cv2.PSNR(exact_img, fast_img), 2) if diff.any() else float("inf"),
+                "Макс. отклонение": int(diff.max()),
+            })
+    return rows
+
+def show_benchmark(image):
+    with st.expander("⏱ Бенчмарк быстрых фильтров"):
+        ksizes = st.multiselect("Размеры окна", list(range(3, 32, 2)), default=[5, 9, 15, 21, 31])
+        repeats = st.number_input("Повторов на замер", 1, 10, 3)
+        if st.button("Запустить бенчмарк") and ksizes:
+            with st.spinner("Измерение..."):
+                rows = benchmark_smoothing(image, sorted(ksizes), int(repeats))
+            st.dataframe(rows, use_container_width=True)
+            for name in ("Медианный", "Билатеральный"):
+                subset = [r for r in rows if r["Фильтр"] == name]
+                st.write(f"**{name}: время (мс) от размера окна**")
+                st.line_chart({
+                    "ksize": [r["ksize"] for r in subset],
+                    "Точный": [r["Точный, мс"] for r in subset],
+                    "Быстрый": [r["Быстрый, мс"] for r in subset],
+                }, x="ksize", y=["Точный", "Быстрый"])
+
+EQUALIZATION_SPACES = {
+    "Оттенки серого": None,
+    "Цветное (LAB, канал L)": (cv2.COLOR_BGR2LAB, cv2.COLOR_LAB2BGR, 0),
+    "Цветное (HSV, канал V)": (cv2.COLOR_BGR2HSV, cv2.COLOR_HSV2BGR, 2),
+}
+
+_clahe_local = threading.local()
+
+def get_clahe(clip_limit, tile_grid):
+    # объекты CLAHE хранят внутренние буферы, поэтому кэш свой у каждого потока
+    cache = getattr(_clahe_local, "cache", None)
+    if cache is None:
+        cache = _clahe_local.cache = {}
+    key = (float(clip_limit), (int(tile_grid[0]), int(tile_grid[1])))
+    clahe = cache.get(key)
+    if clahe is None:
+        clahe = cache[key] = cv2.createCLAHE(clipLimit=key[0], tileGridSize=key[1])
+    return clahe
+
+def tiled_clahe(channel, clip_limit, tile_grid, workers=None):
+    tiles_x, tiles_y = tile_grid
+    h, w = channel.shape
+    workers = min(workers or os.cpu_count() or 1, tiles_y)
+    if workers <= 1:
+        return get_clahe(clip_limit, tile_grid).apply(channel)
+
+    # то же дополнение до кратного сетке размера, что делает сам OpenCV
+    ext = channel
+    if h % tiles_y or w % tiles_x:
+        ext = cv2.copyMakeBorder(channel, 0, tiles_y - h % tiles_y, 0, tiles_x - w % tiles_x,
+                                 cv2.BORDER_REFLECT_101)
+    tile_h = ext.shape[0] // tiles_y
+    bounds = [tiles_y * i // workers for i in range(workers + 1)]
+    out = np.empty_like(ext)
+
+    def run(i):
+        # полоса плиток берётся с одной соседней плиткой сверху и снизу: гистограммы и LUT на стыках
+        # те же, что при обработке целиком; веса интерполяции OpenCV считает в float от начала полосы,
+        # поэтому отдельные пиксели у стыков могут отличаться на ±1
+        a, b = bounds[i], bounds[i + 1]
+        ext_a, ext_b = max(0, a - 1), min(tiles_y, b + 1)
+        clahe = get_clahe(clip_limit, (tiles_x, ext_b - ext_a))
+        res = clahe.apply(ext[ext_a * tile_h:ext_b * tile_h])
+        out[a * tile_h:b * tile_h] = res[(a - ext_a) * tile_h:(b - ext_a) * tile_h]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, range(workers)))
+    return out[:h, :w]
+
+def equalize_channel(channel, method, clip_limit=3.0, tile_grid=(8, 8), workers=1):
+    if method == "Эквализация (equalizeHist)":
+        return cv2.equalizeHist(channel)
+    if workers > 1 and channel.size >= 4_000_000:
+        return tiled_clahe(channel, clip_limit, tile_grid, workers)
+    return get_clahe(clip_limit, tile_grid).apply(channel)
+
+def equalize_image(img_bgr, method, space="Оттенки серого", clip_limit=3.0, tile_grid=(8, 8), workers=1):
+    conversion = EQUALIZATION_SPACES[space]
+    if conversion is None:
+        gray = img_bgr if img_bgr.ndim == 2 else cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+        return equalize_channel(gray, method, clip_limit, tile_grid, workers)
+
+    to_space, from_space, index = conversion
+    converted = cv2.cvtColor(img_bgr, to_space)
+    converted[..., index] = equalize_channel(np.ascontiguousarray(converted[..., index]),
+                                             method, clip_limit, tile_grid, workers)
+    return cv2.cvtColor(converted, from_space)
+
+def equalize_batch(images, method, space="Оттенки серого", clip_limit=3.0, tile_grid=(8, 8), workers=None):
+    workers = workers or os.cpu_count() or 1
+    if len(images) >= workers:
+        # независимые кадры выгоднее раздать потокам целиком
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(
+                lambda img: equalize_image(img, method, space, clip_limit, tile_grid), images))
+    return [equalize_image(img, method, space, clip_limit, tile_grid, workers) for img in images]
+
+def show_batch_equalization(img_bgr, method, space, clip_limit, tile_grid):
+    with st.expander("🎞 Пакетная обработка 4K-кадров"):
+        n_frames = st.slider("Количество кадров", 1, 32, 8)
+        if st.button("Измерить скорость"):
+            frame = cv2.resize(img_bgr, (3840, 2160), interpolation=cv2.INTER_LINEAR)
+            frames = [frame] * n_frames
+            equalize_batch(frames[:1], method, space, clip_limit, tile_grid)
+            start = time.perf_counter()
+            equalize_batch(frames, method, space, clip_limit, tile_grid)
+            elapsed = time.perf_counter() - start
+            st.write(f"**{n_frames} кадров 3840×2160:** {elapsed * 1000:.1f} мс, "
+                     f"{n_frames / elapsed:.1f} кадр/с на {os.cpu_count()} ядрах")
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+def iter_frames(source):
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(source, name), cv2.IMREAD_COLOR)
+                if frame is not None:
+                    yield frame
+        return
+
+    capture = cv2.VideoCapture(source)
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+def source_fps(source, default=25.0):
+    if os.path.isdir(source):
+        return default
+    capture = cv2.VideoCapture(source)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    capture.release()
+    return fps if fps and fps > 0 else default
+
+class TemporalEqualizer:
+    def __init__(self, space="Оттенки серого", alpha=0.2):
+        self.space = space
+        self.alpha = alpha
+        self.lut = None
+
+    def _frame_lut(self, channel):
+        hist = cv2.calcHist([channel], [0], None, [256], [0, 256]).ravel()
+        cdf = hist.cumsum()
+        cdf_min = cdf[np.flatnonzero(hist)[0]]
+        total = cdf[-1]
+        if total == cdf_min:
+            return np.arange(256, dtype=np.float32)
+        return ((cdf - cdf_min) * (255.0 / (total - cdf_min))).clip(0, 255).astype(np.float32)
+
+    def analyze(self, frame):
+        # не зависит от соседних кадров и выполняется в пуле потоков: перевод в пространство и LUT кадра
+        conversion = EQUALIZATION_SPACES[self.space]
+        if conversion is None:
+            converted = None
+            channel = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        else:
+            converted = cv2.cvtColor(frame, conversion[0])
+            channel = np.ascontiguousarray(converted[..., conversion[2]])
+        return converted, channel, self._frame_lut(channel)
+
+    def apply(self, analyzed):
+        # выполняется последовательно в порядке кадров
+        converted, channel, lut = analyzed
+        # экспоненциальное сглаживание LUT между кадрами убирает мерцание яркости
+        self.lut = lut if self.lut is None else (1 - self.alpha) * self.lut + self.alpha * lut
+        result = cv2.LUT(channel, (self.lut + 0.5).astype(np.uint8))
+
+        if converted is None:
+            return result
+        conversion = EQUALIZATION_SPACES[self.space]
+        converted[..., conversion[2]] = result
+        return cv2.cvtColor(converted, conversion[1])
+
+@dataclass
+class StreamStats:
+    frames_read: int = 0
+    frames_written: int = 0
+    frames_dropped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def fps(self):
+        return self.frames_written / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def drop_rate(self):
+        return self.frames_dropped / self.frames_read if self.frames_read else 0.0
+
+def process_stream(frames, process, sink, workers=None, queue_size=8, drop_frames=False, post=None):
+    workers = workers or os.cpu_count() or 1
+    stats = StreamStats()
+    frame_queue = queue.Queue(maxsize=queue_size)
+    done = object()
+    stop = threading.Event()
+    failure = []
+
+    def produce():
+        try:
+            for frame in frames:
+                if stop.is_set():
+                    break
+                stats.frames_read += 1
+                if drop_frames:
+                    try:
+                        frame_queue.put_nowait(frame)
+                    except queue.Full:
+                        stats.frames_dropped += 1
+                else:
+                    frame_queue.put(frame)
+        except Exception as e:
+            # ошибка чтения (например, повреждённый кадр) передаётся в основной поток
+            failure.append(e)
+        finally:
+            frame_queue.put(done)
+
+    def emit(future):
+        result = future.result()
+        if post is not None:
+            result = post(result)
+        sink(result)
+        stats.frames_written += 1
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    pending = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                frame = frame_queue.get()
+                if frame is done:
+                    break
+                pending.append(pool.submit(process, frame))
+                # порядок кадров сохраняется: выдаём только самый старый результат
+                while len(pending) > workers:
+                    emit(pending.popleft())
+            while pending:
+                emit(pending.popleft())
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                frame_queue.get_nowait()
+            except queue.Empty:
+                producer.join(0.01)
+    if failure:
+        raise failure[0]
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+class VideoSink:
+    # H.264 (avc1) браузер воспроизводит прямо в st.video; mp4v (MPEG-4 Part 2) — запасной вариант
+    # для сборок OpenCV без кодировщика H.264, такое видео можно только скачать
+    def __init__(self, path, fps, fourccs=("avc1", "mp4v")):
+        self.path = path
+        self.fps = fps
+        self.fourccs = fourccs
+        self.fourcc = None
+        self.writer = None
+
+    def _open(self, size):
+        for fourcc in self.fourccs:
+            writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*fourcc), self.fps, size)
+            if writer.isOpened():
+                self.fourcc = fourcc
+                return writer
+            writer.release()
+        raise ValueError(f"не удалось открыть запись видео ни с одним из кодеков: {', '.join(self.fourccs)}")
+
+    @property
+    def browser_playable(self):
+        return self.fourcc == "avc1"
+
+    def __call__(self, frame):
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        if self.writer is None:
+            h, w = frame.shape[:2]
+            self.writer = self._open((w, h))
+        self.writer.write(frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+
+def uploaded_video_path(uploaded_video):
+    # загруженное видео копируется во временный файл один раз на загрузку; файл прежней загрузки удаляется
+    cached = st.session_state.get("stream_upload")
+    if cached is not None:
+        file_id, path = cached
+        if file_id == uploaded_video.file_id and os.path.exists(path):
+            return path
+        if os.path.exists(path):
+            os.remove(path)
+    suffix = os.path.splitext(uploaded_video.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(uploaded_video.getbuffer())
+    st.session_state.stream_upload = (uploaded_video.file_id, tmp.name)
+    return tmp.name
+
+def stream_mode():
+    st.sidebar.header("Потоковая обработка")
+    uploaded_video = st.sidebar.file_uploader("Загрузите видео", type=["mp4", "avi", "mov", "mkv"])
+    frames_dir = st.sidebar.text_input("...или папка с последовательностью кадров", "")
+
+    operation = st.sidebar.radio("Обработка", ["Низкочастотные фильтры", "Гистограмма и эквализация"])
+    post = None
+    if operation == "Низкочастотные фильтры":
+        method = st.sidebar.selectbox("Тип фильтра",
+                                      ["Усредняющий фильтр (Mean)",
+                                       "Гауссово размытие (Gaussian)",
+                                       "Медианный фильтр (Median)",
+                                       "Билатеральный фильтр"])
+        ksize = st.sidebar.slider("Размер окна (нечётное число)", 3, 31, 5, step=2)
+        process = lambda frame: apply_smoothing(frame, method, ksize)
+    else:
+        method = st.sidebar.selectbox("Метод эквализации",
+                                      ["Эквализация (equalizeHist)",
+                                       "Адаптивная эквализация (CLAHE)"])
+        space = st.sidebar.selectbox("Цветовое пространство", list(EQUALIZATION_SPACES))
+        temporal = method == "Эквализация (equalizeHist)" and st.sidebar.checkbox(
+            "Сглаживать LUT между кадрами", value=True)
+        if temporal:
+            alpha = st.sidebar.slider("Коэффициент сглаживания", 0.05, 1.0, 0.2, step=0.05)
+            equalizer = TemporalEqualizer(space, alpha)
+            process = equalizer.analyze
+            post = equalizer.apply
+        else:
+            process = lambda frame: equalize_image(frame, method, space)
+
+    workers = st.sidebar.slider("Потоков обработки", 1, max(1, os.cpu_count() or 1) * 2, os.cpu_count() or 1)
+    queue_size = st.sidebar.slider("Размер очереди кадров", 1, 64, 8)
+    drop_frames = st.sidebar.checkbox("Пропускать кадры при переполнении очереди", value=False)
+
+    source = None
+    if uploaded_video is not None:
+        source = uploaded_video_path(uploaded_video)
+    elif frames_dir and os.path.isdir(frames_dir):
+        source = frames_dir
+    elif frames_dir:
+        st.sidebar.error("Папка не найдена")
+
+    if source is None:
+        st.info("Загрузите видео или укажите папку с кадрами")
+        return
+
+    if st.button("Запустить обработку", type="primary"):
+        output_path = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+        video_bytes = None
+        try:
+            sink = VideoSink(output_path, source_fps(source))
+            with st.spinner("Обработка кадров..."):
+                try:
+                    stats = process_stream(iter_frames(source), process, sink,
+                                           workers, queue_size, drop_frames, post)
+                finally:
+                    sink.close()
+            if stats.frames_written:
+                with open(output_path, "rb") as f:
+                    video_bytes = f.read()
+        finally:
+            os.remove(output_path)
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Прочитано кадров", stats.frames_read)
+        col2.metric("Записано кадров", stats.frames_written)
+        col3.metric("Пропущено", f"{stats.frames_dropped} ({stats.drop_rate:.1%})")
+        col4.metric("Скорость", f"{stats.fps:.1f} кадр/с")
+
+        if video_bytes is not None:
+            if sink.browser_playable:
+                st.video(video_bytes)
+            else:
+                st.info("Сборка OpenCV не поддерживает H.264, видео записано в MPEG-4 (mp4v): "
+                        "браузер его обычно не воспроизводит, скачайте результат")
+            st.download_button("Скачать результат", video_bytes,
+                               file_name="processed.mp4", mime="video/mp4")
+
+class StageProfiler:
+    def __init__(self, enabled=False, trace_memory=True, top_n=10):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.top_n = top_n
+        self.stages = []
+        self.allocations = []
+        self._started_tracing = False
+        self._snapshot = None
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.trace_memory:
+            self._snapshot = self._take_snapshot()
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {"stage": name, "time_ms": (time.perf_counter() - start) * 1000}
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record["peak_kb"] = (peak - base) / 1024
+                record["retained_kb"] = (current - base) / 1024
+                self._record_allocations(name)
+            self.stages.append(record)
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+
+    def _record_allocations(self, stage):
+        # сравнение со снимком конца прошлого этапа показывает только то,
+        # что выделил текущий этап, а не массивы, живущие с начала запуска
+        snapshot = self._take_snapshot()
+        if self._snapshot is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = [s for s in snapshot.compare_to(self._snapshot, "lineno") if s.size_diff > 0]
+        self._snapshot = snapshot
+        for stat in stats[:self.top_n]:
+            frame = stat.traceback[0]
+            self.allocations.append({
+                "stage": stage,
+                "location": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                "size_kb": getattr(stat, "size_diff", stat.size) / 1024,
+                "blocks": getattr(stat, "count_diff", stat.count),
+            })
+
+    def largest_allocations(self, n=None):
+        ranked = sorted(self.allocations, key=lambda a: a["size_kb"], reverse=True)
+        return ranked[:n or self.top_n]
+
+    def report(self, **context):
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "context": context,
+            "total_ms": sum(s["time_ms"] for s in self.stages),
+            "stages": self.stages,
+            "largest_allocations": self.largest_allocations(),
+        }
+
+def show_profiler_panel(profiler, **context):
+    if not profiler.enabled or not profiler.stages:
+        return
+    report = profiler.report(**context)
+    with st.sidebar.expander("⏱ Профиль этапов", expanded=True):
+        st.write(f"**Всего:** {report['total_ms']:.1f} мс")
+        st.dataframe([{k: round(v, 2) if isinstance(v, float) else v for k, v in s.items()}
+                      for s in report["stages"]], use_container_width=True)
+        st.bar_chart({s["stage"]: s["time_ms"] for s in report["stages"]})
+        if report["largest_allocations"]:
+            st.write("**Крупнейшие массивы (tracemalloc):**")
+            st.dataframe([{k: round(v, 1) if isinstance(v, float) else v for k, v in a.items()}
+                          for a in report["largest_allocations"]], use_container_width=True)
+        st.download_button("Экспорт в JSON", json.dumps(report, ensure_ascii=False, indent=2),
+                           file_name="lab3_profile.json", mime="application/json")
+
 def linear_contrast(img):
     img_float = img.astype(np.float32)
     min_val = np.min(img_float)
@@ -46,60 +662,103 @@ def main():
     3. Линейное контрастирование изображения.  
     """)
 
+    source_type = st.sidebar.radio("Источник", ["Изображение", "Видео / последовательность кадров"])
+    if source_type != "Изображение":
+        stream_mode()
+        return
+
+    profiling = st.sidebar.checkbox("Профилирование этапов", value=False)
+    trace_memory = profiling and st.sidebar.checkbox("Отслеживать память (tracemalloc)", value=True)
+    profiler = StageProfiler(enabled=profiling, trace_memory=trace_memory)
+
     uploaded_file = st.sidebar.file_uploader("Загрузите изображение", type=["jpg", "png", "jpeg", "bmp"])
     if uploaded_file is not None:
-        image = Image.open(uploaded_file).convert("RGB")
-        img = np.array(image)
-        img_bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-        img_gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-
-        st.sidebar.header("Выберите режим")
-        mode = st.sidebar.radio("Метод обработки", 
-                                ["Низкочастотные фильтры", 
-                                 "Гистограмма и эквализация",
-                                 "Линейное контрастирование"])
-
-        
-        processed_img = img_bgr.copy()
+        profiler.start()
+        try:
+            with profiler.stage("Декодирование"):
+                image = Image.open(uploaded_file).convert("RGB")
+                img = np.array(image)
+            with profiler.stage("Преобразование цвета"):
+                img_bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+                img_gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+
+            st.sidebar.header("Выберите режим")
+            mode = st.sidebar.radio("Метод обработки", 
+                                    ["Низкочастотные фильтры", 
+                                     "Гистограмма и эквализация",
+                                     "Линейное контрастирование"])
+
+            processed_img = img_bgr.copy()
+            show_color = mode == "Низкочастотные фильтры"
+            if mode == "Низкочастотные фильтры":
+                method = st.sidebar.selectbox("Тип фильтра", 
+                                          ["Усредняющий фильтр (Mean)",
+                                           "Гауссово размытие (Gaussian)",
+                                           "Медианный фильтр (Median)",
+                                           "Медианный фильтр (быстрый, многопоточный)",
+                                           "Билатеральный фильтр",
+                                           "Билатеральный фильтр (быстрый, приближённый)"])
+                ksize = st.sidebar.slider("Размер окна (нечётное число)", 3, 31, 5, step=2)
+                with profiler.stage("Фильтрация"):
+                    processed_img = apply_smoothing(img_bgr, method, ksize)
+                with profiler.stage("Преобразование цвета (результат)"):
+                    processed_gray = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
+            elif mode == "Гистограмма и эквализация":
+                method = st.sidebar.selectbox("Метод эквализации", 
+                                          ["Эквализация (equalizeHist)",
+                                           "Адаптивная эквализация (CLAHE)"])
+                space = st.sidebar.selectbox("Цветовое пространство", list(EQUALIZATION_SPACES))
+                clip_limit, tile_grid = 3.0, (8, 8)
+                if method == "Адаптивная эквализация (CLAHE)":
+                    clip_limit = st.sidebar.slider("Порог ограничения (clipLimit)", 0.5, 10.0, 3.0, step=0.5)
+                    grid = st.sidebar.slider("Размер сетки плиток", 2, 16, 8)
+                    tile_grid = (grid, grid)
+                with profiler.stage("Эквализация"):
+                    equalized = equalize_image(img_bgr, method, space, clip_limit, tile_grid,
+                                               workers=os.cpu_count() or 1)
+                if equalized.ndim == 3:
+                    show_color = True
+                    processed_img = equalized
+                    with profiler.stage("Преобразование цвета (результат)"):
+                        processed_gray = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
+                else:
+                    processed_gray = equalized
+            elif mode == "Линейное контрастирование":
+                method = mode
+                with profiler.stage("Контрастирование"):
+                    processed_gray = linear_contrast(img_gray)
+
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                st.subheader("Исходное изображение")
+                with profiler.stage("Вывод st.image (исходное)"):
+                    st.image(image, use_container_width=True)
+            with col2:
+                st.subheader("Обработанное изображение")
+                with profiler.stage("Вывод st.image (результат)"):
+                    if show_color:
+                        st.image(cv2.cvtColor(processed_img, cv2.COLOR_BGR2RGB), use_container_width=True)
+                    else:
+                        st.image(processed_gray, use_container_width=True, channels="GRAY")
+            with col3:
+                st.subheader("Гистограмма")
+                with profiler.stage("Гистограмма"):
+                    if mode == "Низкочастотные фильтры":
+                        plot_histogram(cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY))
+                    elif show_color:
+                        plot_histogram(cv2.cvtColor(processed_img, cv2.COLOR_BGR2RGB))
+                    else:
+                        plot_histogram(processed_gray)
+        finally:
+            profiler.stop()
+
+        show_profiler_panel(profiler, image_shape=list(img_bgr.shape), mode=mode, method=method)
+
         if mode == "Низкочастотные фильтры":
-            method = st.sidebar.selectbox("Тип фильтра", 
-                                      ["Усредняющий фильтр (Mean)",
-                                       "Гауссово размытие (Gaussian)",
-                                       "Медианный фильтр (Median)",
-                                       "Билатеральный фильтр"])
-            ksize = st.sidebar.slider("Размер окна (нечётное число)", 3, 31, 5, step=2)
-            processed_img = apply_smoothing(img_bgr, method, ksize)
-            processed_gray = cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY)
+            show_benchmark(img_bgr)
         elif mode == "Гистограмма и эквализация":
-            method = st.sidebar.selectbox("Метод эквализации", 
-                                      ["Эквализация (equalizeHist)",
-                                       "Адаптивная эквализация (CLAHE)"])
-            if method == "Эквализация (equalizeHist)":
-                processed_gray = cv2.equalizeHist(img_gray)
-            else:
-                clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-                processed_gray = clahe.apply(img_gray)
-        elif mode == "Линейное контрастирование":
-            processed_gray = linear_contrast(img_gray)
-
-      
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            st.subheader("Исходное изображение")
-            st.image(image, use_container_width=True)
-        with col2:
-            st.subheader("Обработанное изображение")
-            if mode == "Низкочастотные фильтры":
-                st.image(cv2.cvtColor(processed_img, cv2.COLOR_BGR2RGB), use_container_width=True)
-            else:
-                st.image(processed_gray, use_container_width=True, channels="GRAY")
-        with col3:
-            st.subheader("Гистограмма")
-            if mode == "Низкочастотные фильтры":
-                plot_histogram(cv2.cvtColor(processed_img, cv2.COLOR_BGR2GRAY))
-            else:
-                plot_histogram(processed_gray)
+            show_batch_equalization(img_bgr, method, space, clip_limit, tile_grid)
 
 if __name__ == "__main__":
     main()
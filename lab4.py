@@ -1,10 +1,23 @@
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
 import time
+import io
+import json
+import platform
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Tuple
+from functools import lru_cache
+from typing import List, Optional, Tuple
 import math
+import tracemalloc
+from array import array
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 st.set_page_config(
     page_title="Растровые алгоритмы",
@@ -14,9 +27,126 @@ st.set_page_config(
 
 @dataclass
 class Point:
+    __slots__ = ("x", "y")
     x: int
     y: int
 
+class PointBuffer:
+    __slots__ = ("_coords",)
+
+    def __init__(self, coords: Optional[array] = None):
+        self._coords = coords if coords is not None else array("i")
+
+    @classmethod
+    def from_points(cls, points) -> "PointBuffer":
+        coords = array("i")
+        for p in points:
+            coords.append(p.x)
+            coords.append(p.y)
+        return cls(coords)
+
+    @classmethod
+    def from_array(cls, coords: np.ndarray) -> "PointBuffer":
+        return cls(array("i", np.ascontiguousarray(coords, dtype=np.intc).tobytes()))
+
+    def append(self, x: int, y: int):
+        self._coords.append(x)
+        self._coords.append(y)
+
+    def to_numpy(self) -> np.ndarray:
+        return np.frombuffer(self._coords, dtype=np.intc).reshape(-1, 2)
+
+    @property
+    def xs(self) -> np.ndarray:
+        return self.to_numpy()[:, 0]
+
+    @property
+    def ys(self) -> np.ndarray:
+        return self.to_numpy()[:, 1]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._coords) * self._coords.itemsize
+
+    def __len__(self) -> int:
+        return len(self._coords) // 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return type(self)._from_rows(self, range(*index.indices(len(self))))
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("индекс точки вне диапазона")
+        return Point(self._coords[2 * index], self._coords[2 * index + 1])
+
+    @classmethod
+    def _from_rows(cls, source: "PointBuffer", rows: range) -> "PointBuffer":
+        if rows.step == 1:
+            return cls(source._coords[2 * rows.start:2 * rows.stop])
+        coords = array("i")
+        for i in rows:
+            coords.append(source._coords[2 * i])
+            coords.append(source._coords[2 * i + 1])
+        return cls(coords)
+
+    def __iter__(self):
+        coords = self._coords
+        for i in range(0, len(coords), 2):
+            yield Point(coords[i], coords[i + 1])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PointBuffer):
+            return self._coords == other._coords
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"PointBuffer({len(self)} точек)"
+
+class WuPointBuffer:
+    __slots__ = ("points", "_intensity")
+
+    def __init__(self, points: Optional[PointBuffer] = None, intensity: Optional[array] = None):
+        self.points = points if points is not None else PointBuffer()
+        self._intensity = intensity if intensity is not None else array("f")
+
+    @classmethod
+    def from_pairs(cls, pairs) -> "WuPointBuffer":
+        buffer = cls()
+        for p, intensity in pairs:
+            buffer.append(p.x, p.y, intensity)
+        return buffer
+
+    @classmethod
+    def from_arrays(cls, coords: np.ndarray, intensity: np.ndarray) -> "WuPointBuffer":
+        return cls(PointBuffer.from_array(coords),
+                   array("f", np.ascontiguousarray(intensity, dtype=np.float32).tobytes()))
+
+    def append(self, x: int, y: int, intensity: float):
+        self.points.append(x, y)
+        self._intensity.append(intensity)
+
+    @property
+    def intensity(self) -> np.ndarray:
+        return np.frombuffer(self._intensity, dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.points.nbytes + len(self._intensity) * self._intensity.itemsize
+
+    def __len__(self) -> int:
+        return len(self._intensity)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            rows = range(*index.indices(len(self)))
+            return WuPointBuffer(self.points[index], array("f", (self._intensity[i] for i in rows)))
+        return self.points[index], self._intensity[index]
+
+    def __iter__(self):
+        return zip(self.points, self._intensity)
+
 class RasterAlgorithms:
     @staticmethod
     def step_by_step(x1: int, y1: int, x2: int, y2: int) -> List[Point]:
@@ -106,45 +236,85 @@ class RasterAlgorithms:
     
     @staticmethod
     def bresenham_circle(xc: int, yc: int, r: int) -> List[Point]:
+        if r <= 0:
+            return [Point(xc, yc)] if r == 0 else []
         points = []
-        x = 0
-        y = r
+        ys = []
+        x, y = 0, r
         d = 3 - 2 * r
         
-        def add_points(xc, yc, x, y):
-            points.extend([
-                Point(xc + x, yc + y),
-                Point(xc - x, yc + y),
-                Point(xc + x, yc - y),
-                Point(xc - x, yc - y),
-                Point(xc + y, yc + x),
-                Point(xc - y, yc + x),
-                Point(xc + y, yc - x),
-                Point(xc - y, yc - x)
-            ])
-        
-        add_points(xc, yc, x, y)
-        
-        while y >= x:
-            x += 1
+        # каждая пара (x, y) восьмой части выводится один раз: пиксели на осях и диагонали
+        # принадлежат двум октантам, поэтому у них четыре отражения, а не восемь
+        while True:
+            ys.append(y)
+            # последний шаг может перейти диагональ и повторить зеркально уже выведенную пару
+            if 0 <= y < x and ys[y] == x:
+                break
+            if x == 0 or y == 0:
+                a = max(x, y)
+                points.extend((Point(xc, yc + a), Point(xc + a, yc), Point(xc, yc - a), Point(xc - a, yc)))
+            elif x == y:
+                points.extend((Point(xc + x, yc + x), Point(xc + x, yc - x),
+                               Point(xc - x, yc - x), Point(xc - x, yc + x)))
+            else:
+                points.extend((Point(xc + x, yc + y), Point(xc + y, yc + x), Point(xc + y, yc - x),
+                               Point(xc + x, yc - y), Point(xc - x, yc - y), Point(xc - y, yc - x),
+                               Point(xc - y, yc + x), Point(xc - x, yc + y)))
+            if y < x:
+                break
             
+            x += 1
             if d > 0:
                 y -= 1
                 d = d + 4 * (x - y) + 10
             else:
                 d = d + 4 * x + 6
-            
-            add_points(xc, yc, x, y)
         
-        unique_points = []
-        seen = set()
-        for p in points:
-            key = (p.x, p.y)
-            if key not in seen:
-                seen.add(key)
-                unique_points.append(p)
+        return points
+    
+    @staticmethod
+    def midpoint_ellipse(xc: int, yc: int, a: int, b: int) -> List[Point]:
+        if a < 0 or b < 0:
+            raise ValueError("полуоси эллипса должны быть неотрицательными")
+        if a == 0 or b == 0:
+            # вырожденный эллипс — отрезок вдоль оси
+            if a == 0:
+                return [Point(xc, yc + y) for y in range(-b, b + 1)]
+            return [Point(xc + x, yc) for x in range(-a, a + 1)]
+        points = []
+        a2, b2 = a * a, b * b
+        x, y = 0, b
+        
+        def add_points(x, y):
+            # у эллипса четыре квадранта; пиксели на осях выводятся по два
+            if x == 0:
+                points.extend((Point(xc, yc + y), Point(xc, yc - y)))
+            elif y == 0:
+                points.extend((Point(xc + x, yc), Point(xc - x, yc)))
+            else:
+                points.extend((Point(xc + x, yc + y), Point(xc + x, yc - y),
+                               Point(xc - x, yc - y), Point(xc - x, yc + y)))
+        
+        # невязка F(x,y) = b²x² + a²y² - a²b², умноженная на 4
+        d = 4 * b2 - 4 * a2 * b + a2
+        while b2 * x < a2 * y:
+            add_points(x, y)
+            if d >= 0:
+                y -= 1
+                d -= 8 * a2 * y
+            x += 1
+            d += 4 * b2 * (2 * x + 1)
+        
+        d = b2 * (2 * x + 1) ** 2 + 4 * a2 * (y - 1) ** 2 - 4 * a2 * b2
+        while y >= 0:
+            add_points(x, y)
+            if d < 0:
+                x += 1
+                d += 8 * b2 * x
+            y -= 1
+            d += 4 * a2 * (1 - 2 * y)
         
-        return unique_points
+        return points
     
     @staticmethod
     def wu_line(x1: int, y1: int, x2: int, y2: int) -> List[Tuple[Point, float]]:
@@ -212,6 +382,1339 @@ class RasterAlgorithms:
         
         return points_with_intensity
 
+class VectorizedRasterAlgorithms:
+    @staticmethod
+    def step_by_step(x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        if x1 == x2:
+            ys = np.arange(min(y1, y2), max(y1, y2) + 1)
+            xs = np.full_like(ys, x1)
+        else:
+            k = (y2 - y1) / (x2 - x1)
+            b = y1 - k * x1
+            if abs(k) <= 1:
+                x_start, x_end = sorted([x1, x2])
+                xs = np.arange(x_start, x_end + 1)
+                ys = np.round(k * xs + b)
+            else:
+                y_start, y_end = sorted([y1, y2])
+                ys = np.arange(y_start, y_end + 1)
+                xs = np.round((ys - b) / k)
+        return np.column_stack((xs, ys)).astype(np.int32)
+
+    @staticmethod
+    def dda(x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        dx = x2 - x1
+        dy = y2 - y1
+        steps = max(abs(dx), abs(dy))
+        if steps == 0:
+            return np.array([[x1, y1]], dtype=np.int32)
+
+        # накопление теми же сложениями, что и в скалярной версии, даёт
+        # бит-в-бит одинаковые координаты до округления
+        xs = np.full(steps + 1, dx / steps)
+        ys = np.full(steps + 1, dy / steps)
+        xs[0] = x1
+        ys[0] = y1
+        np.add.accumulate(xs, out=xs)
+        np.add.accumulate(ys, out=ys)
+        return np.column_stack((np.round(xs), np.round(ys))).astype(np.int32)
+
+    @staticmethod
+    def bresenham_line(x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        steep = abs(y2 - y1) > abs(x2 - x1)
+        if steep:
+            x1, y1 = y1, x1
+            x2, y2 = y2, x2
+        if x1 > x2:
+            x1, x2 = x2, x1
+            y1, y2 = y2, y1
+
+        dx = x2 - x1
+        dy = abs(y2 - y1)
+        y_step = 1 if y1 < y2 else -1
+
+        i = np.arange(dx + 1, dtype=np.int64)
+        coords = np.empty((dx + 1, 2), dtype=np.int32)
+        major_col, minor_col = (1, 0) if steep else (0, 1)
+        coords[:, major_col] = x1 + i
+        if dx == 0:
+            coords[:, minor_col] = y1
+        else:
+            # число шагов по малой оси к пикселю i: ошибка error = dx // 2 - i*dy + c*dx
+            # держится в [0, dx), откуда c = ceil((i*dy - dx // 2) / dx)
+            i *= dy
+            i += dx - 1 - dx // 2
+            i //= dx
+            coords[:, minor_col] = y1 + y_step * i
+        return coords
+
+    @staticmethod
+    def _circle_octant(r: int) -> Tuple[np.ndarray, np.ndarray]:
+        if r <= 0:
+            x, y, d = 0, r, 3 - 2 * r
+            pairs = [(x, y)]
+            while y >= x:
+                x += 1
+                if d > 0:
+                    y -= 1
+                    d = d + 4 * (x - y) + 10
+                else:
+                    d = d + 4 * x + 6
+                pairs.append((x, y))
+            xs, ys = zip(*pairs)
+            return np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64)
+
+        # переменная решения скалярной версии в замкнутом виде:
+        # d(x, y) = 2x² + 8x + 2y² - 6y + 3 + 4r - 2r², y уменьшается при d > 0
+        n = int(r / math.sqrt(2)) + 3
+        x = np.arange(n, dtype=np.int64)
+        t = 2 * r * r - 4 * r - 3 - 2 * x * x - 8 * x
+        y_max = np.floor((3 + np.sqrt(np.maximum(9 + 2 * t, 0))) / 2).astype(np.int64)
+        y_max -= 2 * y_max * y_max - 6 * y_max > t
+        y_max += 2 * (y_max + 1) ** 2 - 6 * (y_max + 1) <= t
+
+        y = np.empty(n, dtype=np.int64)
+        y[0] = r
+        y[1:] = np.minimum(r, y_max[:-1])
+        # за шаг y убывает не больше чем на единицу
+        y = np.maximum.accumulate(y + x) - x
+
+        keep = np.ones(n, dtype=bool)
+        keep[1:] = y[:-1] >= x[:-1]
+        count = int(np.argmin(keep)) if not keep.all() else n
+        return x[:count], y[:count]
+
+    @staticmethod
+    def bresenham_circle(xc: int, yc: int, r: int) -> np.ndarray:
+        x, y = VectorizedRasterAlgorithms._circle_octant(r)
+        pts = np.empty((len(x), 8, 2), dtype=np.int32)
+        pts[:, :, 0] = xc + np.column_stack((x, -x, x, -x, y, -y, y, -y))
+        pts[:, :, 1] = yc + np.column_stack((y, y, -y, -y, x, x, -x, -x))
+        # совпадения возможны только внутри одной восьмёрки (x = 0, x = y, y = 0)
+        # и у последней пары, если она зеркальна одной из предыдущих
+        duplicate = np.zeros((len(x), 8), dtype=bool)
+        duplicate[:, [1, 3, 6, 7]] |= (x == 0)[:, None]
+        duplicate[:, [4, 5, 6, 7]] |= (np.abs(x) == np.abs(y))[:, None]
+        duplicate[:, [2, 3, 5, 7]] |= (y == 0)[:, None]
+        last = len(x) - 1
+        if last > 0 and y[last] < x[last] and 0 <= y[last] < last and y[y[last]] == x[last]:
+            duplicate[last] = True
+        return pts[~duplicate]
+
+    @staticmethod
+    def wu_line(x1: int, y1: int, x2: int, y2: int) -> Tuple[np.ndarray, np.ndarray]:
+        steep = abs(y2 - y1) > abs(x2 - x1)
+        if steep:
+            x1, y1 = y1, x1
+            x2, y2 = y2, x2
+        if x1 > x2:
+            x1, x2 = x2, x1
+            y1, y2 = y2, y1
+
+        dx = x2 - x1
+        dy = y2 - y1
+        gradient = 1.0 if dx == 0 else dy / dx
+
+        ends = []
+        for x, y, first in ((x1, y1, True), (x2, y2, False)):
+            xend = round(x)
+            yend = y + gradient * (xend - x)
+            xgap = 1 - (x + 0.5) % 1 if first else (x + 0.5) % 1
+            ypxl = int(yend)
+            ends.append((xend, ypxl, (1 - (yend % 1)) * xgap, (yend % 1) * xgap, yend))
+        xpxl1, ypxl1, a1, b1, yend1 = ends[0]
+        xpxl2, ypxl2, a2, b2, _ = ends[1]
+
+        n = max(xpxl2 - xpxl1 - 1, 0)
+        intery = np.full(n, gradient)
+        if n:
+            intery[0] = yend1 + gradient
+            np.add.accumulate(intery, out=intery)
+        whole = np.trunc(intery)
+        frac = np.mod(intery, 1)
+
+        major = np.empty(2 * n + 4, dtype=np.int64)
+        minor = np.empty(2 * n + 4, dtype=np.int64)
+        intensity = np.empty(2 * n + 4, dtype=np.float64)
+        major[:4] = (xpxl1, xpxl1, xpxl2, xpxl2)
+        minor[:4] = (ypxl1, ypxl1 + 1, ypxl2, ypxl2 + 1)
+        intensity[:4] = (a1, b1, a2, b2)
+
+        xs = np.arange(xpxl1 + 1, xpxl2)
+        major[4::2] = xs
+        major[5::2] = xs
+        minor[4::2] = whole
+        minor[5::2] = whole + 1
+        intensity[4::2] = 1 - frac
+        intensity[5::2] = frac
+
+        if steep:
+            coords = np.column_stack((minor, major))
+        else:
+            coords = np.column_stack((major, minor))
+        return coords.astype(np.int32), intensity.astype(np.float32)
+
+class FixedPointRasterAlgorithms:
+    FRAC_BITS = 16
+    ONE = 1 << 16
+    HALF = 1 << 15
+    MASK = (1 << 16) - 1
+
+    # 16.16 с остатком деления, как в Брезенхеме: значение на шаге i равно
+    # floor(i·d·2^16 / steps) без накопления ошибки на длинных отрезках
+
+    @staticmethod
+    def dda(x1: int, y1: int, x2: int, y2: int) -> List[Point]:
+        fp = FixedPointRasterAlgorithms
+        dx = x2 - x1
+        dy = y2 - y1
+        steps = max(abs(dx), abs(dy))
+        if steps == 0:
+            return [Point(x1, y1)]
+        
+        qx, rx = divmod(dx << fp.FRAC_BITS, steps)
+        qy, ry = divmod(dy << fp.FRAC_BITS, steps)
+        x, y = x1 << fp.FRAC_BITS, y1 << fp.FRAC_BITS
+        ex = ey = 0
+        points = []
+        for _ in range(steps + 1):
+            px = (x + fp.HALF) >> fp.FRAC_BITS
+            py = (y + fp.HALF) >> fp.FRAC_BITS
+            # точная половина округляется к чётному, как round()
+            if ex == 0 and x & fp.MASK == fp.HALF and px & 1:
+                px -= 1
+            if ey == 0 and y & fp.MASK == fp.HALF and py & 1:
+                py -= 1
+            points.append(Point(px, py))
+            x += qx
+            ex += rx
+            if ex >= steps:
+                ex -= steps
+                x += 1
+            y += qy
+            ey += ry
+            if ey >= steps:
+                ey -= steps
+                y += 1
+        return points
+
+    @staticmethod
+    def _wu_scan(x1: int, y1: int, x2: int, y2: int, coverage8: bool):
+        fp = FixedPointRasterAlgorithms
+        steep = abs(y2 - y1) > abs(x2 - x1)
+        if steep:
+            x1, y1, x2, y2 = y1, x1, y2, x2
+        if x1 > x2:
+            x1, x2, y1, y2 = x2, x1, y2, y1
+        
+        dx = x2 - x1
+        dy = y2 - y1
+        if coverage8:
+            end, zero = (255 * fp.HALF + fp.HALF) >> fp.FRAC_BITS, 0
+        else:
+            end, zero = 0.5, 0.0
+        
+        # у целочисленных концов xgap = 0.5 и дробная часть y равна нулю
+        out = [(x1, y1, end), (x1, y1 + 1, zero), (x2, y2, end), (x2, y2 + 1, zero)]
+        if dx == 0:
+            return steep, out
+        
+        q, r = divmod(dy << fp.FRAC_BITS, dx)
+        v = (y1 << fp.FRAC_BITS) + q
+        e = r
+        if e >= dx:
+            e -= dx
+            v += 1
+        for x in range(x1 + 1, x2):
+            frac = v & fp.MASK
+            # int() в эталонной версии отбрасывает дробь к нулю
+            whole = v >> fp.FRAC_BITS
+            if v < 0 and frac:
+                whole += 1
+            if coverage8:
+                upper = (frac * 255 + fp.HALF) >> fp.FRAC_BITS
+                lower = 255 - upper
+            else:
+                upper = frac / fp.ONE
+                lower = 1 - upper
+            out.append((x, whole, lower))
+            out.append((x, whole + 1, upper))
+            v += q
+            e += r
+            if e >= dx:
+                e -= dx
+                v += 1
+        return steep, out
+
+    @staticmethod
+    def wu_line(x1: int, y1: int, x2: int, y2: int) -> List[Tuple[Point, float]]:
+        steep, out = FixedPointRasterAlgorithms._wu_scan(x1, y1, x2, y2, False)
+        if steep:
+            return [(Point(b, a), c) for a, b, c in out]
+        return [(Point(a, b), c) for a, b, c in out]
+
+    @staticmethod
+    def wu_line_coverage(x1: int, y1: int, x2: int, y2: int) -> List[Tuple[Point, int]]:
+        steep, out = FixedPointRasterAlgorithms._wu_scan(x1, y1, x2, y2, True)
+        if steep:
+            return [(Point(b, a), c) for a, b, c in out]
+        return [(Point(a, b), c) for a, b, c in out]
+
+    @staticmethod
+    def _fixed_steps(start: np.ndarray, delta: np.ndarray, steps: np.ndarray, i: np.ndarray):
+        fp = FixedPointRasterAlgorithms
+        scaled = (delta << fp.FRAC_BITS)[:, None] * i
+        safe = np.maximum(steps, 1)[:, None]
+        value = (start << fp.FRAC_BITS)[:, None] + scaled // safe
+        return value, scaled % safe == 0
+
+    @staticmethod
+    def dda_kernel(segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        fp = FixedPointRasterAlgorithms
+        segments = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+        x1, y1, x2, y2 = segments.T
+        dx, dy = x2 - x1, y2 - y1
+        steps = np.maximum(np.abs(dx), np.abs(dy))
+        i = np.arange(int(steps.max(initial=0)) + 1, dtype=np.int64)
+        valid = i <= steps[:, None]
+        
+        coords = np.empty(valid.shape + (2,), dtype=np.int32)
+        for axis, start, delta in ((0, x1, dx), (1, y1, dy)):
+            value, exact = fp._fixed_steps(start, delta, steps, i)
+            pixel = (value + fp.HALF) >> fp.FRAC_BITS
+            pixel -= exact & ((value & fp.MASK) == fp.HALF) & (pixel & 1 == 1)
+            coords[..., axis] = pixel
+        return coords, valid
+
+    @staticmethod
+    def wu_kernel(segments: np.ndarray, coverage8: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        fp = FixedPointRasterAlgorithms
+        segments = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+        steep, a1, b1, a2, b2 = _major_axis_form(segments)
+        dx, dy = a2 - a1, b2 - b1
+        n = np.maximum(dx - 1, 0)
+        j = np.arange(1, int(n.max(initial=0)) + 1, dtype=np.int64)
+        inner = j <= n[:, None]
+        
+        v, _ = fp._fixed_steps(b1, dy, dx, j)
+        frac = v & fp.MASK
+        whole = (v >> fp.FRAC_BITS) + ((v < 0) & (frac != 0))
+        
+        rows, cols = len(segments), 4 + 2 * len(j)
+        major = np.empty((rows, cols), dtype=np.int64)
+        minor = np.empty((rows, cols), dtype=np.int64)
+        major[:, :4] = np.column_stack((a1, a1, a2, a2))
+        minor[:, :4] = np.column_stack((b1, b1 + 1, b2, b2 + 1))
+        major[:, 4::2] = major[:, 5::2] = a1[:, None] + j
+        minor[:, 4::2] = whole
+        minor[:, 5::2] = whole + 1
+        
+        if coverage8:
+            intensity = np.empty((rows, cols), dtype=np.uint8)
+            end = (255 * fp.HALF + fp.HALF) >> fp.FRAC_BITS
+            upper = (frac * 255 + fp.HALF) >> fp.FRAC_BITS
+            intensity[:, 4::2] = 255 - upper
+            intensity[:, 5::2] = upper
+        else:
+            intensity = np.empty((rows, cols), dtype=np.float32)
+            end = 0.5
+            upper = frac / fp.ONE
+            intensity[:, 4::2] = 1 - upper
+            intensity[:, 5::2] = upper
+        intensity[:, :4] = (end, 0, end, 0)
+        
+        coords = np.stack((np.where(steep[:, None], minor, major),
+                           np.where(steep[:, None], major, minor)), axis=-1).astype(np.int32)
+        valid = np.ones((rows, cols), dtype=bool)
+        valid[:, 4::2] = valid[:, 5::2] = inner
+        return coords, intensity, valid
+
+    @staticmethod
+    def dda_array(x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        coords, valid = FixedPointRasterAlgorithms.dda_kernel([x1, y1, x2, y2])
+        return coords[valid]
+
+    @staticmethod
+    def wu_line_array(x1: int, y1: int, x2: int, y2: int,
+                      coverage8: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        coords, intensity, valid = FixedPointRasterAlgorithms.wu_kernel([x1, y1, x2, y2], coverage8)
+        return coords[valid], intensity[valid]
+
+def _ragged_index(counts: np.ndarray) -> np.ndarray:
+    i = np.arange(int(counts.sum()), dtype=np.int64)
+    i -= np.repeat(np.cumsum(counts) - counts, counts)
+    return i
+
+def _chunk_bounds(counts: np.ndarray, budget: int) -> List[Tuple[int, int]]:
+    if len(counts) == 0:
+        return []
+    cumulative = np.cumsum(counts)
+    bounds = [0]
+    while bounds[-1] < len(counts):
+        start = bounds[-1]
+        done = cumulative[start - 1] if start else 0
+        end = int(np.searchsorted(cumulative, done + budget, side="right"))
+        bounds.append(max(end, start + 1))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _major_axis_form(segments: np.ndarray):
+    # приведение к виду "шаг по большой оси слева направо", как в скалярных версиях
+    x1, y1, x2, y2 = segments.T
+    steep = np.abs(y2 - y1) > np.abs(x2 - x1)
+    a1, b1 = np.where(steep, y1, x1), np.where(steep, x1, y1)
+    a2, b2 = np.where(steep, y2, x2), np.where(steep, x2, y2)
+    swap = a1 > a2
+    a1, a2 = np.where(swap, a2, a1), np.where(swap, a1, a2)
+    b1, b2 = np.where(swap, b2, b1), np.where(swap, b1, b2)
+    return steep, a1, b1, a2, b2
+
+class BatchRasterizer:
+    PIXEL_BUDGET = 1 << 22
+
+    @staticmethod
+    def _visible(segments: np.ndarray, shape: Tuple[int, int], margin: int = 0) -> np.ndarray:
+        h, w = shape[:2]
+        xs, ys = segments[:, [0, 2]], segments[:, [1, 3]]
+        return ((xs.max(axis=1) >= -margin) & (xs.min(axis=1) < w + margin) &
+                (ys.max(axis=1) >= -margin) & (ys.min(axis=1) < h + margin))
+
+    @staticmethod
+    def _run_chunks(counts: np.ndarray, job, workers: Optional[int]):
+        chunks = _chunk_bounds(counts, BatchRasterizer.PIXEL_BUDGET)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(chunks) == 1:
+            for start, end in chunks:
+                job(start, end)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda bounds: job(*bounds), chunks))
+
+    @staticmethod
+    def _flat_targets(major, minor, steep, shape, clip=True):
+        h, w = shape
+        if steep.all():
+            xs, ys = minor, major
+        elif not steep.any():
+            xs, ys = major, minor
+        else:
+            xs = np.where(steep, minor, major)
+            ys = np.where(steep, major, minor)
+        inside = None
+        if clip:
+            inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        flat = ys * w
+        flat += xs
+        return flat if inside is None else flat[inside], inside
+
+    @staticmethod
+    def bresenham_lines(segments: np.ndarray, framebuffer: np.ndarray, value=255,
+                        workers: Optional[int] = None) -> np.ndarray:
+        if not framebuffer.flags.c_contiguous:
+            raise ValueError("framebuffer должен быть C-непрерывным массивом")
+        segments = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+        segments = segments[BatchRasterizer._visible(segments, framebuffer.shape)]
+        shape = framebuffer.shape[:2]
+        pixels = framebuffer.reshape(shape[0] * shape[1], -1)
+
+        # сортировка по ориентации делает почти все порции однородными
+        h, w = shape
+        inside = ((segments[:, [0, 2]] >= 0).all(axis=1) & (segments[:, [0, 2]] < w).all(axis=1) &
+                  (segments[:, [1, 3]] >= 0).all(axis=1) & (segments[:, [1, 3]] < h).all(axis=1))
+        steep, a1, b1, a2, b2 = _major_axis_form(segments)
+        order = np.lexsort((~inside, steep))
+        steep, a1, b1, a2, b2, inside = (arr[order] for arr in (steep, a1, b1, a2, b2, inside))
+        dx = a2 - a1
+        dy = np.abs(b2 - b1)
+        step = np.where(b1 < b2, 1, -1)
+        bias = np.maximum(dx, 1) - 1 - dx // 2
+        divisor = np.maximum(dx, 1)
+        counts = dx + 1
+
+        def job(start, end):
+            c = counts[start:end]
+            i = _ragged_index(c)
+            major = np.repeat(a1[start:end], c) + i
+            i *= np.repeat(dy[start:end], c)
+            i += np.repeat(bias[start:end], c)
+            i //= np.repeat(divisor[start:end], c)
+            i *= np.repeat(step[start:end], c)
+            i += np.repeat(b1[start:end], c)
+            flat, _ = BatchRasterizer._flat_targets(
+                major, i, np.repeat(steep[start:end], c), shape,
+                clip=not inside[start:end].all())
+            pixels[flat] = value
+
+        BatchRasterizer._run_chunks(counts, job, workers)
+        return framebuffer
+
+    @staticmethod
+    def wu_lines(segments: np.ndarray, framebuffer: np.ndarray,
+                 workers: Optional[int] = None) -> np.ndarray:
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        segments = segments[BatchRasterizer._visible(segments, framebuffer.shape, margin=2)]
+        shape = framebuffer.shape[:2]
+
+        steep, a1, b1, a2, b2 = _major_axis_form(segments)
+        order = np.argsort(steep, kind="stable")
+        steep, a1, b1, a2, b2 = (arr[order] for arr in (steep, a1, b1, a2, b2))
+        dx = a2 - a1
+        gradient = np.where(dx == 0, 1.0, (b2 - b1) / np.where(dx == 0, 1.0, dx))
+        xend1 = np.round(a1)
+        yend1 = b1 + gradient * (xend1 - a1)
+        xgap1 = 1 - np.mod(a1 + 0.5, 1)
+        xend2 = np.round(a2)
+        yend2 = b2 + gradient * (xend2 - a2)
+        xgap2 = np.mod(a2 + 0.5, 1)
+        interior = np.maximum(xend2 - xend1 - 1, 0).astype(np.int64)
+        counts = interior + 2
+
+        # покрытия складываются по правилу "over": 1 - П(1 - c), произведение
+        # накапливается как сумма логарифмов, что не зависит от порядка отрезков
+        log_alpha = np.zeros(shape[0] * shape[1], dtype=np.float64)
+        lock = threading.Lock()
+
+        def job(start, end):
+            c = counts[start:end]
+            i = _ragged_index(c)
+            last = np.cumsum(c) - 1
+            first = last - c + 1
+
+            major = np.repeat(xend1[start:end], c) + i
+            major[last] = xend2[start:end]
+            pos = np.repeat(yend1[start:end], c) + np.repeat(gradient[start:end], c) * i
+            pos[last] = yend2[start:end]
+            gap = np.ones_like(pos)
+            gap[first] = xgap1[start:end]
+            gap[last] = xgap2[start:end]
+
+            # floor вместо int(): для отрицательных координат скалярная версия
+            # смещает пару пикселей, в буфере кадра это дало бы ложные пиксели
+            base = np.floor(pos)
+            frac = pos - base
+            major = np.concatenate((major, major)).astype(np.int64)
+            minor = np.concatenate((base, base + 1)).astype(np.int64)
+            coverage = np.concatenate(((1 - frac) * gap, frac * gap))
+            is_steep = np.tile(np.repeat(steep[start:end], c), 2)
+
+            flat, inside = BatchRasterizer._flat_targets(major, minor, is_steep, shape)
+            coverage = coverage[inside]
+            if not len(flat):
+                return
+            weights = np.log1p(-np.minimum(coverage, 1 - 1e-6))
+            lo = int(flat.min())
+            partial = np.bincount(flat - lo, weights=weights)
+            with lock:
+                log_alpha[lo:lo + len(partial)] += partial
+
+        BatchRasterizer._run_chunks(counts, job, workers)
+
+        transmit = np.exp(log_alpha).reshape(shape)
+        if framebuffer.ndim == 3:
+            transmit = transmit[..., None]
+        if framebuffer.dtype == np.uint8:
+            alpha = 1 - (1 - framebuffer / 255.0) * transmit
+            framebuffer[...] = np.round(alpha * 255).astype(np.uint8)
+        else:
+            framebuffer[...] = 1 - (1 - framebuffer) * transmit
+        return framebuffer
+
+class ShapeRasterizer:
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def circle_offsets(r: int) -> np.ndarray:
+        if r <= 0:
+            offsets = np.zeros((1 if r == 0 else 0, 2), dtype=np.int32)
+            offsets.flags.writeable = False
+            return offsets
+        x, y = VectorizedRasterAlgorithms._circle_octant(r)
+        last = len(x) - 1
+        if last > 0 and y[last] < x[last] and 0 <= y[last] < last and y[y[last]] == x[last]:
+            x, y = x[:last], y[:last]
+
+        # каждая восьмая часть выводится один раз; пиксели на осях и диагоналях
+        # принадлежат двум октантам и выводятся отдельно, по четыре
+        axis = (x == 0) | (y == 0)
+        diagonal = (x == y) & ~axis
+        general = ~axis & ~diagonal
+        gx, gy = x[general], y[general]
+        ax_ = np.maximum(x[axis], y[axis])
+        dx = x[diagonal]
+        parts = [np.column_stack(p) for p in (
+            (gx, gy), (gy, gx), (gy, -gx), (gx, -gy),
+            (-gx, -gy), (-gy, -gx), (-gy, gx), (-gx, gy),
+            (np.zeros_like(ax_), ax_), (ax_, np.zeros_like(ax_)),
+            (np.zeros_like(ax_), -ax_), (-ax_, np.zeros_like(ax_)),
+            (dx, dx), (dx, -dx), (-dx, -dx), (-dx, dx))]
+        offsets = np.concatenate(parts).astype(np.int32)
+        offsets.flags.writeable = False
+        return offsets
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def ellipse_offsets(a: int, b: int) -> np.ndarray:
+        if a < 0 or b < 0:
+            raise ValueError("полуоси эллипса должны быть неотрицательными")
+        if a == 0 or b == 0:
+            # вырожденный эллипс — отрезок вдоль оси
+            line = np.arange(-max(a, b), max(a, b) + 1, dtype=np.int32)
+            zeros = np.zeros_like(line)
+            offsets = np.column_stack((zeros, line) if a == 0 else (line, zeros))
+            offsets.flags.writeable = False
+            return offsets
+        a2, b2 = a * a, b * b
+        xs, ys = [], []
+        x, y = 0, b
+        d = 4 * b2 - 4 * a2 * b + a2
+        while b2 * x < a2 * y:
+            xs.append(x)
+            ys.append(y)
+            if d >= 0:
+                y -= 1
+                d -= 8 * a2 * y
+            x += 1
+            d += 4 * b2 * (2 * x + 1)
+        d = b2 * (2 * x + 1) ** 2 + 4 * a2 * (y - 1) ** 2 - 4 * a2 * b2
+        while y >= 0:
+            xs.append(x)
+            ys.append(y)
+            if d < 0:
+                x += 1
+                d += 8 * b2 * x
+            y -= 1
+            d += 4 * a2 * (1 - 2 * y)
+        qx, qy = np.array(xs, dtype=np.int32), np.array(ys, dtype=np.int32)
+
+        # у эллипса только четыре квадранта; точки на осях выводятся дважды, а не четырежды
+        inner = (qx > 0) & (qy > 0)
+        ix, iy = qx[inner], qy[inner]
+        on_y, on_x = qy[qx == 0], qx[(qy == 0) & (qx > 0)]
+        parts = [np.column_stack(p) for p in (
+            (ix, iy), (ix, -iy), (-ix, -iy), (-ix, iy),
+            (np.zeros_like(on_y), on_y), (np.zeros_like(on_y), -on_y),
+            (on_x, np.zeros_like(on_x)), (-on_x, np.zeros_like(on_x)))]
+        offsets = np.concatenate(parts).astype(np.int32)
+        offsets.flags.writeable = False
+        return offsets
+
+    @staticmethod
+    def span_offsets(offsets: np.ndarray) -> np.ndarray:
+        # строка развёртки для каждого y: от самого левого до самого правого пикселя контура
+        if not len(offsets):
+            return np.empty((0, 3), dtype=np.int32)
+        rows, inverse = np.unique(offsets[:, 1], return_inverse=True)
+        left = np.full(len(rows), np.iinfo(np.int32).max, dtype=np.int32)
+        right = np.full(len(rows), np.iinfo(np.int32).min, dtype=np.int32)
+        np.minimum.at(left, inverse, offsets[:, 0])
+        np.maximum.at(right, inverse, offsets[:, 0])
+        return np.column_stack((rows, left, right)).astype(np.int32)
+
+    @staticmethod
+    def circle(xc: int, yc: int, r: int) -> np.ndarray:
+        return ShapeRasterizer.circle_offsets(r) + np.array([xc, yc], dtype=np.int32)
+
+    @staticmethod
+    def ellipse(xc: int, yc: int, a: int, b: int) -> np.ndarray:
+        return ShapeRasterizer.ellipse_offsets(a, b) + np.array([xc, yc], dtype=np.int32)
+
+    @staticmethod
+    def filled_points(spans: np.ndarray) -> np.ndarray:
+        counts = (spans[:, 2] - spans[:, 1] + 1).astype(np.int64)
+        coords = np.empty((int(counts.sum()), 2), dtype=np.int32)
+        coords[:, 0] = np.repeat(spans[:, 1], counts) + _ragged_index(counts)
+        coords[:, 1] = np.repeat(spans[:, 0], counts)
+        return coords
+
+    @staticmethod
+    def _batch(shifts: np.ndarray, keys: np.ndarray, template, out: Optional[np.ndarray]):
+        keys = np.asarray(keys, dtype=np.int64).reshape(len(shifts), -1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        templates = [template(*map(int, key)) for key in unique]
+        counts = np.array([len(t) for t in templates], dtype=np.int64)[inverse]
+        starts = np.cumsum(counts) - counts
+        total = int(counts.sum())
+        width = shifts.shape[1]
+        if out is None:
+            out = np.empty((total, width), dtype=np.int32)
+        elif out.shape[0] < total or out.shape[1:] != (width,):
+            raise ValueError(f"буфер вывода должен вмещать {total} строк по {width} значения")
+
+        # фигуры с одинаковыми параметрами переносятся одним шаблоном
+        for group, offsets in enumerate(templates):
+            if not len(offsets):
+                continue
+            members = np.flatnonzero(inverse == group)
+            rows = starts[members][:, None] + np.arange(len(offsets))
+            out[rows] = shifts[members][:, None, :] + offsets
+        return out[:total], starts, counts
+
+    @staticmethod
+    def _centres(centres: np.ndarray) -> np.ndarray:
+        return np.asarray(centres, dtype=np.int32).reshape(-1, 2)
+
+    @staticmethod
+    def circles(centres: np.ndarray, radii: np.ndarray, out: Optional[np.ndarray] = None):
+        return ShapeRasterizer._batch(ShapeRasterizer._centres(centres), radii,
+                                      ShapeRasterizer.circle_offsets, out)
+
+    @staticmethod
+    def ellipses(centres: np.ndarray, axes: np.ndarray, out: Optional[np.ndarray] = None):
+        return ShapeRasterizer._batch(ShapeRasterizer._centres(centres), axes,
+                                      ShapeRasterizer.ellipse_offsets, out)
+
+    @staticmethod
+    def circle_spans(centres: np.ndarray, radii: np.ndarray, out: Optional[np.ndarray] = None):
+        return ShapeRasterizer._batch(ShapeRasterizer._centres(centres)[:, [1, 0, 0]], radii,
+                                      ShapeRasterizer._circle_span_offsets, out)
+
+    @staticmethod
+    def ellipse_spans(centres: np.ndarray, axes: np.ndarray, out: Optional[np.ndarray] = None):
+        return ShapeRasterizer._batch(ShapeRasterizer._centres(centres)[:, [1, 0, 0]], axes,
+                                      ShapeRasterizer._ellipse_span_offsets, out)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _circle_span_offsets(r: int) -> np.ndarray:
+        return ShapeRasterizer.span_offsets(ShapeRasterizer.circle_offsets(r))
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _ellipse_span_offsets(a: int, b: int) -> np.ndarray:
+        return ShapeRasterizer.span_offsets(ShapeRasterizer.ellipse_offsets(a, b))
+
+    @staticmethod
+    def fill_spans(spans: np.ndarray, framebuffer: np.ndarray, value=255,
+                   workers: Optional[int] = None) -> np.ndarray:
+        if not framebuffer.flags.c_contiguous:
+            raise ValueError("framebuffer должен быть C-непрерывным массивом")
+        h, w = framebuffer.shape[:2]
+        spans = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+        spans = spans[(spans[:, 0] >= 0) & (spans[:, 0] < h) & (spans[:, 2] >= 0) & (spans[:, 1] < w)]
+        left = np.maximum(spans[:, 1], 0)
+        right = np.minimum(spans[:, 2], w - 1)
+        counts = right - left + 1
+        starts = spans[:, 0] * w + left
+        pixels = framebuffer.reshape(h * w, -1)
+
+        def job(start, end):
+            c = counts[start:end]
+            pixels[np.repeat(starts[start:end], c) + _ragged_index(c)] = value
+
+        BatchRasterizer._run_chunks(counts, job, workers)
+        return framebuffer
+
+    @staticmethod
+    def draw_circles(centres: np.ndarray, radii: np.ndarray, framebuffer: np.ndarray,
+                     value=255, filled=False, workers: Optional[int] = None) -> np.ndarray:
+        if filled:
+            spans, _, _ = ShapeRasterizer.circle_spans(centres, radii)
+            return ShapeRasterizer.fill_spans(spans, framebuffer, value, workers)
+        coords, _, _ = ShapeRasterizer.circles(centres, radii)
+        return ShapeRasterizer._plot(coords, framebuffer, value)
+
+    @staticmethod
+    def draw_ellipses(centres: np.ndarray, axes: np.ndarray, framebuffer: np.ndarray,
+                      value=255, filled=False, workers: Optional[int] = None) -> np.ndarray:
+        if filled:
+            spans, _, _ = ShapeRasterizer.ellipse_spans(centres, axes)
+            return ShapeRasterizer.fill_spans(spans, framebuffer, value, workers)
+        coords, _, _ = ShapeRasterizer.ellipses(centres, axes)
+        return ShapeRasterizer._plot(coords, framebuffer, value)
+
+    @staticmethod
+    def _plot(coords: np.ndarray, framebuffer: np.ndarray, value) -> np.ndarray:
+        if not framebuffer.flags.c_contiguous:
+            raise ValueError("framebuffer должен быть C-непрерывным массивом")
+        h, w = framebuffer.shape[:2]
+        x, y = coords[:, 0].astype(np.int64), coords[:, 1].astype(np.int64)
+        inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+        framebuffer.reshape(h * w, -1)[(y * w + x)[inside]] = value
+        return framebuffer
+
+class PolygonRasterizer:
+    @staticmethod
+    def _rings(vertices) -> List[np.ndarray]:
+        if isinstance(vertices, np.ndarray) and vertices.ndim == 2:
+            vertices = [vertices]
+        elif len(vertices) and np.ndim(vertices[0]) == 1:
+            vertices = [vertices]
+        return [np.asarray(ring, dtype=np.int64).reshape(-1, 2) for ring in vertices]
+
+    @staticmethod
+    def _clip_range(a1, b1, a2, b2, steep, bounds):
+        # диапазон шагов i, при котором пиксель может попасть в окно: по большой оси
+        # точно, по малой с запасом в пиксель; остальное отсекает итоговая маска
+        n = len(a1)
+        lo = np.zeros(n, dtype=np.int64)
+        hi = a2 - a1
+        if bounds is None:
+            return lo, hi
+        xmin, ymin, xmax, ymax = bounds
+        major_lo = np.where(steep, ymin, xmin)
+        major_hi = np.where(steep, ymax, xmax)
+        minor_lo = np.where(steep, xmin, ymin)
+        minor_hi = np.where(steep, xmax, ymax)
+        lo = np.maximum(lo, major_lo - a1)
+        hi = np.minimum(hi, major_hi - a1)
+        
+        dx = np.maximum(a2 - a1, 1)
+        slope = (b2 - b1) / dx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t1 = (minor_lo - 1 - b1) / slope
+            t2 = (minor_hi + 1 - b1) / slope
+        flat = slope == 0
+        inside = (b1 >= minor_lo) & (b1 <= minor_hi)
+        t_lo = np.where(flat, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+        t_hi = np.where(flat, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+        lo = np.maximum(lo, np.floor(np.clip(t_lo, -1, hi + 1)).astype(np.int64))
+        hi = np.minimum(hi, np.ceil(np.clip(t_hi, -1, hi + 1)).astype(np.int64))
+        return lo, hi
+
+    @staticmethod
+    def polyline(vertices, closed: bool = False, bounds: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        parts = []
+        for ring in PolygonRasterizer._rings(vertices):
+            if closed and len(ring) > 1:
+                ring = np.vstack((ring, ring[:1]))
+            if len(ring) == 1:
+                parts.append(ring.astype(np.int32))
+                continue
+            segments = np.hstack((ring[:-1], ring[1:]))
+            steep, a1, b1, a2, b2 = _major_axis_form(segments)
+            swap = (segments[:, 0] != np.where(steep, b1, a1)) | (segments[:, 1] != np.where(steep, a1, b1))
+            lo, hi = PolygonRasterizer._clip_range(a1, b1, a2, b2, steep, bounds)
+            
+            # общая вершина принадлежит предыдущему звену; у замкнутой ломаной
+            # последнее звено не повторяет и первую вершину
+            skip_start = np.ones(len(segments), dtype=bool)
+            skip_start[0] = False
+            skip_end = np.zeros(len(segments), dtype=bool)
+            if closed:
+                skip_end[-1] = True
+            drop_lo = np.where(swap, skip_end, skip_start)
+            drop_hi = np.where(swap, skip_start, skip_end)
+            dx = a2 - a1
+            lo = np.maximum(lo, drop_lo.astype(np.int64))
+            hi = np.minimum(hi, dx - drop_hi)
+            counts = np.maximum(hi - lo + 1, 0)
+            
+            r = _ragged_index(counts)
+            # пиксели каждого звена идут в направлении обхода
+            i = np.where(np.repeat(swap, counts), np.repeat(hi, counts) - r, np.repeat(lo, counts) + r)
+            dy = np.abs(b2 - b1)
+            step = np.where(b1 < b2, 1, -1)
+            divisor = np.maximum(dx, 1)
+            bias = divisor - 1 - dx // 2
+            minor = np.repeat(b1, counts) + np.repeat(step, counts) * (
+                (i * np.repeat(dy, counts) + np.repeat(bias, counts)) // np.repeat(divisor, counts))
+            major = np.repeat(a1, counts) + i
+            is_steep = np.repeat(steep, counts)
+            coords = np.column_stack((np.where(is_steep, minor, major),
+                                      np.where(is_steep, major, minor)))
+            if bounds is not None:
+                xmin, ymin, xmax, ymax = bounds
+                coords = coords[(coords[:, 0] >= xmin) & (coords[:, 0] <= xmax) &
+                                (coords[:, 1] >= ymin) & (coords[:, 1] <= ymax)]
+            parts.append(coords.astype(np.int32))
+        if not parts:
+            return np.empty((0, 2), dtype=np.int32)
+        return np.concatenate(parts)
+
+    @staticmethod
+    def _edge_table(vertices):
+        rings = [ring for ring in PolygonRasterizer._rings(vertices) if len(ring) > 2]
+        if not rings:
+            return None
+        start = np.concatenate(rings).astype(np.float64)
+        end = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings]).astype(np.float64)
+        # горизонтальные рёбра не пересекают строки развёртки
+        keep = start[:, 1] != end[:, 1]
+        start, end = start[keep], end[keep]
+        winding = np.where(end[:, 1] > start[:, 1], 1, -1)
+        low = np.where((winding > 0)[:, None], start, end)
+        high = np.where((winding > 0)[:, None], end, start)
+        # ребро активно на строках ceil(y_low) <= y < ceil(y_high): вершина учитывается один раз
+        y_first = np.ceil(low[:, 1]).astype(np.int64)
+        y_last = np.ceil(high[:, 1]).astype(np.int64) - 1
+        inverse_slope = (high[:, 0] - low[:, 0]) / (high[:, 1] - low[:, 1])
+        order = np.argsort(y_first, kind="stable")
+        return (y_first[order], y_last[order], low[order, 0], low[order, 1],
+                inverse_slope[order], winding[order])
+
+    @staticmethod
+    def scanline_spans(vertices, bounds: Optional[Tuple[int, int, int, int]] = None,
+                       rule: str = "evenodd") -> np.ndarray:
+        table = PolygonRasterizer._edge_table(vertices)
+        if table is None:
+            return np.empty((0, 3), dtype=np.int32)
+        y_first, y_last, x_low, y_low, inverse_slope, winding = table
+        top, bottom = int(y_first.min()), int(y_last.max())
+        if bounds is not None:
+            xmin, ymin, xmax, ymax = bounds
+            top, bottom = max(top, ymin), min(bottom, ymax)
+        
+        spans = []
+        next_edge = 0
+        active = np.empty(0, dtype=np.int64)
+        # рёбра, начинающиеся выше окна, входят в таблицу сразу на первой видимой строке
+        for y in range(top, bottom + 1):
+            entering = int(np.searchsorted(y_first, y, side="right"))
+            if entering > next_edge:
+                active = np.concatenate((active, np.arange(next_edge, entering)))
+                next_edge = entering
+            if not len(active):
+                if next_edge == len(y_first):
+                    break
+                continue
+            active = active[y_last[active] >= y]
+            if not len(active):
+                continue
+            
+            xs = x_low[active] + (y - y_low[active]) * inverse_slope[active]
+            order = np.argsort(xs, kind="stable")
+            xs = xs[order]
+            if rule == "nonzero":
+                depth = np.cumsum(winding[active][order])
+                opens = np.flatnonzero((depth != 0) & np.concatenate(([True], depth[:-1] == 0)))
+                closes = np.flatnonzero((depth == 0) & np.concatenate(([False], depth[:-1] != 0)))
+                left, right = xs[opens], xs[closes]
+            else:
+                left, right = xs[0::2], xs[1::2]
+            left = np.ceil(left).astype(np.int64)
+            right = np.floor(right).astype(np.int64)
+            if bounds is not None:
+                left = np.maximum(left, xmin)
+                right = np.minimum(right, xmax)
+            filled = left <= right
+            if filled.any():
+                spans.append(np.column_stack((np.full(int(filled.sum()), y), left[filled], right[filled])))
+        if not spans:
+            return np.empty((0, 3), dtype=np.int32)
+        return np.concatenate(spans).astype(np.int32)
+
+    @staticmethod
+    def draw_polyline(vertices, framebuffer: np.ndarray, value=255, closed: bool = False) -> np.ndarray:
+        h, w = framebuffer.shape[:2]
+        coords = PolygonRasterizer.polyline(vertices, closed, bounds=(0, 0, w - 1, h - 1))
+        return ShapeRasterizer._plot(coords, framebuffer, value)
+
+    @staticmethod
+    def fill_polygon(vertices, framebuffer: np.ndarray, value=255, rule: str = "evenodd",
+                     workers: Optional[int] = None) -> np.ndarray:
+        h, w = framebuffer.shape[:2]
+        spans = PolygonRasterizer.scanline_spans(vertices, bounds=(0, 0, w - 1, h - 1), rule=rule)
+        return ShapeRasterizer.fill_spans(spans, framebuffer, value, workers)
+
+def array_to_points(coords: np.ndarray) -> List[Point]:
+    return [Point(x, y) for x, y in coords.tolist()]
+
+def _float_dda_reference(segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # построчное накопление вдоль оси 1 повторяет сложения скалярной версии
+    x1, y1, x2, y2 = segments.T
+    dx, dy = x2 - x1, y2 - y1
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    width = int(steps.max(initial=0)) + 1
+    valid = np.arange(width) <= steps[:, None]
+    coords = np.empty(valid.shape + (2,), dtype=np.int64)
+    safe = np.maximum(steps, 1)
+    for axis, start, delta in ((0, x1, dx), (1, y1, dy)):
+        acc = np.repeat((delta / safe)[:, None], width, axis=1)
+        acc[:, 0] = start
+        np.add.accumulate(acc, axis=1, out=acc)
+        coords[..., axis] = np.round(acc)
+    return coords, valid
+
+def _float_wu_reference(segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    steep, a1, b1, a2, b2 = _major_axis_form(segments)
+    dx, dy = a2 - a1, b2 - b1
+    gradient = np.where(dx == 0, 1.0, dy / np.maximum(dx, 1))
+    n = np.maximum(dx - 1, 0)
+    width = int(n.max(initial=0))
+    inner = np.arange(width) < n[:, None]
+    intery = np.repeat(gradient[:, None], width, axis=1)
+    if width:
+        intery[:, 0] = b1 + gradient
+        np.add.accumulate(intery, axis=1, out=intery)
+    whole, frac = np.trunc(intery), np.mod(intery, 1)
+    
+    cols = 4 + 2 * width
+    major = np.empty((len(segments), cols), dtype=np.int64)
+    minor = np.empty((len(segments), cols), dtype=np.int64)
+    intensity = np.empty((len(segments), cols))
+    major[:, :4] = np.column_stack((a1, a1, a2, a2))
+    minor[:, :4] = np.column_stack((b1, b1 + 1, b2, b2 + 1))
+    intensity[:, :4] = (0.5, 0, 0.5, 0)
+    major[:, 4::2] = major[:, 5::2] = a1[:, None] + np.arange(1, width + 1)
+    minor[:, 4::2] = whole
+    minor[:, 5::2] = whole + 1
+    intensity[:, 4::2] = 1 - frac
+    intensity[:, 5::2] = frac
+    coords = np.stack((np.where(steep[:, None], minor, major),
+                       np.where(steep[:, None], major, minor)), axis=-1)
+    valid = np.ones((len(segments), cols), dtype=bool)
+    valid[:, 4::2] = valid[:, 5::2] = inner
+    return coords, intensity, valid
+
+def _exact_dda(segments: np.ndarray, width: int) -> np.ndarray:
+    # round(start + i·d/steps) в целых числах, половина к чётному
+    x1, y1, x2, y2 = segments.T
+    dx, dy = x2 - x1, y2 - y1
+    steps = np.maximum(np.maximum(np.abs(dx), np.abs(dy)), 1)[:, None]
+    i = np.arange(width)
+    coords = np.empty((len(segments), width, 2), dtype=np.int64)
+    for axis, start, delta in ((0, x1, dx), (1, y1, dy)):
+        q, r = np.divmod(start[:, None] * steps + i * delta[:, None], steps)
+        coords[..., axis] = q + ((2 * r > steps) | ((2 * r == steps) & (q & 1 == 1)))
+    return coords
+
+def _exact_wu_minor(segments: np.ndarray, width: int) -> np.ndarray:
+    _, a1, b1, a2, b2 = _major_axis_form(segments)
+    dx = np.maximum(a2 - a1, 1)[:, None]
+    q, r = np.divmod(b1[:, None] * dx + np.arange(1, width + 1) * (b2 - b1)[:, None], dx)
+    return q + ((q < 0) & (r != 0)), r / dx
+
+def random_segments(rng: np.random.Generator, n: int, max_length: int, coord_range: int) -> np.ndarray:
+    start = rng.integers(-coord_range, coord_range, (n, 2))
+    delta = rng.integers(-max_length, max_length + 1, (n, 2))
+    # отдельно вырожденные случаи: точка, оси и диагонали
+    kind = rng.integers(0, 8, n)
+    delta[kind == 0] = 0
+    delta[kind == 1, 1] = 0
+    delta[kind == 2, 0] = 0
+    delta[kind == 3, 1] = delta[kind == 3, 0] * rng.choice([-1, 1], int((kind == 3).sum()))
+    return np.hstack((start, start + delta))
+
+def fixed_point_harness(n_segments: int = 1_000_000, max_length: int = 64, coord_range: int = 1 << 12,
+                        seed: int = 0, chunk: int = 1 << 14, progress=None) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    fp = FixedPointRasterAlgorithms
+    stats = {
+        name: {"Алгоритм": name, "Отрезков": 0, "Пикселей": 0, "Несовпавших пикселей": 0,
+               "Макс. отклонение, пикс.": 0, "Макс. отклонение интенсивности": 0.0,
+               "Несовпадений, где 16.16 точен": 0, "Макс. ошибка интенсивности от точной": 0.0}
+        for name in ("ЦДА 16.16", "Ву 16.16", "Ву 8 бит")
+    }
+    
+    def update(name, deviation, valid, exact, intensity_dev=None, exact_dev=None):
+        row = stats[name]
+        mismatch = (deviation > 0) & valid
+        row["Отрезков"] += len(valid)
+        row["Пикселей"] += int(valid.sum())
+        row["Несовпавших пикселей"] += int(mismatch.sum())
+        row["Несовпадений, где 16.16 точен"] += int((mismatch & exact).sum())
+        row["Макс. отклонение, пикс."] = max(row["Макс. отклонение, пикс."],
+                                             int(deviation[valid].max(initial=0)))
+        if intensity_dev is not None:
+            # интенсивности сравниваются только там, где совпали сами пиксели
+            row["Макс. отклонение интенсивности"] = max(row["Макс. отклонение интенсивности"],
+                                                        float(intensity_dev[valid & ~mismatch].max(initial=0)))
+            row["Макс. ошибка интенсивности от точной"] = max(row["Макс. ошибка интенсивности от точной"],
+                                                              float(exact_dev[valid].max(initial=0)))
+    
+    done = 0
+    while done < n_segments:
+        segments = random_segments(rng, min(chunk, n_segments - done), max_length, coord_range)
+        
+        ref, valid = _float_dda_reference(segments)
+        got, _ = fp.dda_kernel(segments)
+        exact = (got == _exact_dda(segments, got.shape[1])).all(axis=-1)
+        update("ЦДА 16.16", np.abs(got - ref).max(axis=-1), valid, exact)
+        
+        ref, ref_intensity, valid = _float_wu_reference(segments)
+        got, intensity, _ = fp.wu_kernel(segments)
+        deviation = np.abs(got - ref).max(axis=-1)
+        steep = _major_axis_form(segments)[0][:, None]
+        minor = np.where(steep, got[..., 0], got[..., 1])
+        whole, frac = _exact_wu_minor(segments, (got.shape[1] - 4) // 2)
+        exact_intensity = np.empty(intensity.shape)
+        exact_intensity[:, :4] = (0.5, 0, 0.5, 0)
+        exact_intensity[:, 4::2] = 1 - frac
+        exact_intensity[:, 5::2] = frac
+        exact = np.ones(valid.shape, dtype=bool)
+        exact[:, 4::2] = minor[:, 4::2] == whole
+        exact[:, 5::2] = minor[:, 5::2] == whole + 1
+        update("Ву 16.16", deviation, valid, exact, np.abs(intensity - ref_intensity),
+               np.abs(intensity - exact_intensity))
+        got, coverage, _ = fp.wu_kernel(segments, coverage8=True)
+        update("Ву 8 бит", deviation, valid, exact, np.abs(coverage / 255 - ref_intensity),
+               np.abs(coverage / 255 - exact_intensity))
+        
+        done += len(segments)
+        if progress is not None:
+            progress(done / n_segments)
+    
+    for row in stats.values():
+        row["Доля несовпадений"] = row["Несовпавших пикселей"] / max(row["Пикселей"], 1)
+    stats["ЦДА 16.16"]["Макс. отклонение интенсивности"] = None
+    stats["ЦДА 16.16"]["Макс. ошибка интенсивности от точной"] = None
+    return list(stats.values())
+
+def measure_point_memory(n: int = 10_000) -> List[dict]:
+    coords = VectorizedRasterAlgorithms.bresenham_line(0, 0, n - 1, n // 3)
+    intensity = np.linspace(0, 1, len(coords), dtype=np.float32)
+
+    def traced(build):
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            obj = build()
+            size = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        del obj
+        return size
+
+    rows = []
+    for name, build in (
+        ("List[Point]", lambda: array_to_points(coords)),
+        ("PointBuffer", lambda: PointBuffer.from_array(coords)),
+        ("List[Tuple[Point, float]] (Ву)",
+         lambda: list(zip(array_to_points(coords), intensity.tolist()))),
+        ("WuPointBuffer (Ву)", lambda: WuPointBuffer.from_arrays(coords, intensity)),
+    ):
+        size = traced(build)
+        rows.append({"Представление": name, "Точек": len(coords),
+                     "Байт всего": size, "Байт на точку": round(size / len(coords), 1)})
+    return rows
+
+BENCHMARK_ALGORITHMS = {
+    "Пошаговый": ("step_by_step", "line"),
+    "ЦДА": ("dda", "line"),
+    "Брезенхем (отрезок)": ("bresenham_line", "line"),
+    "Ву": ("wu_line", "line"),
+    "Брезенхем (окружность)": ("bresenham_circle", "circle"),
+}
+
+def time_call(func, args, warmup=3, repeats=15, min_sample_time=0.002) -> np.ndarray:
+    for _ in range(warmup):
+        func(*args)
+    # короткие вызовы группируются, чтобы один замер был заметно дольше разрешения таймера
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        if time.perf_counter() - start >= min_sample_time or number >= 1 << 16:
+            break
+        number *= 2
+    samples = np.empty(repeats)
+    for k in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        samples[k] = (time.perf_counter() - start) / number
+    return samples
+
+def _sample_stats(samples: np.ndarray) -> Tuple[float, float]:
+    q1, median, q3 = np.percentile(samples * 1e6, [25, 50, 75])
+    return float(median), float(q3 - q1)
+
+def benchmark_cases(lengths, slopes, radii) -> List[Tuple[str, str, tuple]]:
+    cases = []
+    for name, (_, kind) in BENCHMARK_ALGORITHMS.items():
+        if kind == "line":
+            for length in lengths:
+                for slope in slopes:
+                    angle = math.radians(slope)
+                    x2 = int(round(length * math.cos(angle)))
+                    y2 = int(round(length * math.sin(angle)))
+                    cases.append((name, f"L={length}, {slope}°", (0, 0, x2, y2)))
+        else:
+            for r in radii:
+                cases.append((name, f"R={r}", (0, 0, r)))
+    return cases
+
+def benchmark_rasterization(lengths, slopes, radii, warmup=3, repeats=15,
+                            progress=None) -> List[dict]:
+    scalar, vectorized = RasterAlgorithms(), VectorizedRasterAlgorithms()
+    cases = benchmark_cases(lengths, slopes, radii)
+    rows = []
+    for done, (name, label, args) in enumerate(cases):
+        method = BENCHMARK_ALGORITHMS[name][0]
+        scalar_med, scalar_iqr = _sample_stats(time_call(getattr(scalar, method), args, warmup, repeats))
+        vector_med, vector_iqr = _sample_stats(time_call(getattr(vectorized, method), args, warmup, repeats))
+        rows.append({
+            "Алгоритм": name,
+            "Параметры": label,
+            "Пикселей": len(getattr(scalar, method)(*args)),
+            "Скалярный, мкс": round(scalar_med, 2),
+            "Скалярный IQR, мкс": round(scalar_iqr, 2),
+            "Векторизованный, мкс": round(vector_med, 2),
+            "Векторизованный IQR, мкс": round(vector_iqr, 2),
+            "Ускорение": round(scalar_med / vector_med, 2) if vector_med > 0 else None,
+        })
+        if progress is not None:
+            progress((done + 1) / len(cases))
+    return rows
+
+def benchmark_report(rows: List[dict], **settings) -> dict:
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "settings": settings,
+        "results": rows,
+    }
+
+def show_rasterization_benchmark():
+    col_l, col_s, col_r = st.columns(3)
+    with col_l:
+        lengths = st.multiselect("Длины отрезков", [10, 100, 1_000, 10_000], default=[10, 100, 1_000])
+    with col_s:
+        slopes = st.multiselect("Наклоны, градусы", [0, 15, 30, 45, 60, 90], default=[0, 30, 45])
+    with col_r:
+        radii = st.multiselect("Радиусы окружностей", [8, 64, 512, 4096], default=[8, 64, 512])
+    col_w, col_n = st.columns(2)
+    with col_w:
+        warmup = st.number_input("Прогревочных запусков", 0, 20, 3)
+    with col_n:
+        repeats = st.number_input("Замеров на случай", 3, 100, 15)
+    
+    if st.button("Запустить измерения"):
+        progress = st.progress(0.0)
+        rows = benchmark_rasterization(sorted(lengths), sorted(slopes), sorted(radii),
+                                       int(warmup), int(repeats), progress.progress)
+        progress.empty()
+        st.session_state.raster_benchmark = benchmark_report(
+            rows, lengths=sorted(lengths), slopes=sorted(slopes), radii=sorted(radii),
+            warmup=int(warmup), repeats=int(repeats))
+    
+    report = st.session_state.get("raster_benchmark")
+    if not report:
+        st.info("Нажмите 'Запустить измерения', чтобы получить таблицу для этой машины")
+        return
+    
+    rows = report["results"]
+    machine = report["machine"]
+    st.write(f"**Машина:** {machine['processor']}, {machine['cpu_count']} ядер, "
+             f"Python {machine['python']}, NumPy {machine['numpy']}")
+    st.dataframe(rows, use_container_width=True)
+    
+    st.write("**Медианное время (мкс) по случаям**")
+    st.bar_chart({
+        "Случай": [f"{r['Алгоритм']}: {r['Параметры']}" for r in rows],
+        "Скалярный": [r["Скалярный, мкс"] for r in rows],
+        "Векторизованный": [r["Векторизованный, мкс"] for r in rows],
+    }, x="Случай", y=["Скалярный", "Векторизованный"], horizontal=True)
+    
+    st.write("**Время на пиксель (нс) от числа пикселей, скалярные версии**")
+    per_pixel = {}
+    for r in rows:
+        per_pixel.setdefault(r["Алгоритм"], []).append(
+            (r["Пикселей"], r["Скалярный, мкс"] * 1000 / max(r["Пикселей"], 1)))
+    st.line_chart({name: dict(sorted(values)) for name, values in per_pixel.items()})
+    
+    st.download_button("Скачать результаты (JSON)",
+                       json.dumps(report, ensure_ascii=False, indent=2),
+                       file_name="raster_benchmark.json", mime="application/json")
+
+def _plot_arrays(points, wu_points=None):
+    if wu_points is not None and len(wu_points):
+        if isinstance(wu_points, WuPointBuffer):
+            return wu_points.points.to_numpy(), wu_points.intensity
+        coords = np.array([(p.x, p.y) for p, _ in wu_points], dtype=np.int32)
+        return coords, np.array([i for _, i in wu_points], dtype=np.float32)
+    if isinstance(points, PointBuffer):
+        return points.to_numpy(), None
+    if isinstance(points, np.ndarray):
+        return points.reshape(-1, 2), None
+    return np.array([(p.x, p.y) for p in points], dtype=np.int32).reshape(-1, 2), None
+
+class PlotRenderer:
+    def __init__(self, figsize=(10, 10), dpi=100, max_backgrounds=8):
+        self.figsize = figsize
+        self.dpi = dpi
+        self.max_backgrounds = max_backgrounds
+        self._backgrounds = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build_background(self, grid_size, show_grid):
+        fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        
+        if show_grid:
+            ax.set_xticks(np.arange(-grid_size, grid_size + 1, 1))
+            ax.set_yticks(np.arange(-grid_size, grid_size + 1, 1))
+            ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
+            ax.set_axisbelow(True)
+        
+        ax.axhline(y=0, color='black', linewidth=0.5)
+        ax.axvline(x=0, color='black', linewidth=0.5)
+        
+        ax.set_xlim(-grid_size, grid_size)
+        ax.set_ylim(-grid_size, grid_size)
+        
+        ax.set_xlabel('X координата', fontsize=12)
+        ax.set_ylabel('Y координата', fontsize=12)
+        ax.set_aspect('equal', adjustable='box')
+        
+        if show_grid:
+            # все узлы сетки одним вызовом вместо (2·grid_size+1)² вызовов ax.plot
+            nodes = np.arange(-grid_size, grid_size + 1)
+            gx, gy = np.meshgrid(nodes, nodes)
+            ax.scatter(gx.ravel(), gy.ravel(), s=9, color='lightgray', alpha=0.5,
+                       marker='o', linewidths=0)
+        
+        title = ax.set_title("", fontsize=14, pad=20)
+        pixels = ax.scatter([], [], s=64, marker='s', linewidths=0, animated=True)
+        canvas.draw()
+        background = canvas.copy_from_bbox(fig.bbox)
+        return fig, canvas, ax, title, pixels, background
+
+    def _background(self, grid_size, show_grid):
+        key = (grid_size, show_grid)
+        if key in self._backgrounds:
+            self._backgrounds.move_to_end(key)
+        else:
+            self._backgrounds[key] = self._build_background(grid_size, show_grid)
+            while len(self._backgrounds) > self.max_backgrounds:
+                self._backgrounds.popitem(last=False)
+        return self._backgrounds[key]
+
+    def render(self, points, title, grid_size=20, show_grid=True,
+               wu_points=None, circle=False) -> bytes:
+        coords, intensity = _plot_arrays(points, wu_points)
+        if circle:
+            colors = np.tile(to_rgba('red'), (len(coords), 1))
+        elif intensity is not None:
+            colors = np.tile(to_rgba('blue'), (len(coords), 1))
+            colors[:, 3] = np.clip(intensity, 0, 1)
+        else:
+            colors = np.tile(to_rgba('blue'), (len(coords), 1))
+        
+        with self._lock:
+            fig, canvas, ax, title_artist, pixels, background = self._background(grid_size, show_grid)
+            canvas.restore_region(background)
+            
+            title_artist.set_text(title)
+            title_artist.set_animated(True)
+            pixels.set_offsets(coords if len(coords) else np.empty((0, 2)))
+            pixels.set_facecolors(colors)
+            ax.draw_artist(pixels)
+            fig.draw_artist(title_artist)
+            
+            if 0 < len(coords) < 20:
+                for x, y in coords[:10].tolist():
+                    label = ax.text(x + 0.2, y + 0.2, f'({x},{y})', fontsize=8, alpha=0.7)
+                    ax.draw_artist(label)
+                    label.remove()
+            
+            image = np.asarray(canvas.buffer_rgba()).copy()
+        
+        buffer = io.BytesIO()
+        plt.imsave(buffer, image, format='png')
+        return buffer.getvalue()
+
+@st.cache_resource
+def get_plot_renderer() -> PlotRenderer:
+    return PlotRenderer()
+
 def create_plot(points, title, grid_size=20, show_grid=True, 
                 wu_points=None, circle=False):
     fig, ax = plt.subplots(figsize=(10, 10))
@@ -262,6 +1765,137 @@ def create_plot(points, title, grid_size=20, show_grid=True,
     ax.set_aspect('equal', adjustable='box')
     return fig
 
+def parse_vertices(text: str) -> Tuple[Tuple[int, int], ...]:
+    vertices = []
+    for chunk in text.replace("\n", ";").split(";"):
+        if not chunk.strip():
+            continue
+        parts = chunk.replace(" ", "").split(",")
+        if len(parts) != 2:
+            raise ValueError(f"ожидалась пара x,y, получено '{chunk.strip()}'")
+        vertices.append((int(parts[0]), int(parts[1])))
+    return tuple(vertices)
+
+def rasterize(algorithm: str, params: tuple, vectorized: bool = False) -> dict:
+    raster = VectorizedRasterAlgorithms() if vectorized else RasterAlgorithms()
+    points = []
+    wu_points = None
+    circle = False
+    
+    start_time = time.perf_counter()
+    
+    if algorithm == "Пошаговый алгоритм":
+        x1, y1, x2, y2 = params
+        points = raster.step_by_step(x1, y1, x2, y2)
+        title = f"Пошаговый алгоритм: ({x1},{y1}) → ({x2},{y2})"
+        
+    elif algorithm == "Алгоритм ЦДА":
+        x1, y1, x2, y2 = params
+        points = raster.dda(x1, y1, x2, y2)
+        title = f"Алгоритм ЦДА: ({x1},{y1}) → ({x2},{y2})"
+        
+    elif algorithm == "Алгоритм Брезенхема (отрезок)":
+        x1, y1, x2, y2 = params
+        points = raster.bresenham_line(x1, y1, x2, y2)
+        title = f"Алгоритм Брезенхема (отрезок): ({x1},{y1}) → ({x2},{y2})"
+        
+    elif algorithm == "Алгоритм Брезенхема (окружность)":
+        xc, yc, radius, filled = params
+        if filled:
+            spans, _, _ = ShapeRasterizer.circle_spans([[xc, yc]], [radius])
+            points = ShapeRasterizer.filled_points(spans)
+        else:
+            points = raster.bresenham_circle(xc, yc, radius)
+        title = f"Алгоритм Брезенхема (окружность): центр ({xc},{yc}), радиус {radius}"
+        circle = True
+    
+    elif algorithm == "Эллипс (алгоритм средней точки)":
+        xc, yc, semi_a, semi_b, filled = params
+        if filled:
+            spans, _, _ = ShapeRasterizer.ellipse_spans([[xc, yc]], [[semi_a, semi_b]])
+            points = ShapeRasterizer.filled_points(spans)
+        elif vectorized:
+            points = ShapeRasterizer.ellipse(xc, yc, semi_a, semi_b)
+        else:
+            points = raster.midpoint_ellipse(xc, yc, semi_a, semi_b)
+        title = f"Эллипс (алгоритм средней точки): центр ({xc},{yc}), полуоси {semi_a}, {semi_b}"
+        circle = True
+        
+    elif algorithm == "Ломаная / многоугольник":
+        vertices, closed, filled = params
+        if not vertices:
+            raise ValueError("нужна хотя бы одна вершина")
+        if filled:
+            points = ShapeRasterizer.filled_points(PolygonRasterizer.scanline_spans(np.array(vertices)))
+            title = f"Заливка многоугольника: {len(vertices)} вершин"
+        else:
+            points = PolygonRasterizer.polyline(np.array(vertices), closed)
+            title = f"{'Замкнутая ломаная' if closed else 'Ломаная'}: {len(vertices)} вершин"
+        
+    elif algorithm == "Алгоритм Ву (сглаживание)":
+        x1, y1, x2, y2 = params
+        wu_points = raster.wu_line(x1, y1, x2, y2)
+        if vectorized:
+            wu_points = WuPointBuffer.from_arrays(*wu_points)
+            points = wu_points.points
+        else:
+            points = [p for p, _ in wu_points]
+        title = f"Алгоритм Ву (сглаживание): ({x1},{y1}) → ({x2},{y2})"
+    
+    else:
+        raise ValueError(f"неизвестный алгоритм: {algorithm}")
+    
+    end_time = time.perf_counter()
+    
+    if isinstance(points, np.ndarray):
+        points = PointBuffer.from_array(points)
+    
+    return {"points": points, "wu_points": wu_points, "title": title, "circle": circle,
+            "execution_time": (end_time - start_time) * 1000}
+
+class RasterMemo:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+@st.cache_resource
+def get_raster_memo() -> RasterMemo:
+    return RasterMemo()
+
+def figure_to_png(fig) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+    return buffer.getvalue()
+
 def main():
     st.title("📐 Лабораторная работа 4: Базовые растровые алгоритмы")
     st.markdown("**Визуализация алгоритмов растеризации отрезков и кривых**")
@@ -275,10 +1909,35 @@ def main():
             "Выберите алгоритм:",
             ["Пошаговый алгоритм", "Алгоритм ЦДА", 
              "Алгоритм Брезенхема (отрезок)", "Алгоритм Брезенхема (окружность)",
-             "Алгоритм Ву (сглаживание)"]
+             "Алгоритм Ву (сглаживание)", "Эллипс (алгоритм средней точки)",
+             "Ломаная / многоугольник"]
         )
         
-        if algorithm != "Алгоритм Брезенхема (окружность)":
+        if algorithm == "Ломаная / многоугольник":
+            vertices_text = st.text_input("Вершины (x,y; x,y; ...)", "-15,-10; 12,-14; 16,8; 0,15; -8,2")
+            closed = st.checkbox("Замкнуть ломаную", value=True)
+            filled = st.checkbox("Заливка (таблица активных рёбер)", value=False)
+            try:
+                vertices = parse_vertices(vertices_text)
+            except ValueError as e:
+                st.error(f"Ошибка в списке вершин: {e}")
+                vertices = ()
+            params = (vertices, closed, filled)
+        elif algorithm == "Эллипс (алгоритм средней точки)":
+            col_xc, col_yc = st.columns(2)
+            with col_xc:
+                xc = st.slider("Центр X", -15, 15, 0)
+            with col_yc:
+                yc = st.slider("Центр Y", -15, 15, 0)
+            
+            col_a, col_b = st.columns(2)
+            with col_a:
+                semi_a = st.slider("Полуось a", 1, 15, 10)
+            with col_b:
+                semi_b = st.slider("Полуось b", 1, 15, 6)
+            filled = st.checkbox("Заливка (строки развёртки)", value=False)
+            params = (xc, yc, semi_a, semi_b, filled)
+        elif algorithm != "Алгоритм Брезенхема (окружность)":
             col_x1, col_y1 = st.columns(2)
             with col_x1:
                 x1 = st.slider("X1", -20, 20, -5)
@@ -290,6 +1949,7 @@ def main():
                 x2 = st.slider("X2", -20, 20, 10)
             with col_y2:
                 y2 = st.slider("Y2", -20, 20, 8)
+            params = (x1, y1, x2, y2)
         else:
             col_xc, col_yc = st.columns(2)
             with col_xc:
@@ -298,14 +1958,16 @@ def main():
                 yc = st.slider("Центр Y", -15, 15, 0)
             
             radius = st.slider("Радиус", 1, 15, 8)
+            filled = st.checkbox("Заливка (строки развёртки)", value=False)
+            params = (xc, yc, radius, filled)
         
         grid_size = st.slider("Размер сетки", 10, 50, 20)
         show_grid = st.checkbox("Показать сетку", value=True)
+        vectorized = st.checkbox("Векторизованная реализация (NumPy)", value=False)
+        fast_render = st.checkbox("Быстрая отрисовка (кэш фона сетки)", value=True)
         
         if st.button("Выполнить растеризацию", type="primary"):
-            with st.spinner("Выполняется растеризация..."):
-                time.sleep(0.5)
-                st.session_state.run_calculation = True
+            st.session_state.run_calculation = True
         else:
             if 'run_calculation' not in st.session_state:
                 st.session_state.run_calculation = False
@@ -313,49 +1975,36 @@ def main():
     with col2:
         st.header("Визуализация")
         
-        raster = RasterAlgorithms()
-        
         if st.session_state.run_calculation:
             try:
-                points = []
-                wu_points = None
-                circle = False
-                
-                start_time = time.perf_counter()
-                
-                if algorithm == "Пошаговый алгоритм":
-                    points = raster.step_by_step(x1, y1, x2, y2)
-                    title = f"Пошаговый алгоритм: ({x1},{y1}) → ({x2},{y2})"
-                    
-                elif algorithm == "Алгоритм ЦДА":
-                    points = raster.dda(x1, y1, x2, y2)
-                    title = f"Алгоритм ЦДА: ({x1},{y1}) → ({x2},{y2})"
-                    
-                elif algorithm == "Алгоритм Брезенхема (отрезок)":
-                    points = raster.bresenham_line(x1, y1, x2, y2)
-                    title = f"Алгоритм Брезенхема (отрезок): ({x1},{y1}) → ({x2},{y2})"
-                    
-                elif algorithm == "Алгоритм Брезенхема (окружность)":
-                    points = raster.bresenham_circle(xc, yc, radius)
-                    title = f"Алгоритм Брезенхема (окружность): центр ({xc},{yc}), радиус {radius}"
-                    circle = True
-                    
-                elif algorithm == "Алгоритм Ву (сглаживание)":
-                    wu_points = raster.wu_line(x1, y1, x2, y2)
-                    points = [p for p, _ in wu_points]
-                    title = f"Алгоритм Ву (сглаживание): ({x1},{y1}) → ({x2},{y2})"
-                
-                end_time = time.perf_counter()
-                execution_time = (end_time - start_time) * 1000
+                memo = get_raster_memo()
+                key = (algorithm, params, vectorized)
+                result = memo.get(key)
+                cached = result is not None
+                if not cached:
+                    result = memo.put(key, rasterize(algorithm, params, vectorized))
+                points, wu_points = result["points"], result["wu_points"]
+                title, circle = result["title"], result["circle"]
+                execution_time = result["execution_time"]
                 
-                fig = create_plot(points, title, grid_size, show_grid, wu_points, circle)
-                st.pyplot(fig)
+                image_key = key + (grid_size, show_grid, fast_render)
+                image = memo.get(image_key)
+                if image is None:
+                    if fast_render:
+                        image = get_plot_renderer().render(points, title, grid_size, show_grid, wu_points, circle)
+                    else:
+                        fig = create_plot(points, title, grid_size, show_grid, wu_points, circle)
+                        image = figure_to_png(fig)
+                    memo.put(image_key, image)
+                st.image(image, use_container_width=True)
                 
                 st.success(f"✅ Алгоритм выполнен успешно!")
                 
                 with st.expander("📊 Детали растеризации", expanded=False):
                     st.write(f"**Количество точек:** {len(points)}")
                     st.write(f"**Время выполнения:** {execution_time:.4f} мс")
+                    st.write(f"**Кэш:** {'результат взят из кэша' if cached else 'результат вычислен'} "
+                             f"({memo.hits} попаданий, {memo.misses} промахов, {len(memo)} записей)")
                     
                     if points and len(points) <= 30:
                         points_text = ", ".join([f"({p.x},{p.y})" for p in points[:20]])
@@ -383,14 +2032,23 @@ def main():
                         st.write("**Параметры алгоритма:**")
                         st.latex(f"d = 3 - 2r = 3 - 2 \\cdot {radius} = {3 - 2*radius}")
                         st.write("Алгоритм использует 8-стороннюю симметрию окружности")
+                    
+                    elif algorithm == "Эллипс (алгоритм средней точки)" and points:
+                        st.write("**Параметры алгоритма:**")
+                        st.latex(f"F(x,y) = {semi_b}^2 x^2 + {semi_a}^2 y^2 - {semi_a}^2 \\cdot {semi_b}^2")
+                        st.write("Алгоритм использует 4-стороннюю симметрию и две области с разным шагом")
                 
             except Exception as e:
                 st.error(f"Ошибка при выполнении алгоритма: {str(e)}")
         else:
             st.info("👈 Настройте параметры слева и нажмите 'Выполнить растеризацию'")
             
-            example_fig = create_plot([], "Пример координатной сетки", grid_size, True)
-            st.pyplot(example_fig)
+            if fast_render:
+                st.image(get_plot_renderer().render([], "Пример координатной сетки", grid_size, True),
+                         use_container_width=True)
+            else:
+                example_fig = create_plot([], "Пример координатной сетки", grid_size, True)
+                st.pyplot(example_fig)
     
     st.header("📚 Теоретическая справка")
     
@@ -491,27 +2149,11 @@ def main():
         st.markdown("""
         ### Сравнение временных характеристик
         
-        **Тестовые параметры:**
-        - Все измерения проводились на одной системе
-        - Каждый алгоритм запускался 1000 раз для усреднения
-        - Использовался отрезок от (-10,-5) до (15,10)
-        
-        **Результаты (среднее время на одну растеризацию):**
-        
-        | Алгоритм | Время (мкс) | Относительная скорость |
-        |----------|-------------|------------------------|
-        | Пошаговый | 45.2 мкс | 1.0× (база) |
-        | ЦДА | 38.7 мкс | 1.17× |
-        | Брезенхема (отрезок) | 12.3 мкс | 3.67× |
-        | Брезенхема (окружность R=8) | 25.6 мкс | 1.77× |
-        | Ву (сглаживание) | 67.8 мкс | 0.67× |
-        
-        **Выводы:**
-        1. Алгоритм Брезенхема для отрезков - самый быстрый
-        2. Алгоритм Ву самый медленный из-за вычисления интенсивностей
-        3. ЦДА быстрее пошагового за счет меньшего количества операций
-        4. Для окружности Брезенхем эффективнее, чем использование алгоритма для отрезков
+        Каждый случай запускается после прогрева серией замеров; короткие вызовы
+        группируются, чтобы замер не упирался в разрешение таймера. В таблице —
+        медиана и межквартильный размах (IQR) для скалярной и векторизованной версий.
         """)
+        show_rasterization_benchmark()
     
     st.header("⭐ Задания на дополнительные баллы")
     
@@ -550,6 +2192,69 @@ def main():
         - Смешивание цветов создает плавный переход
         """)
     
+    with st.expander("Память представления точек"):
+        n_points = st.select_slider("Длина отрезка, пикселей", [1_000, 10_000, 100_000], 10_000)
+        if st.button("Измерить память"):
+            st.dataframe(measure_point_memory(n_points), use_container_width=True)
+    
+    with st.expander("Фиксированная точка 16.16 (ЦДА и Ву)"):
+        st.markdown("""
+        Целочисленные версии хранят координату в формате 16.16 и переносят остаток деления,
+        поэтому ошибка не накапливается с длиной отрезка. Проверка сравнивает их с эталонными
+        версиями на float на случайных отрезках; несовпадения дополнительно сверяются с точной
+        рациональной арифметикой.
+        """)
+        col_n, col_len = st.columns(2)
+        with col_n:
+            n_random = st.select_slider("Случайных отрезков", [100_000, 1_000_000, 5_000_000], 100_000)
+        with col_len:
+            max_length = st.select_slider("Макс. длина проекции", [16, 64, 256], 64)
+        if st.button("Запустить проверку"):
+            progress = st.progress(0.0)
+            start_time = time.perf_counter()
+            rows = fixed_point_harness(n_random, max_length, progress=progress.progress)
+            progress.empty()
+            st.dataframe(rows, use_container_width=True)
+            st.write(f"Проверено за {time.perf_counter() - start_time:.1f} с")
+    
+    with st.expander("Пакетная растеризация отрезков и окружностей"):
+        col_n, col_alg = st.columns(2)
+        with col_n:
+            n_segments = st.select_slider("Количество объектов", [1_000, 10_000, 100_000, 1_000_000], 10_000)
+        with col_alg:
+            batch_algorithm = st.radio("Алгоритм", ["Брезенхем", "Ву (сглаживание)", "Окружности", "Круги (заливка)",
+                                                    "Многоугольник (заливка)"], horizontal=True)
+        if st.button("Растеризовать набор отрезков"):
+            size = 1024
+            rng = np.random.default_rng(0)
+            start = rng.integers(0, size, (n_segments, 2))
+            segments = np.hstack([start, start + rng.integers(-40, 41, (n_segments, 2))])
+            # входные данные и кадр готовятся до замера: время — только растеризация
+            if batch_algorithm in ("Окружности", "Круги (заливка)"):
+                radii = rng.integers(1, 21, n_segments)
+            elif batch_algorithm == "Многоугольник (заливка)":
+                # звезда из n вершин, часть лучей уходит далеко за пределы кадра
+                angle = np.linspace(0, 2 * np.pi, n_segments, endpoint=False)
+                radius = np.where(np.arange(n_segments) % 2, 0.35 * size, 0.45 * size)
+                radius[::97] = 1e7
+                star = np.column_stack((size / 2 + radius * np.cos(angle),
+                                        size / 2 + radius * np.sin(angle))).round().astype(np.int64)
+            frame = np.zeros((size, size), np.uint8)
+            
+            start_time = time.perf_counter()
+            if batch_algorithm == "Брезенхем":
+                BatchRasterizer.bresenham_lines(segments, frame)
+            elif batch_algorithm == "Многоугольник (заливка)":
+                PolygonRasterizer.fill_polygon(star, frame, 128)
+                PolygonRasterizer.draw_polyline(star, frame, 255, closed=True)
+            elif batch_algorithm in ("Окружности", "Круги (заливка)"):
+                ShapeRasterizer.draw_circles(start, radii, frame, filled=batch_algorithm == "Круги (заливка)")
+            else:
+                BatchRasterizer.wu_lines(segments, frame)
+            elapsed = (time.perf_counter() - start_time) * 1000
+            st.image(255 - frame[::-1], caption=f"{n_segments} объектов за {elapsed:.1f} мс",
+                     use_container_width=True)
+    
     st.sidebar.header("Инструкция")
     st.sidebar.markdown("""
     1. Выберите алгоритм в выпадающем списке
@@ -2,9 +2,29 @@ import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.path import Path
 import math
-from typing import List, Tuple, Optional
+import io
+import json
+import platform
+import struct
+import warnings
+from typing import List, Tuple, Optional, Union
 import time
+import os
+import sys
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import OrderedDict, deque
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 st.set_page_config(
     page_title="Алгоритмы отсечения",
@@ -13,6 +33,8 @@ st.set_page_config(
 )
 
 class Point:
+    __slots__ = ("x", "y")
+    
     def __init__(self, x: float, y: float):
         self.x = x
         self.y = y
@@ -24,6 +46,8 @@ class Point:
         return (self.x, self.y)
 
 class Segment:
+    __slots__ = ("p1", "p2")
+    
     def __init__(self, p1: Point, p2: Point):
         self.p1 = p1
         self.p2 = p2
@@ -32,6 +56,8 @@ class Segment:
         return f"Segment({self.p1}, {self.p2})"
 
 class Polygon:
+    __slots__ = ("points", "closed")
+    
     def __init__(self, points: List[Point]):
         self.points = points
         self.closed = True
@@ -68,6 +94,176 @@ class Polygon:
         
         return True
 
+class SegmentArray:
+    # набор отрезков как один массив (N, 4): x1, y1, x2, y2 в строке
+    __slots__ = ("coords",)
+    
+    def __init__(self, coords: np.ndarray):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 4)
+    
+    @classmethod
+    def from_segments(cls, segments: List[Segment]) -> "SegmentArray":
+        return cls(np.array([(s.p1.x, s.p1.y, s.p2.x, s.p2.y) for s in segments], dtype=np.float64))
+    
+    def to_segments(self) -> List[Segment]:
+        return [Segment(Point(x1, y1), Point(x2, y2)) for x1, y1, x2, y2 in self.coords.tolist()]
+    
+    @property
+    def starts(self) -> np.ndarray:
+        return self.coords[:, :2]
+    
+    @property
+    def ends(self) -> np.ndarray:
+        return self.coords[:, 2:]
+    
+    def __len__(self):
+        return len(self.coords)
+    
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            x1, y1, x2, y2 = self.coords[index].tolist()
+            return Segment(Point(x1, y1), Point(x2, y2))
+        return SegmentArray(self.coords[index])
+
+class PolygonArray:
+    # многоугольник как непрерывный массив вершин (N, 2); рёбра и нормали считаются один раз
+    __slots__ = ("vertices", "closed", "_edges", "_normals")
+    
+    def __init__(self, vertices: np.ndarray, closed: bool = True):
+        vertices = np.ascontiguousarray(vertices, dtype=np.float64).reshape(-1, 2).view()
+        # вершины только для чтения, иначе кэш рёбер разойдётся с ними
+        vertices.flags.writeable = False
+        self.vertices = vertices
+        self.closed = closed
+        self._edges = None
+        self._normals = None
+    
+    @classmethod
+    def from_polygon(cls, polygon: Polygon) -> "PolygonArray":
+        return cls(np.array([(p.x, p.y) for p in polygon.points], dtype=np.float64), polygon.closed)
+    
+    def to_polygon(self) -> Polygon:
+        polygon = Polygon([Point(x, y) for x, y in self.vertices.tolist()])
+        polygon.closed = self.closed
+        return polygon
+    
+    def __len__(self):
+        return len(self.vertices)
+    
+    @property
+    def edge_starts(self) -> np.ndarray:
+        return self.vertices[:len(self.edges)]
+    
+    @property
+    def edges(self) -> np.ndarray:
+        if self._edges is None:
+            v = self.vertices
+            edges = np.empty((len(v) if self.closed else max(len(v) - 1, 0), 2))
+            np.subtract(v[1:], v[:-1], out=edges[:len(v) - 1])
+            if self.closed and len(v):
+                edges[-1] = v[0] - v[-1]
+            edges.flags.writeable = False
+            self._edges = edges
+        return self._edges
+    
+    @property
+    def normals(self) -> np.ndarray:
+        # внутренние нормали: левые (-dy, dx) для обхода против часовой стрелки, правые — по часовой
+        if self._normals is None:
+            e = self.edges
+            sign = -1.0 if self.signed_area() < 0 else 1.0
+            normals = np.column_stack((-e[:, 1] * sign, e[:, 0] * sign))
+            normals.flags.writeable = False
+            self._normals = normals
+        return self._normals
+    
+    def signed_area(self) -> float:
+        v = self.vertices
+        if len(v) < 3:
+            return 0.0
+        x, y = v[:, 0], v[:, 1]
+        return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+    
+    def get_edges(self) -> SegmentArray:
+        start = self.edge_starts
+        return SegmentArray(np.hstack((start, start + self.edges)))
+    
+    def is_convex(self) -> bool:
+        if len(self.vertices) < 3:
+            return True
+        e = self.edges
+        nxt = np.roll(e, -1, axis=0)
+        cross = e[:, 0] * nxt[:, 1] - e[:, 1] * nxt[:, 0]
+        return not ((cross > 0).any() and (cross < 0).any())
+
+class PolygonBatch:
+    # пакет многоугольников: все вершины подряд в (V, 2), кольцо i — vertices[offsets[i]:offsets[i + 1]]
+    __slots__ = ("vertices", "offsets")
+    
+    def __init__(self, vertices: np.ndarray, offsets: np.ndarray):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.intp)
+        if len(self.offsets) == 0 or self.offsets[0] != 0 or self.offsets[-1] != len(self.vertices):
+            raise ValueError("offsets должны начинаться с 0 и заканчиваться числом вершин")
+    
+    @classmethod
+    def from_polygons(cls, polygons: List[Union[Polygon, PolygonArray]]) -> "PolygonBatch":
+        return cls.from_rings([p.vertices if isinstance(p, PolygonArray) else PolygonArray.from_polygon(p).vertices
+                               for p in polygons])
+    
+    @classmethod
+    def from_rings(cls, rings: List[np.ndarray]) -> "PolygonBatch":
+        offsets = np.zeros(len(rings) + 1, dtype=np.intp)
+        np.cumsum([len(r) for r in rings], out=offsets[1:])
+        return cls(np.concatenate(rings) if rings else np.empty((0, 2)), offsets)
+    
+    @classmethod
+    def concatenate(cls, parts: List[Tuple[np.ndarray, np.ndarray]]) -> "PolygonBatch":
+        shifts = np.cumsum([0] + [len(v) for v, _ in parts])
+        offsets = np.concatenate([[0]] + [o[1:] + s for (_, o), s in zip(parts, shifts)])
+        return cls(np.concatenate([v for v, _ in parts]) if parts else np.empty((0, 2)), offsets)
+    
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+    
+    @staticmethod
+    def ragged_index(start: np.ndarray, count: np.ndarray) -> np.ndarray:
+        offsets = np.arange(int(count.sum()), dtype=np.intp)
+        offsets -= np.repeat(np.cumsum(count) - count, count)
+        return np.repeat(start, count) + offsets
+    
+    def take(self, rings: np.ndarray) -> "PolygonBatch":
+        counts = self.counts[rings]
+        offsets = np.zeros(len(counts) + 1, dtype=np.intp)
+        np.cumsum(counts, out=offsets[1:])
+        return PolygonBatch(self.vertices[self.ragged_index(self.offsets[rings], counts)], offsets)
+    
+    def bounds(self) -> np.ndarray:
+        # рамки колец (xmin, ymin, xmax, ymax); у пустых колец — NaN
+        boxes = np.full((len(self), 4), np.nan)
+        nonempty = self.offsets[1:] > self.offsets[:-1]
+        if nonempty.any():
+            starts = self.offsets[:-1][nonempty]
+            boxes[nonempty, :2] = np.minimum.reduceat(self.vertices, starts, axis=0)
+            boxes[nonempty, 2:] = np.maximum.reduceat(self.vertices, starts, axis=0)
+        return boxes
+    
+    def chunk_bounds(self, max_vertices: int) -> List[Tuple[int, int]]:
+        # границы кусков по многоугольникам, в каждом куске примерно max_vertices вершин
+        cuts = np.searchsorted(self.offsets, np.arange(max_vertices, self.offsets[-1], max_vertices))
+        cuts = np.unique(np.concatenate(([0], cuts, [len(self)])))
+        return list(zip(cuts[:-1].tolist(), cuts[1:].tolist()))
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index: int) -> PolygonArray:
+        return PolygonArray(self.vertices[self.offsets[index]:self.offsets[index + 1]])
+    
+    def to_polygons(self) -> List[Optional[Polygon]]:
+        return [self[i].to_polygon() if self.offsets[i + 1] > self.offsets[i] else None for i in range(len(self))]
+
 class ClippingAlgorithms:
     @staticmethod
     def liang_barsky(x1: float, y1: float, x2: float, y2: float, 
@@ -110,178 +306,1706 @@ class ClippingAlgorithms:
         
         return (clipped_p1, clipped_p2)
     
+    BATCH_CHUNK = 1 << 13
+    
     @staticmethod
-    def sutherland_hodgman_polygon(polygon: Polygon, 
-                                   xmin: float, ymin: float, 
-                                   xmax: float, ymax: float) -> Polygon:
-        def clip_edge(input_poly: List[Point], edge: str) -> List[Point]:
-            output = []
-            n = len(input_poly)
-            
-            for i in range(n):
-                current = input_poly[i]
-                next_pt = input_poly[(i + 1) % n]
-                
-                if edge == 'left':
-                    current_inside = current.x >= xmin
-                    next_inside = next_pt.x >= xmin
-                elif edge == 'right':
-                    current_inside = current.x <= xmax
-                    next_inside = next_pt.x <= xmax
-                elif edge == 'bottom':
-                    current_inside = current.y >= ymin
-                    next_inside = next_pt.y >= ymin
-                elif edge == 'top':
-                    current_inside = current.y <= ymax
-                    next_inside = next_pt.y <= ymax
+    def _liang_barsky_chunk(seg: np.ndarray, out: np.ndarray, visible: np.ndarray,
+                            xmin: float, ymin: float, xmax: float, ymax: float):
+        n = len(seg)
+        x1, y1, x2, y2 = np.ascontiguousarray(seg.T)
+        u1 = np.zeros(n)
+        u2 = np.ones(n)
+        d = np.empty(n)
+        t_lo = np.empty(n)
+        t_hi = np.empty(n)
+        enter = np.empty(n)
+        leave = np.empty(n)
+        visible[:] = True
+        
+        # r = q / p скалярной версии: q / (-d) == (lo - a) / d бит в бит, поэтому
+        # при lo <= hi входной параметр — меньший из двух, выходной — больший;
+        # ранние выходы скалярного цикла эквивалентны итоговой проверке u1 > u2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for a1, a2, lo, hi in ((x1, x2, xmin, xmax), (y1, y2, ymin, ymax)):
+                np.subtract(a2, a1, out=d)
+                np.subtract(lo, a1, out=t_lo)
+                np.divide(t_lo, d, out=t_lo)
+                np.subtract(hi, a1, out=t_hi)
+                np.divide(t_hi, d, out=t_hi)
+                if lo <= hi:
+                    np.minimum(t_lo, t_hi, out=enter)
+                    np.maximum(t_lo, t_hi, out=leave)
+                else:
+                    forward = d > 0
+                    enter[:] = np.where(forward, t_lo, t_hi)
+                    leave[:] = np.where(forward, t_hi, t_lo)
                 
-                if current_inside and next_inside:
-                    output.append(next_pt)
-                elif current_inside and not next_inside:
-                    if edge == 'left':
-                        y = current.y + (next_pt.y - current.y) * (xmin - current.x) / (next_pt.x - current.x)
-                        output.append(Point(xmin, y))
-                    elif edge == 'right':
-                        y = current.y + (next_pt.y - current.y) * (xmax - current.x) / (next_pt.x - current.x)
-                        output.append(Point(xmax, y))
-                    elif edge == 'bottom':
-                        x = current.x + (next_pt.x - current.x) * (ymin - current.y) / (next_pt.y - current.y)
-                        output.append(Point(x, ymin))
-                    elif edge == 'top':
-                        x = current.x + (next_pt.x - current.x) * (ymax - current.y) / (next_pt.y - current.y)
-                        output.append(Point(x, ymax))
-                elif not current_inside and next_inside:
-                    if edge == 'left':
-                        y = current.y + (next_pt.y - current.y) * (xmin - current.x) / (next_pt.x - current.x)
-                        output.append(Point(xmin, y))
-                        output.append(next_pt)
-                    elif edge == 'right':
-                        y = current.y + (next_pt.y - current.y) * (xmax - current.x) / (next_pt.x - current.x)
-                        output.append(Point(xmax, y))
-                        output.append(next_pt)
-                    elif edge == 'bottom':
-                        x = current.x + (next_pt.x - current.x) * (ymin - current.y) / (next_pt.y - current.y)
-                        output.append(Point(x, ymin))
-                        output.append(next_pt)
-                    elif edge == 'top':
-                        x = current.x + (next_pt.x - current.x) * (ymax - current.y) / (next_pt.y - current.y)
-                        output.append(Point(x, ymax))
-                        output.append(next_pt)
-            
-            return output
+                # параллельные границе (|p| < 1e-10) не ограничивают u,
+                # а отбрасываются только при q < 0
+                np.abs(d, out=t_lo)
+                parallel = np.flatnonzero(t_lo < 1e-10)
+                if len(parallel):
+                    a = a1[parallel]
+                    visible[parallel] &= (a - lo >= 0) & (hi - a >= 0)
+                    enter[parallel] = -np.inf
+                    leave[parallel] = np.inf
+                np.maximum(u1, enter, out=u1)
+                np.minimum(u2, leave, out=u2)
+        visible &= u1 <= u2
         
-        clipped_points = polygon.points.copy()
+        # невидимые отрезки получают NaN через u1 и u2
+        scale = np.where(visible, 1.0, np.nan)
+        u1 *= scale
+        u2 *= scale
+        whole = (u1 == 0) & (u2 == 1)
+        result = np.empty((4, n))
+        for col, start, end in ((0, x1, x2), (1, y1, y2)):
+            np.subtract(end, start, out=d)
+            np.multiply(u1, d, out=result[col])
+            result[col] += start
+            np.multiply(u2, d, out=t_hi)
+            t_hi += start
+            result[col + 2] = np.where(whole, end, t_hi)
+        # при u1 == 0 начало x1 + 0·dx совпадает с x1
+        out[:] = result.T
+    
+    @staticmethod
+    def liang_barsky_batch(segments: np.ndarray, xmin: float, ymin: float, xmax: float, ymax: float,
+                           workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        segments = np.ascontiguousarray(segments, dtype=np.float64).reshape(-1, 4)
+        out = np.empty_like(segments)
+        visible = np.empty(len(segments), dtype=bool)
+        chunk = ClippingAlgorithms.BATCH_CHUNK
+        bounds = [(start, min(start + chunk, len(segments))) for start in range(0, len(segments), chunk)]
         
-        for edge in ['left', 'right', 'bottom', 'top']:
-            if clipped_points:
-                clipped_points = clip_edge(clipped_points, edge)
+        def job(bounds):
+            start, end = bounds
+            ClippingAlgorithms._liang_barsky_chunk(segments[start:end], out[start:end], visible[start:end],
+                                                   xmin, ymin, xmax, ymax)
         
-        return Polygon(clipped_points) if clipped_points else None
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(bounds) <= 1:
+            for b in bounds:
+                job(b)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(job, bounds))
+        return out, visible
     
     @staticmethod
-    def cyrus_beck_polygon(subject_polygon: Polygon, clip_polygon: Polygon) -> Polygon:
-        def get_normal(p1: Point, p2: Point) -> Tuple[float, float]:
-            dx = p2.x - p1.x
-            dy = p2.y - p1.y
-            return (-dy, dx)
-        
-        def dot_product(v1: Tuple[float, float], v2: Tuple[float, float]) -> float:
-            return v1[0] * v2[0] + v1[1] * v2[1]
-        
-        def line_intersection(p1: Point, p2: Point, edge_p1: Point, edge_p2: Point) -> Optional[Point]:
-            x1, y1 = p1.x, p1.y
-            x2, y2 = p2.x, p2.y
-            x3, y3 = edge_p1.x, edge_p1.y
-            x4, y4 = edge_p2.x, edge_p2.y
-            
-            denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
-            if abs(denom) < 1e-10:
-                return None
-            
-            t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denom
-            u = -((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3)) / denom
-            
-            if 0 <= t <= 1 and 0 <= u <= 1:
-                return Point(x1 + t * (x2 - x1), y1 + t * (y2 - y1))
-            
+    def _ring_next(offsets: np.ndarray) -> np.ndarray:
+        # индекс следующей вершины в своём кольце: последняя вершина кольца ссылается на первую
+        following = np.arange(1, offsets[-1] + 1, dtype=np.intp)
+        starts, ends = offsets[:-1], offsets[1:]
+        nonempty = ends > starts
+        following[ends[nonempty] - 1] = starts[nonempty]
+        return following
+    
+    @staticmethod
+    def _clip_axis(vertices: np.ndarray, following: np.ndarray, axis: int, value: float,
+                   keep_above: bool) -> Tuple[np.ndarray, np.ndarray]:
+        # один проход по границе x = value (axis = 0) или y = value (axis = 1) сразу для всех рёбер
+        nxt = vertices[following]
+        a, b = vertices[:, axis], nxt[:, axis]
+        current_inside = a >= value if keep_above else a <= value
+        next_inside = b >= value if keep_above else b <= value
+        crossing = current_inside != next_inside
+        
+        # ребро даёт точку пересечения (если пересекает границу) и свой конец (если он внутри)
+        counts = crossing.astype(np.intp) + next_inside
+        slots = np.cumsum(counts) - counts
+        output = np.empty((int(counts.sum()), 2))
+        
+        c, n = vertices[crossing], nxt[crossing]
+        other = 1 - axis
+        hit = np.empty((len(c), 2))
+        hit[:, axis] = value
+        hit[:, other] = c[:, other] + (n[:, other] - c[:, other]) * (value - c[:, axis]) / (n[:, axis] - c[:, axis])
+        output[slots[crossing]] = hit
+        output[slots[next_inside] + crossing[next_inside]] = nxt[next_inside]
+        return output, counts
+    
+    @staticmethod
+    def _sutherland_hodgman_rings(vertices: np.ndarray, offsets: np.ndarray,
+                                  xmin: float, ymin: float, xmax: float, ymax: float) -> Tuple[np.ndarray, np.ndarray]:
+        for axis, value, keep_above in ((0, xmin, True), (0, xmax, False), (1, ymin, True), (1, ymax, False)):
+            if not len(vertices):
+                break
+            following = ClippingAlgorithms._ring_next(offsets)
+            vertices, counts = ClippingAlgorithms._clip_axis(vertices, following, axis, value, keep_above)
+            # новые границы колец: сколько вершин выдали рёбра каждого кольца
+            bounds = np.zeros(len(counts) + 1, dtype=np.intp)
+            np.cumsum(counts, out=bounds[1:])
+            offsets = bounds[offsets]
+        return vertices, offsets
+    
+    @staticmethod
+    def _clip_half_plane(vertices: np.ndarray, origin: np.ndarray, normal: np.ndarray) -> np.ndarray:
+        # внутренняя сторона ребра отсекающего многоугольника: (p - origin) · normal >= 0
+        following = np.roll(vertices, -1, axis=0)
+        d = (vertices[:, 0] - origin[0]) * normal[0] + (vertices[:, 1] - origin[1]) * normal[1]
+        d_next = np.roll(d, -1)
+        current_inside = d >= 0
+        next_inside = d_next >= 0
+        crossing = current_inside != next_inside
+        
+        counts = crossing.astype(np.intp) + next_inside
+        slots = np.cumsum(counts) - counts
+        output = np.empty((int(counts.sum()), 2))
+        
+        t = d[crossing] / (d[crossing] - d_next[crossing])
+        c = vertices[crossing]
+        output[slots[crossing]] = c + t[:, None] * (following[crossing] - c)
+        output[slots[next_inside] + crossing[next_inside]] = following[next_inside]
+        return output
+    
+    @staticmethod
+    def _as_vertices(polygon: Union[Polygon, PolygonArray]) -> np.ndarray:
+        if isinstance(polygon, PolygonArray):
+            return polygon.vertices
+        return PolygonArray.from_polygon(polygon).vertices
+    
+    @staticmethod
+    def _polygon_like(polygon: Union[Polygon, PolygonArray], vertices: np.ndarray):
+        # результат того же вида, что и вход; объекты Point создаются только на выходе
+        if not len(vertices):
             return None
+        result = PolygonArray(vertices)
+        return result if isinstance(polygon, PolygonArray) else result.to_polygon()
+    
+    @staticmethod
+    def sutherland_hodgman_polygon(polygon: Union[Polygon, PolygonArray], 
+                                   xmin: float, ymin: float, 
+                                   xmax: float, ymax: float) -> Optional[Union[Polygon, PolygonArray]]:
+        vertices = ClippingAlgorithms._as_vertices(polygon)
+        offsets = np.array([0, len(vertices)], dtype=np.intp)
+        vertices, _ = ClippingAlgorithms._sutherland_hodgman_rings(vertices, offsets, xmin, ymin, xmax, ymax)
+        return ClippingAlgorithms._polygon_like(polygon, vertices)
+    
+    @staticmethod
+    def sutherland_hodgman_batch(batch: "PolygonBatch", xmin: float, ymin: float, xmax: float, ymax: float,
+                                 workers: Optional[int] = None) -> "PolygonBatch":
+        # полностью невидимый многоугольник остаётся в результате пустым кольцом
+        boxes = batch.bounds()
+        with np.errstate(invalid="ignore"):
+            touching = (boxes[:, 0] <= xmax) & (boxes[:, 2] >= xmin) & (boxes[:, 1] <= ymax) & (boxes[:, 3] >= ymin)
+            inside = touching & (boxes[:, 0] >= xmin) & (boxes[:, 2] <= xmax) & (boxes[:, 1] >= ymin) & (boxes[:, 3] <= ymax)
+        crossing = np.flatnonzero(touching & ~inside)
+        inside = np.flatnonzero(inside)
+        
+        # через границы окна проходят только пересекающие его многоугольники, куски по числу вершин
+        subset = batch.take(crossing)
+        bounds = subset.chunk_bounds(ClippingAlgorithms.BATCH_CHUNK * 8)
+        
+        def job(bounds):
+            first, last = bounds
+            offsets = subset.offsets[first:last + 1]
+            return ClippingAlgorithms._sutherland_hodgman_rings(subset.vertices[offsets[0]:offsets[-1]],
+                                                                offsets - offsets[0], xmin, ymin, xmax, ymax)
+        
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(bounds) <= 1:
+            parts = [job(b) for b in bounds]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(job, bounds))
+        clipped = PolygonBatch.concatenate(parts)
         
-        clip_edges = clip_polygon.get_edges()
+        counts = np.zeros(len(batch), dtype=np.intp)
+        inside_counts = batch.counts[inside]
+        counts[inside] = inside_counts
+        counts[crossing] = clipped.counts
+        offsets = np.zeros(len(batch) + 1, dtype=np.intp)
+        np.cumsum(counts, out=offsets[1:])
+        vertices = np.empty((offsets[-1], 2))
+        vertices[PolygonBatch.ragged_index(offsets[crossing], clipped.counts)] = clipped.vertices
         
-        result_polygon = subject_polygon.points.copy()
+        # многоугольник внутри окна копируется как есть, но с тем же сдвигом начала,
+        # что дают четыре прохода (каждый проход начинает кольцо со следующей вершины)
+        ring = np.repeat(np.arange(len(inside)), inside_counts)
+        local = np.arange(len(ring)) - np.repeat(np.cumsum(inside_counts) - inside_counts, inside_counts)
+        source = batch.offsets[inside][ring] + (local + 4) % inside_counts[ring]
+        vertices[PolygonBatch.ragged_index(offsets[inside], inside_counts)] = batch.vertices[source]
+        return PolygonBatch(vertices, offsets)
+    
+    @staticmethod
+    def cyrus_beck_polygon(subject_polygon: Union[Polygon, PolygonArray],
+                           clip_polygon: Union[Polygon, PolygonArray]) -> Optional[Union[Polygon, PolygonArray]]:
+        clip = clip_polygon if isinstance(clip_polygon, PolygonArray) else PolygonArray.from_polygon(clip_polygon)
+        vertices = ClippingAlgorithms._as_vertices(subject_polygon)
         
-        for edge in clip_edges:
-            if not result_polygon:
+        for origin, normal in zip(clip.edge_starts, clip.normals):
+            if not len(vertices):
                 break
-            
-            normal = get_normal(edge.p1, edge.p2)
-            
-            new_polygon = []
-            
-            n = len(result_polygon)
-            for i in range(n):
-                current = result_polygon[i]
-                next_pt = result_polygon[(i + 1) % n]
-                
-                v_current = (current.x - edge.p1.x, current.y - edge.p1.y)
-                v_next = (next_pt.x - edge.p1.x, next_pt.y - edge.p1.y)
-                
-                d_current = dot_product(normal, v_current)
-                d_next = dot_product(normal, v_next)
-                
-                if d_current >= 0 and d_next >= 0:
-                    new_polygon.append(next_pt)
-                elif d_current >= 0 and d_next < 0:
-                    intersection = line_intersection(current, next_pt, edge.p1, edge.p2)
-                    if intersection:
-                        new_polygon.append(intersection)
-                elif d_current < 0 and d_next >= 0:
-                    intersection = line_intersection(current, next_pt, edge.p1, edge.p2)
-                    if intersection:
-                        new_polygon.append(intersection)
-                        new_polygon.append(next_pt)
-            
-            result_polygon = new_polygon
+            vertices = ClippingAlgorithms._clip_half_plane(vertices, origin, normal)
         
-        return Polygon(result_polygon) if result_polygon else None
+        return ClippingAlgorithms._polygon_like(subject_polygon, vertices)
 
-def parse_input_file(content: str):
-    lines = content.strip().split('\n')
+class PolygonClipper:
+    # Грейнер-Хорман для произвольных многоугольников: кольца с правилом чёт-нечет, поэтому
+    # дыры задаются просто вложенными кольцами, а результат — тоже набор колец
+    OPERATIONS = ("intersection", "union", "difference")
+    PAIR_CHUNK = 1 << 20
+    EPS = 1e-10
     
-    if len(lines) < 2:
-        return None
+    @staticmethod
+    def _as_batch(polygon) -> PolygonBatch:
+        batch = polygon if isinstance(polygon, PolygonBatch) else PolygonBatch.from_polygons([polygon])
+        # кольца меньше чем из трёх вершин площади не имеют
+        return batch.take(np.flatnonzero(batch.counts >= 3))
     
-    try:
-        n = int(lines[0].strip())
+    @staticmethod
+    def _edges(batch: PolygonBatch) -> Tuple[np.ndarray, np.ndarray]:
+        return batch.vertices, batch.vertices[ClippingAlgorithms._ring_next(batch.offsets)]
+    
+    @staticmethod
+    def _ragged_chunks(first: np.ndarray, count: np.ndarray, chunk: int):
+        # пары (строка, first[строка] + k) для k < count[строка], кусками примерно по chunk пар
+        bounds = np.cumsum(count)
+        row = 0
+        while row < len(count):
+            done = bounds[row] - count[row]
+            last = min(max(int(np.searchsorted(bounds, done + chunk, side="right")), row + 1), len(count))
+            rows = np.arange(row, last)
+            yield np.repeat(rows, count[row:last]), PolygonBatch.ragged_index(first[row:last], count[row:last])
+            row = last
+    
+    @staticmethod
+    def _strip_sweep(a_lo: np.ndarray, a_hi: np.ndarray, b_lo: np.ndarray, b_hi: np.ndarray, axis: int):
+        # заметание вдоль axis отдельно в каждой полосе по второй оси: ребро попадает во все полосы,
+        # которые пересекает его проекция, а пара учитывается только в полосе max(начал) —
+        # так каждая пара с перекрытием проекций находится ровно один раз
+        other = 1 - axis
+        low = min(a_lo[:, other].min(), b_lo[:, other].min())
+        span = max(a_hi[:, other].max(), b_hi[:, other].max()) - low
+        extent = np.concatenate((a_hi[:, other] - a_lo[:, other], b_hi[:, other] - b_lo[:, other])).mean()
+        strips = int(min(math.sqrt(len(a_lo) + len(b_lo)), span / extent if extent > 0 else 1)) if span > 0 else 1
+        strips = max(strips, 1)
+        height = span / strips if span > 0 else 1.0
+        
+        def strip_of(values):
+            return np.clip(((values - low) / height).astype(np.intp), 0, strips - 1)
+        
+        # точные целые ранги координат вместо сумм с плавающей точкой в составном ключе
+        values = np.unique(np.concatenate((a_lo[:, axis], a_hi[:, axis], b_lo[:, axis], b_hi[:, axis])))
+        stride = len(values) + 1
+        
+        def copies(lo, hi):
+            first, last = strip_of(lo[:, other]), strip_of(hi[:, other])
+            edge = np.repeat(np.arange(len(lo)), last - first + 1)
+            strip = PolygonBatch.ragged_index(first, last - first + 1)
+            key = strip * stride + np.searchsorted(values, lo[edge, axis])
+            order = np.argsort(key, kind="stable")
+            return edge[order], strip[order], key[order]
+        
+        a_edge, a_strip, a_key = copies(a_lo, a_hi)
+        b_edge, b_strip, b_key = copies(b_lo, b_hi)
+        b_first = np.searchsorted(b_key, a_key, side="left")
+        b_count = np.searchsorted(b_key, a_strip * stride + np.searchsorted(values, a_hi[a_edge, axis]),
+                                  side="right") - b_first
+        a_first = np.searchsorted(a_key, b_key, side="right")
+        a_count = np.searchsorted(a_key, b_strip * stride + np.searchsorted(values, b_hi[b_edge, axis]),
+                                  side="right") - a_first
+        return int(b_count.sum() + a_count.sum()), (a_edge, a_strip, b_edge, b_first, b_count, a_first, a_count,
+                                                     strip_of)
+    
+    @staticmethod
+    def candidate_pairs(a_start: np.ndarray, a_end: np.ndarray,
+                        b_start: np.ndarray, b_end: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # сортировка и заметание: для каждого ребра бинарным поиском находятся рёбра другой фигуры,
+        # начавшиеся внутри его проекции; ось заметания — та, где пар-кандидатов меньше
+        if not len(a_start) or not len(b_start):
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        a_lo, a_hi = np.minimum(a_start, a_end), np.maximum(a_start, a_end)
+        b_lo, b_hi = np.minimum(b_start, b_end), np.maximum(b_start, b_end)
+        sweeps = [PolygonClipper._strip_sweep(a_lo, a_hi, b_lo, b_hi, axis) for axis in (0, 1)]
+        axis = int(sweeps[1][0] < sweeps[0][0])
+        a_edge, a_strip, b_edge, b_first, b_count, a_first, a_count, strip_of = sweeps[axis][1]
+        other = 1 - axis
+        chunk = PolygonClipper.PAIR_CHUNK
+        
+        def sweep():
+            for rows, cols in PolygonClipper._ragged_chunks(b_first, b_count, chunk):
+                yield a_edge[rows], b_edge[cols], a_strip[rows]
+            for rows, cols in PolygonClipper._ragged_chunks(a_first, a_count, chunk):
+                yield a_edge[cols], b_edge[rows], a_strip[cols]
+        
+        found_a, found_b = [np.empty(0, dtype=np.intp)], [np.empty(0, dtype=np.intp)]
+        for ia, ib, strip in sweep():
+            start = np.maximum(a_lo[ia, other], b_lo[ib, other])
+            keep = (start <= np.minimum(a_hi[ia, other], b_hi[ib, other])) & (strip_of(start) == strip)
+            found_a.append(ia[keep])
+            found_b.append(ib[keep])
+        return np.concatenate(found_a), np.concatenate(found_b)
+    
+    @staticmethod
+    def edge_intersections(a_start: np.ndarray, a_end: np.ndarray, b_start: np.ndarray, b_end: np.ndarray,
+                           pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+        # возвращает (ребро A, ребро B, параметр на A, параметр на B) и рёбра A в вырожденных парах
+        ia, ib = pairs if pairs is not None else PolygonClipper.candidate_pairs(a_start, a_end, b_start, b_end)
+        p, r = a_start[ia], a_end[ia] - a_start[ia]
+        q, s = b_start[ib], b_end[ib] - b_start[ib]
+        qp = q - p
+        denom = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (qp[:, 0] * s[:, 1] - qp[:, 1] * s[:, 0]) / denom
+            u = (qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) / denom
+        eps = PolygonClipper.EPS
+        scale = np.abs(r).sum(axis=1) * np.abs(s).sum(axis=1)
+        parallel = np.abs(denom) <= eps * scale
+        collinear = parallel & (np.abs(qp[:, 0] * r[:, 1] - qp[:, 1] * r[:, 0]) <= eps * scale)
+        
+        proper = ~parallel & (t > eps) & (t < 1 - eps) & (u > eps) & (u < 1 - eps)
+        # касание в вершине или вершина на ребре: параметр у концов отрезка, второй — в пределах ребра
+        near = ~parallel & (t >= -eps) & (t <= 1 + eps) & (u >= -eps) & (u <= 1 + eps) & ~proper
+        degenerate = near | collinear
+        return ia[proper], ib[proper], t[proper], u[proper], np.unique(ia[degenerate])
+    
+    @staticmethod
+    def point_in_rings(points: np.ndarray, batch: PolygonBatch) -> np.ndarray:
+        # чёт-нечет: число рёбер, пересечённых лучом вправо от точки
+        start, end = PolygonClipper._edges(batch)
+        inside = np.zeros(len(points), dtype=bool)
+        step = max(1, PolygonClipper.PAIR_CHUNK // max(len(start), 1))
+        for first in range(0, len(points), step):
+            px = points[first:first + step, 0:1]
+            py = points[first:first + step, 1:2]
+            x1, y1, x2, y2 = start[:, 0], start[:, 1], end[:, 0], end[:, 1]
+            straddle = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            inside[first:first + step] = (np.count_nonzero(straddle & (px < x_cross), axis=1) & 1).astype(bool)
+        return inside
+    
+    @staticmethod
+    def _perturb(batch: PolygonBatch, edges: np.ndarray, rng: np.random.Generator, scale: float) -> PolygonBatch:
+        # сдвиг концов вырожденных рёбер на величину много меньше размеров фигуры
+        vertices = batch.vertices.copy()
+        moved = np.unique(np.concatenate((edges, ClippingAlgorithms._ring_next(batch.offsets)[edges])))
+        vertices[moved] += rng.normal(0, scale, (len(moved), 2))
+        return PolygonBatch(vertices, batch.offsets)
+    
+    @staticmethod
+    def _nodes(batch: PolygonBatch, edge: np.ndarray, alpha: np.ndarray, points: np.ndarray):
+        # узлы колец: вершины и точки пересечения, упорядоченные по ребру и параметру на нём
+        n = len(batch.vertices)
+        node_edge = np.concatenate((np.arange(n), edge))
+        node_alpha = np.concatenate((np.full(n, -1.0), alpha))
+        order = np.lexsort((node_alpha, node_edge))
+        coords = np.concatenate((batch.vertices, points))[order]
+        position = np.empty(len(order), dtype=np.intp)
+        position[order] = np.arange(len(order))
+        ring_offsets = np.searchsorted(node_edge[order], batch.offsets)
+        ring_of_vertex = np.repeat(np.arange(len(batch)), batch.counts)
+        return coords, ring_offsets, position[n:], ring_of_vertex[edge]
+    
+    @staticmethod
+    def _ring_links(position: np.ndarray, ring: np.ndarray, start_inside: np.ndarray, flip: bool):
+        # соседние пересечения вдоль кольца (циклически) и признак входа в другую фигуру
+        order = np.argsort(position, kind="stable")
+        ring_sorted = ring[order]
+        group = np.searchsorted(ring_sorted, ring_sorted)
+        group_end = np.searchsorted(ring_sorted, ring_sorted, side="right")
+        idx = np.arange(len(order))
+        following = np.where(idx + 1 < group_end, idx + 1, group)
+        previous = np.where(idx > group, idx - 1, group_end - 1)
+        nxt = np.empty(len(order), dtype=np.intp)
+        prv = np.empty(len(order), dtype=np.intp)
+        entry = np.empty(len(order), dtype=bool)
+        nxt[order] = order[following]
+        prv[order] = order[previous]
+        # статус меняется на каждом пересечении: вход, если до него точка была снаружи
+        entry[order] = ~(start_inside[ring_sorted] ^ ((idx - group) & 1).astype(bool))
+        return nxt, prv, entry ^ flip
+    
+    @staticmethod
+    def _walk(coords: np.ndarray, ring_offsets: np.ndarray, ring: int, a: int, b: int, forward: bool) -> np.ndarray:
+        # вершины кольца строго между узлами a и b в направлении обхода
+        r0, r1 = ring_offsets[ring], ring_offsets[ring + 1]
+        if forward:
+            if b > a:
+                return coords[a + 1:b]
+            return np.concatenate((coords[a + 1:r1], coords[r0:b]))
+        if b < a:
+            return coords[b + 1:a][::-1]
+        return np.concatenate((coords[r0:a][::-1], coords[b + 1:r1][::-1]))
+    
+    @staticmethod
+    def area(batch: PolygonBatch) -> float:
+        # площадь по правилу чёт-нечет: кольца чётной глубины вложенности добавляются, нечётной — вычитаются
+        depth = PolygonClipper.nesting_depth(batch)
+        return float(sum(abs(batch[i].signed_area()) * (1 if depth[i] % 2 == 0 else -1) for i in range(len(batch))))
+    
+    @staticmethod
+    def nesting_depth(batch: PolygonBatch) -> np.ndarray:
+        firsts = batch.vertices[batch.offsets[:-1]]
+        depth = np.zeros(len(batch), dtype=np.intp)
+        for i in range(len(batch)):
+            inside = PolygonClipper.point_in_rings(firsts, batch.take(np.array([i])))
+            inside[i] = False
+            depth += inside
+        return depth
+    
+    @staticmethod
+    def to_path(batch: PolygonBatch) -> Path:
+        # matplotlib заливает по ненулевому числу оборотов: внешние кольца против часовой, дыры — по часовой
+        depth = PolygonClipper.nesting_depth(batch)
+        vertices, codes = [], []
+        for i in range(len(batch)):
+            ring = batch[i]
+            if (ring.signed_area() > 0) != (depth[i] % 2 == 0):
+                ring = PolygonArray(ring.vertices[::-1])
+            vertices.append(np.vstack((ring.vertices, ring.vertices[:1])))
+            codes += [Path.MOVETO] + [Path.LINETO] * (len(ring) - 1) + [Path.CLOSEPOLY]
+        return Path(np.concatenate(vertices), codes)
+    
+    @staticmethod
+    def clip(subject, clip, operation: str = "intersection", seed: int = 0, max_attempts: int = 8) -> PolygonBatch:
+        if operation not in PolygonClipper.OPERATIONS:
+            raise ValueError(f"неизвестная операция: {operation}")
+        a = PolygonClipper._as_batch(subject)
+        b = PolygonClipper._as_batch(clip)
+        if not len(a.vertices) or not len(b.vertices):
+            keep_a = operation != "intersection"
+            keep_b = operation == "union"
+            return PolygonBatch.from_rings(([a[i].vertices for i in range(len(a))] if keep_a else []) +
+                                           ([b[i].vertices for i in range(len(b))] if keep_b else []))
+        
+        # вырожденные случаи (вершина на ребре, совпадающие рёбра) убираются малым возмущением A
+        rng = np.random.default_rng(seed)
+        extent = float(np.ptp(np.concatenate((a.vertices, b.vertices)), axis=0).max()) or 1.0
+        a_start, a_end = PolygonClipper._edges(a)
+        b_start, b_end = PolygonClipper._edges(b)
+        for attempt in range(max_attempts):
+            ia, ib, t, u, degenerate = PolygonClipper.edge_intersections(a_start, a_end, b_start, b_end)
+            if not len(degenerate):
+                break
+            a = PolygonClipper._perturb(a, degenerate, rng, extent * 1e-9 * 10 ** attempt)
+            a_start, a_end = PolygonClipper._edges(a)
+        else:
+            raise ValueError("не удалось устранить вырожденные пересечения возмущением")
+        
+        points = a_start[ia] + t[:, None] * (a_end[ia] - a_start[ia])
+        a_coords, a_rings, a_pos, a_ring = PolygonClipper._nodes(a, ia, t, points)
+        b_coords, b_rings, b_pos, b_ring = PolygonClipper._nodes(b, ib, u, points)
+        # после возмущения первые вершины колец не лежат на границе другой фигуры
+        a_inside = PolygonClipper.point_in_rings(a.vertices[a.offsets[:-1]], b)
+        b_inside = PolygonClipper.point_in_rings(b.vertices[b.offsets[:-1]], a)
+        # пересечение: идём по внутренним частям; объединение: по внешним; разность A - B:
+        # по частям A вне B и частям B внутри A
+        flip_a = operation != "intersection"
+        flip_b = operation == "union"
+        a_next, a_prev, a_entry = PolygonClipper._ring_links(a_pos, a_ring, a_inside, flip_a)
+        b_next, b_prev, b_entry = PolygonClipper._ring_links(b_pos, b_ring, b_inside, flip_b)
+        
+        rings = []
+        visited = np.zeros(len(points), dtype=bool)
+        for start in np.argsort(a_pos, kind="stable").tolist():
+            if visited[start]:
+                continue
+            parts = []
+            current, on_a = start, True
+            for _ in range(2 * len(points) + 2):
+                visited[current] = True
+                if on_a:
+                    coords, offsets, pos, ring, nxt, prv, entry = a_coords, a_rings, a_pos, a_ring, a_next, a_prev, a_entry
+                else:
+                    coords, offsets, pos, ring, nxt, prv, entry = b_coords, b_rings, b_pos, b_ring, b_next, b_prev, b_entry
+                target = nxt[current] if entry[current] else prv[current]
+                parts.append(points[current:current + 1])
+                parts.append(PolygonClipper._walk(coords, offsets, ring[current], pos[current], pos[target],
+                                                  bool(entry[current])))
+                current, on_a = target, not on_a
+                if current == start:
+                    break
+            ring_vertices = np.concatenate(parts)
+            if len(ring_vertices) >= 3:
+                rings.append(ring_vertices)
+        
+        # кольца без пересечений целиком внутри или целиком снаружи другой фигуры
+        a_free = np.setdiff1d(np.arange(len(a)), a_ring)
+        b_free = np.setdiff1d(np.arange(len(b)), b_ring)
+        keep_a = a_inside[a_free] if operation == "intersection" else ~a_inside[a_free]
+        keep_b = ~b_inside[b_free] if operation == "union" else b_inside[b_free]
+        rings += [a[i].vertices for i in a_free[keep_a].tolist()]
+        rings += [b[i].vertices for i in b_free[keep_b].tolist()]
+        return PolygonBatch.from_rings(rings)
+
+class ConvexWindow:
+    # выпуклое окно для отсечения отрезков: вершины против часовой стрелки, начиная с ребра
+    # наименьшего угла, поэтому углы рёбер возрастают и крайние вершины ищутся бинарным поиском
+    __slots__ = ("vertices", "angles", "normals")
+    
+    def __init__(self, vertices: np.ndarray):
+        v = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        # повторяющиеся вершины дают рёбра без направления
+        v = v[np.any(v != np.roll(v, -1, axis=0), axis=1)]
+        if len(v) < 3:
+            raise ValueError("окно должно иметь хотя бы три различные вершины")
+        if PolygonArray(v).signed_area() < 0:
+            v = v[::-1]
+        edges = np.roll(v, -1, axis=0) - v
+        angles = np.mod(np.arctan2(edges[:, 1], edges[:, 0]), 2 * np.pi)
+        shift = int(np.argmin(angles))
+        v, edges, angles = np.roll(v, -shift, axis=0), np.roll(edges, -shift, axis=0), np.roll(angles, -shift)
+        if np.any(np.diff(angles) < 0):
+            raise ValueError("окно должно быть выпуклым")
+        self.vertices = np.ascontiguousarray(v)
+        self.angles = angles
+        self.normals = np.column_stack((-edges[:, 1], edges[:, 0]))
+    
+    def extreme_vertex(self, direction: np.ndarray) -> np.ndarray:
+        # вершина с наибольшей проекцией на направление: начало первого ребра,
+        # повёрнутого дальше чем на 90 градусов от направления
+        phi = np.mod(np.arctan2(direction[:, 1], direction[:, 0]) + np.pi / 2, 2 * np.pi)
+        return np.searchsorted(self.angles, phi) % len(self.vertices)
+    
+    def _crossing(self, start: np.ndarray, length: np.ndarray, sign: float,
+                  w: np.ndarray, origin: np.ndarray, d: np.ndarray) -> np.ndarray:
+        # на цепочке start..start+length значение sign * w·(v - origin) монотонно растёт до >= 0:
+        # бинарный поиск первой такой вершины; возвращается параметр t пересечения с ребром перед ней
+        vx, vy = self.vertices[:, 0], self.vertices[:, 1]
+        m = len(vx)
+        wx, wy = w[:, 0] * sign, w[:, 1] * sign
+        ox, oy = origin[:, 0], origin[:, 1]
+        
+        def f(k):
+            index = start + k
+            index[index >= m] -= m
+            return (vx.take(index) - ox) * wx + (vy.take(index) - oy) * wy
+        
+        lo = np.full(len(start), -1, dtype=np.intp)
+        hi = length.copy()
+        for _ in range(max(int(m).bit_length(), 1)):
+            mid = (lo + hi + 1) >> 1
+            np.minimum(mid, hi, out=mid)
+            ahead = f(mid) >= 0
+            np.copyto(hi, mid, where=ahead)
+            np.copyto(lo, mid, where=~ahead)
+        
+        # t считается по опорной прямой ребра той же формулой, что и в переборе всех рёбер,
+        # иначе конец отрезка точно на ребре может оказаться чуть снаружи;
+        # k = 0 — прямая проходит через первую вершину цепочки, t — её проекция на отрезок
+        edge = np.maximum(hi - 1, 0) + start
+        edge[edge >= m] -= m
+        nx, ny = self.normals[:, 0].take(edge), self.normals[:, 1].take(edge)
+        num = (ox - vx.take(edge)) * nx + (oy - vy.take(edge)) * ny
+        den = d[:, 0] * nx + d[:, 1] * ny
+        at_vertex = ((vx.take(start) - ox) * d[:, 0] + (vy.take(start) - oy) * d[:, 1]) / (d[:, 0] ** 2 + d[:, 1] ** 2)
+        # у строк без пересечения знаменатель может быть нулевым, они отбрасываются в _clip_chunk
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(hi > 0, -num / den, at_vertex)
+    
+    def _clip_chunk(self, seg: np.ndarray, out: np.ndarray, visible: np.ndarray):
+        out[:] = np.nan
+        visible[:] = False
+        p0, d = seg[:, :2], seg[:, 2:] - seg[:, :2]
+        w = np.column_stack((-d[:, 1], d[:, 0]))
+        
+        # вырожденный отрезок-точка: проверка по всем рёбрам, таких отрезков мало
+        point = (d[:, 0] == 0) & (d[:, 1] == 0)
+        if point.any():
+            idx = np.flatnonzero(point)
+            inside = np.all((seg[idx, None, 0] - self.vertices[:, 0]) * self.normals[:, 0] +
+                            (seg[idx, None, 1] - self.vertices[:, 1]) * self.normals[:, 1] >= 0, axis=1)
+            visible[idx] = inside
+            out[idx[inside]] = seg[idx[inside]]
+            idx = np.flatnonzero(~point)
+            seg, p0, d, w = seg[idx], p0[idx], d[idx], w[idx]
+        else:
+            idx = None
+        if not len(seg):
+            return
+        
+        m = len(self.vertices)
+        
+        def f(index):
+            index = index % m
+            return (self.vertices[:, 0].take(index) - p0[:, 0]) * w[:, 0] + (self.vertices[:, 1].take(index) - p0[:, 1]) * w[:, 1]
         
-        segments = []
-        for i in range(1, n + 1):
-            if i >= len(lines):
+        # у ребра, параллельного отрезку, обе вершины крайние: цепочки должны начинаться с дальней
+        # по обходу, иначе отрезок на таком ребре сожмётся в точку; соседи сравниваются точно по f
+        top = self.extreme_vertex(w)
+        bottom = self.extreme_vertex(-w)
+        for _ in range(2):
+            f_top, f_bottom = f(top), f(bottom)
+            top = np.where(f(top + 1) >= f_top, (top + 1) % m, np.where(f(top - 1) > f_top, (top - 1) % m, top))
+            bottom = np.where(f(bottom + 1) <= f_bottom, (bottom + 1) % m,
+                              np.where(f(bottom - 1) < f_bottom, (bottom - 1) % m, bottom))
+        f_top, f_bottom = f(top), f(bottom)
+        hits = (f_top >= 0) & (f_bottom <= 0)
+        
+        # параметры точек, где прямая отрезка входит в окно и выходит из него
+        t1 = self._crossing(bottom, (top - bottom) % m, 1.0, w, p0, d)
+        t2 = self._crossing(top, (bottom - top) % m, -1.0, w, p0, d)
+        u1 = np.maximum(np.minimum(t1, t2), 0.0)
+        u2 = np.minimum(np.maximum(t1, t2), 1.0)
+        shown = hits & (u1 <= u2)
+        
+        # концы внутри окна копируются без пересчёта, как в Лианге-Барски
+        result = np.where((u1 == 0)[:, None], p0, p0 + u1[:, None] * d)
+        result = np.hstack((result, np.where((u2 == 1)[:, None], seg[:, 2:], p0 + u2[:, None] * d)))
+        rows = np.flatnonzero(shown) if idx is None else idx[shown]
+        out[rows] = result[shown]
+        visible[rows] = True
+    
+    def clip(self, segments: np.ndarray, workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Cyrus-Beck за O(log m) на отрезок; невидимые отрезки — NaN, как у пакетного Лианга-Барски
+        seg = np.ascontiguousarray(segments, dtype=np.float64).reshape(-1, 4)
+        out = np.empty_like(seg)
+        visible = np.empty(len(seg), dtype=bool)
+        chunk = ClippingAlgorithms.BATCH_CHUNK
+        bounds = [(start, min(start + chunk, len(seg))) for start in range(0, len(seg), chunk)]
+        
+        def job(bounds):
+            start, end = bounds
+            self._clip_chunk(seg[start:end], out[start:end], visible[start:end])
+        
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(bounds) <= 1:
+            for b in bounds:
+                job(b)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(job, bounds))
+        return out, visible
+    
+    def clip_all_edges(self, segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # классический Cyrus-Beck: каждое ребро для каждого отрезка, O(m) на отрезок
+        seg = np.ascontiguousarray(segments, dtype=np.float64).reshape(-1, 4)
+        out = np.full_like(seg, np.nan)
+        visible = np.zeros(len(seg), dtype=bool)
+        step = max(1, (1 << 20) // len(self.vertices))
+        for first in range(0, len(seg), step):
+            s = seg[first:first + step]
+            p0, d = s[:, None, :2], s[:, None, 2:] - s[:, None, :2]
+            num = ((p0 - self.vertices) * self.normals).sum(axis=2)
+            den = (d * self.normals).sum(axis=2)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = -num / den
+            parallel = den == 0
+            u1 = np.where(den > 0, t, -np.inf).max(axis=1, initial=0.0)
+            u2 = np.where(den < 0, t, np.inf).min(axis=1, initial=1.0)
+            ok = (u1 <= u2) & ~np.any(parallel & (num < 0), axis=1)
+            u1, u2 = np.maximum(u1, 0.0), np.minimum(u2, 1.0)
+            start, direction = s[:, :2], s[:, 2:] - s[:, :2]
+            clipped = np.hstack((start + u1[:, None] * direction, start + u2[:, None] * direction))
+            out[first:first + step][ok] = clipped[ok]
+            visible[first:first + step] = ok
+        return out, visible
+
+class SegmentIndex:
+    def __init__(self, segments: np.ndarray, node_capacity: int = 16):
+        self.segments = np.ascontiguousarray(segments, dtype=np.float64).reshape(-1, 4)
+        self.node_capacity = node_capacity
+        seg = self.segments
+        self.boxes = np.column_stack((np.minimum(seg[:, 0], seg[:, 2]), np.minimum(seg[:, 1], seg[:, 3]),
+                                      np.maximum(seg[:, 0], seg[:, 2]), np.maximum(seg[:, 1], seg[:, 3])))
+        self.levels = []
+        if len(seg):
+            self._bulk_load()
+
+    @staticmethod
+    def _str_order(boxes: np.ndarray, capacity: int) -> np.ndarray:
+        # Sort-Tile-Recursive: вертикальные полосы по x-центру, внутри полосы по y-центру
+        n = len(boxes)
+        pages = -(-n // capacity)
+        slices = max(int(math.ceil(math.sqrt(pages))), 1)
+        per_slice = slices * capacity
+        cx = boxes[:, 0] + boxes[:, 2]
+        cy = boxes[:, 1] + boxes[:, 3]
+        by_x = np.argsort(cx)
+        key = np.empty(n)
+        key[by_x] = np.arange(n) // per_slice
+        # номер полосы + y-центр, приведённый к [0, 1): одна сортировка вместо lexsort
+        low, span = cy.min(), np.ptp(cy)
+        key += (cy - low) / (span * (1 + 1e-9)) if span > 0 else 0
+        return np.argsort(key)
+
+    @staticmethod
+    def _group_boxes(boxes: np.ndarray, capacity: int) -> np.ndarray:
+        starts = np.arange(0, len(boxes), capacity)
+        return np.column_stack((np.minimum.reduceat(boxes[:, 0], starts), np.minimum.reduceat(boxes[:, 1], starts),
+                                np.maximum.reduceat(boxes[:, 2], starts), np.maximum.reduceat(boxes[:, 3], starts)))
+
+    def _bulk_load(self):
+        m = self.node_capacity
+        # уровень листьев: порядок элементов, каждый лист — m подряд идущих элементов
+        self.items = self._str_order(self.boxes, m)
+        n = len(self.items)
+        starts = np.arange(0, n, m)
+        boxes = self._group_boxes(self.boxes[self.items], m)
+        child_start, child_count = starts, np.minimum(m, n - starts)
+        while True:
+            if len(boxes) > 1:
+                # при упаковке следующего уровня узлы переставляются, ссылки на детей едут вместе с ними
+                order = self._str_order(boxes, m)
+                boxes, child_start, child_count = boxes[order], child_start[order], child_count[order]
+            self.levels.append((boxes, child_start, child_count))
+            if len(boxes) == 1:
                 break
-            coords = list(map(float, lines[i].strip().split()))
-            if len(coords) >= 4:
-                p1 = Point(coords[0], coords[1])
-                p2 = Point(coords[2], coords[3])
-                segments.append(Segment(p1, p2))
-        
-        if len(lines) > n + 1:
-            window_coords = list(map(float, lines[n + 1].strip().split()))
-            if len(window_coords) >= 4:
-                xmin, ymin, xmax, ymax = window_coords[0], window_coords[1], window_coords[2], window_coords[3]
+            count = len(boxes)
+            starts = np.arange(0, count, m)
+            boxes, child_start, child_count = self._group_boxes(boxes, m), starts, np.minimum(m, count - starts)
+        self.levels.reverse()
+
+    @staticmethod
+    def _expand(start: np.ndarray, count: np.ndarray) -> np.ndarray:
+        offsets = np.arange(int(count.sum()), dtype=np.int64)
+        offsets -= np.repeat(np.cumsum(count) - count, count)
+        return np.repeat(start, count) + offsets
+
+    def query(self, xmin: float, ymin: float, xmax: float, ymax: float) -> Tuple[np.ndarray, np.ndarray]:
+        # возвращает (целиком внутри окна, пересекающие окно по рамке)
+        if not self.levels:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        partial = np.zeros(1, dtype=np.int64)
+        contained = np.empty(0, dtype=np.int64)
+        for depth, (boxes, child_start, child_count) in enumerate(self.levels):
+            b = boxes[partial]
+            hit = (b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin)
+            inside = hit & (b[:, 0] >= xmin) & (b[:, 2] <= xmax) & (b[:, 1] >= ymin) & (b[:, 3] <= ymax)
+            contained = np.concatenate((contained, partial[inside]))
+            partial = partial[hit & ~inside]
+            # узлы внутри окна раскрываются без проверок
+            partial = self._expand(child_start[partial], child_count[partial])
+            contained = self._expand(child_start[contained], child_count[contained])
+        
+        partial = self.items[partial]
+        b = self.boxes[partial]
+        hit = (b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin)
+        inside = hit & (b[:, 0] >= xmin) & (b[:, 2] <= xmax) & (b[:, 1] >= ymin) & (b[:, 3] <= ymax)
+        accepted = np.concatenate((self.items[contained], partial[inside]))
+        return np.sort(accepted), np.sort(partial[hit & ~inside])
+
+    def clip(self, xmin: float, ymin: float, xmax: float, ymax: float) -> Tuple[np.ndarray, np.ndarray]:
+        # отрезки внутри окна принимаются как есть: для них Лианг-Барски даёт u1 = 0, u2 = 1
+        inside, crossing = self.query(xmin, ymin, xmax, ymax)
+        clipped, visible = ClippingAlgorithms.liang_barsky_batch(self.segments[crossing], xmin, ymin, xmax, ymax)
+        indices = np.concatenate((inside, crossing[visible]))
+        result = np.concatenate((self.segments[inside], clipped[visible]))
+        order = np.argsort(indices, kind="stable")
+        return indices[order], result[order]
+
+def get_segment_index(segments: np.ndarray, key, slot: str = "segment_index") -> SegmentIndex:
+    # индекс строится один раз на набор отрезков; при движении окна повторяется только запрос.
+    # key — ключ набора из session_state: хэш большого массива стоил бы дороже самого запроса
+    cached = st.session_state.get(slot)
+    if cached is None or cached[0] != key:
+        cached = (key, SegmentIndex(segments))
+        st.session_state[slot] = cached
+    return cached[1]
+
+class IncrementalClipper:
+    # Лианг-Барски с запоминанием: для каждого отрезка хранятся dx, dy и параметры u пересечения с прямыми
+    # четырёх сторон окна. Отрезок, проекция которого не задевает полосу между старым и новым положением
+    # стороны, по этой стороне остаётся целиком внутри или целиком снаружи, и его результат не меняется,
+    # поэтому при сдвиге стороны пересчитываются только отрезки из этой полосы (запрос к R-дереву)
+    __slots__ = ("segments", "index", "d", "u", "window", "out", "visible", "last_updated")
+    
+    def __init__(self, segments: np.ndarray, window: Tuple[float, float, float, float],
+                 index: Optional[SegmentIndex] = None):
+        self.index = index if index is not None else SegmentIndex(segments)
+        self.segments = self.index.segments
+        self.d = self.segments[:, 2:] - self.segments[:, :2]
+        # u[k] — параметр пересечения с прямой window[k]: xmin, ymin, xmax, ymax
+        self.u = np.empty((4, len(self.segments)))
+        self.out = np.full_like(self.segments, np.nan)
+        self.visible = np.zeros(len(self.segments), dtype=bool)
+        self.window = tuple(window)
+        self._recompute(np.arange(len(self.segments)), range(4))
+        self.last_updated = len(self.segments)
+    
+    def _recompute(self, rows: np.ndarray, sides):
+        seg, d = self.segments[rows], self.d[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for k in sides:
+                # (lo - a1) / d — та же формула, что в пакетном Лианге-Барски, результат совпадает бит в бит
+                self.u[k, rows] = (self.window[k] - seg[:, k % 2]) / d[:, k % 2]
+        
+        u1 = np.zeros(len(rows))
+        u2 = np.ones(len(rows))
+        visible = np.ones(len(rows), dtype=bool)
+        for axis in (0, 1):
+            lo, hi = self.window[axis], self.window[axis + 2]
+            t_lo, t_hi = self.u[axis, rows], self.u[axis + 2, rows]
+            if lo <= hi:
+                enter, leave = np.minimum(t_lo, t_hi), np.maximum(t_lo, t_hi)
             else:
-                xmin, ymin, xmax, ymax = -10, -10, 10, 10
+                forward = d[:, axis] > 0
+                enter, leave = np.where(forward, t_lo, t_hi), np.where(forward, t_hi, t_lo)
+            parallel = np.abs(d[:, axis]) < 1e-10
+            a = seg[:, axis]
+            visible &= ~parallel | ((a - lo >= 0) & (hi - a >= 0))
+            enter[parallel] = -np.inf
+            leave[parallel] = np.inf
+            np.maximum(u1, enter, out=u1)
+            np.minimum(u2, leave, out=u2)
+        visible &= u1 <= u2
+        
+        scale = np.where(visible, 1.0, np.nan)
+        u1 *= scale
+        u2 *= scale
+        whole = (u1 == 0) & (u2 == 1)
+        result = np.empty((len(rows), 4))
+        for col in (0, 1):
+            result[:, col] = u1 * d[:, col] + seg[:, col]
+            result[:, col + 2] = np.where(whole, seg[:, col + 2], u2 * d[:, col] + seg[:, col])
+        self.out[rows] = result
+        self.visible[rows] = visible
+    
+    def _strip(self, side: int, a: float, b: float) -> np.ndarray:
+        lo, hi = min(a, b), max(a, b)
+        if side % 2 == 0:
+            inside, crossing = self.index.query(lo, -np.inf, hi, np.inf)
         else:
-            xmin, ymin, xmax, ymax = -10, -10, 10, 10
+            inside, crossing = self.index.query(-np.inf, lo, np.inf, hi)
+        return np.concatenate((inside, crossing))
+    
+    def update(self, window: Tuple[float, float, float, float]) -> np.ndarray:
+        # возвращает номера пересчитанных отрезков
+        window = tuple(window)
+        old, self.window = self.window, window
+        changed = [k for k in range(4) if window[k] != old[k]]
+        if not changed:
+            return np.empty(0, dtype=np.intp)
+        # для вывернутого окна (min > max) рассуждение о полосах не работает — считается всё заново
+        if old[0] > old[2] or old[1] > old[3] or window[0] > window[2] or window[1] > window[3]:
+            rows = np.arange(len(self.segments))
+            self._recompute(rows, range(4))
+        else:
+            rows = np.unique(np.concatenate([self._strip(k, old[k], window[k]) for k in changed]))
+            # u по сдвинутой стороне у остальных отрезков устаревает, но для них эта сторона
+            # не ограничивает видимую часть ни в старом, ни в новом окне
+            self._recompute(rows, changed)
+        self.last_updated = len(rows)
+        return rows
+    
+    def clip(self, window: Tuple[float, float, float, float]) -> Tuple[np.ndarray, np.ndarray]:
+        self.update(window)
+        return self.out, self.visible
+
+def get_incremental_clipper(segments: np.ndarray, key, window: Tuple[float, float, float, float],
+                            slot: str = "incremental_clipper") -> IncrementalClipper:
+    # состояние отсечения живёт, пока не меняется набор отрезков (его ключ key); окно только обновляется
+    cached = st.session_state.get(slot)
+    if cached is None or cached[0] != key:
+        cached = (key, IncrementalClipper(segments, window, get_segment_index(segments, key)))
+        st.session_state[slot] = cached
+    return cached[1]
+
+def get_convex_window(vertices: np.ndarray, slot: str = "convex_window") -> ConvexWindow:
+    # нормали и углы рёбер окна считаются заново, только когда окно меняется
+    key = (vertices.shape, hash(np.ascontiguousarray(vertices).tobytes()))
+    cached = st.session_state.get(slot)
+    if cached is None or cached[0] != key:
+        cached = (key, ConvexWindow(vertices))
+        st.session_state[slot] = cached
+    return cached[1]
+
+def show_index_demo():
+    with st.expander("🌲 Пространственный индекс (упакованное R-дерево, STR)"):
+        col_n, col_size = st.columns(2)
+        with col_n:
+            n = st.select_slider("Количество отрезков", [100_000, 1_000_000, 10_000_000], 100_000)
+        with col_size:
+            size = st.slider("Полуширина окна", 1, 200, 20)
+        col_x, col_y = st.columns(2)
+        with col_x:
+            cx = st.slider("Центр окна X", -1000, 1000, 0)
+        with col_y:
+            cy = st.slider("Центр окна Y", -1000, 1000, 0)
+        
+        # набор и индекс строятся только по кнопке: тело свёрнутого блока тоже выполняется при каждом перезапуске
+        data = st.session_state.get("index_demo")
+        if data is not None and len(data[0]) != n:
+            del st.session_state.index_demo
+            data = None
+        if st.button("Построить индекс"):
+            rng = np.random.default_rng(0)
+            segments = rng.uniform(-1000, 1000, (n, 4))
+            segments[:, 2:] = segments[:, :2] + rng.normal(0, 3, (n, 2))
+            start_time = time.perf_counter()
+            data = (segments, SegmentIndex(segments), (time.perf_counter() - start_time) * 1000)
+            st.session_state.index_demo = data
+        if data is None:
+            st.info("Нажмите 'Построить индекс', чтобы сгенерировать отрезки и построить R-дерево")
+            return
+        segments, index, build_ms = data
+        window = (cx - size, cy - size, cx + size, cy + size)
         
-        return segments, (xmin, ymin, xmax, ymax)
+        start_time = time.perf_counter()
+        inside, crossing = index.query(*window)
+        indices, _ = index.clip(*window)
+        query_ms = (time.perf_counter() - start_time) * 1000
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Построение индекса", f"{build_ms:.0f} мс")
+        col2.metric("Запрос и отсечение", f"{query_ms:.2f} мс")
+        col3.metric("Видимых отрезков", f"{len(indices)}")
+        st.write(f"Кандидатов: {len(inside) + len(crossing)} из {n}; "
+                 f"целиком внутри (без параметрических вычислений): {len(inside)}, "
+                 f"на границе (Лианг-Барски): {len(crossing)}")
+        if st.button("Сравнить с отсечением всего набора"):
+            start_time = time.perf_counter()
+            _, visible = ClippingAlgorithms.liang_barsky_batch(segments, *window)
+            full_ms = (time.perf_counter() - start_time) * 1000
+            st.write(f"Пакетный Лианг-Барски по всем отрезкам: {full_ms:.1f} мс, "
+                     f"результат совпадает: {'да' if np.array_equal(np.flatnonzero(visible), indices) else 'нет'}")
+
+def random_footprints(n: int, seed: int = 0) -> PolygonBatch:
+    # "здания": выпуклые 4-8-угольники радиуса 1-5 в квадрате 2000 x 2000
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(4, 9, n)
+    offsets = np.zeros(n + 1, dtype=np.intp)
+    np.cumsum(counts, out=offsets[1:])
+    ring = np.repeat(np.arange(n), counts)
+    angle = 2 * np.pi * (np.arange(offsets[-1]) - offsets[ring]) / counts[ring] + rng.uniform(0, 2 * np.pi, n)[ring]
+    radius = rng.uniform(1, 5, n)[ring]
+    centers = rng.uniform(-1000, 1000, (n, 2))[ring]
+    return PolygonBatch(centers + np.column_stack((radius * np.cos(angle), radius * np.sin(angle))), offsets)
+
+def show_polygon_batch_demo():
+    with st.expander("🏘️ Пакетное отсечение многоугольников (Сазерленд-Ходгман)"):
+        col_n, col_size = st.columns(2)
+        with col_n:
+            n = st.select_slider("Количество многоугольников", [10_000, 100_000, 1_000_000], 100_000)
+        with col_size:
+            size = st.slider("Полуширина окна ", 10, 1000, 300)
+        
+        if st.button("Сравнить пакетное отсечение с поштучным"):
+            # в состоянии сессии хранятся массивы: классы заново создаются при каждом перезапуске скрипта
+            data = st.session_state.get("polygon_batch_demo")
+            if data is None or len(data[1]) != n + 1:
+                batch = random_footprints(n)
+                data = (batch.vertices, batch.offsets)
+                st.session_state.polygon_batch_demo = data
+            batch = PolygonBatch(*data)
+            window = (-size, -size, size, size)
+            
+            start_time = time.perf_counter()
+            clipped = ClippingAlgorithms.sutherland_hodgman_batch(batch, *window)
+            batch_ms = (time.perf_counter() - start_time) * 1000
+            
+            sample = min(n, 2000)
+            start_time = time.perf_counter()
+            for i in range(sample):
+                ClippingAlgorithms.sutherland_hodgman_polygon(batch[i], *window)
+            loop_ms = (time.perf_counter() - start_time) * 1000 * n / sample
+            st.session_state.polygon_batch_timing = {
+                "batch_ms": batch_ms, "loop_ms": loop_ms, "visible": int((clipped.counts > 0).sum()),
+                "vertices_in": len(batch.vertices), "vertices_out": len(clipped.vertices),
+                "sample": sample, "n": n, "size": size,
+            }
+        
+        timing = st.session_state.get("polygon_batch_timing")
+        if timing:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Пакетное отсечение", f"{timing['batch_ms']:.0f} мс")
+            col2.metric("По одному (оценка)", f"{timing['loop_ms']:.0f} мс")
+            col3.metric("Видимых многоугольников", f"{timing['visible']}")
+            st.write(f"{timing['n']} многоугольников, полуширина окна {timing['size']}. "
+                     f"Вершин на входе: {timing['vertices_in']}, на выходе: {timing['vertices_out']}; "
+                     f"оценка по одному — по первым {timing['sample']} многоугольникам")
+
+def wavy_polygon(n: int, center: Tuple[float, float], radius: float, rng: np.random.Generator,
+                 waves: int = 7, noise: float = 0.02) -> np.ndarray:
+    # невыпуклый многоугольник с волнистой границей: число пересечений двух таких фигур растёт как O(n)
+    angle = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = radius * (1 + 0.25 * np.sin(waves * angle + rng.uniform(0, 2 * np.pi)) + rng.uniform(-noise, noise, n))
+    return np.column_stack((center[0] + r * np.cos(angle), center[1] + r * np.sin(angle)))
+
+def _best_time(func, repeats: int) -> float:
+    best = math.inf
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best * 1000
+
+def benchmark_polygon_clipping(sizes: List[int], repeats: int = 3, all_pairs_limit: int = 2000,
+                               progress=None) -> List[dict]:
+    rows = []
+    for done, n in enumerate(sizes):
+        rng = np.random.default_rng(n)
+        # A — волнистый многоугольник с дырой, B — такой же, сдвинутый
+        a = PolygonBatch.from_rings([wavy_polygon(n, (0, 0), 8, rng), wavy_polygon(max(n // 10, 3), (0, 0), 3, rng)])
+        b = PolygonBatch.from_rings([wavy_polygon(n, (3, 1), 8, rng)])
+        a_start, a_end = PolygonClipper._edges(a)
+        b_start, b_end = PolygonClipper._edges(b)
+        pairs = PolygonClipper.candidate_pairs(a_start, a_end, b_start, b_end)
+        intersections = len(PolygonClipper.edge_intersections(a_start, a_end, b_start, b_end, pairs)[0])
+        row = {
+            "Вершин A / B": f"{len(a.vertices)} / {len(b.vertices)}",
+            "Пересечений": intersections,
+            "Пар-кандидатов": len(pairs[0]),
+            "Всех пар": len(a_start) * len(b_start),
+            "Заметание, мс": round(_best_time(
+                lambda: PolygonClipper.edge_intersections(a_start, a_end, b_start, b_end), repeats), 2),
+            "Все пары, мс": None,
+        }
+        if len(a_start) <= all_pairs_limit:
+            grid = (np.repeat(np.arange(len(a_start)), len(b_start)), np.tile(np.arange(len(b_start)), len(a_start)))
+            row["Все пары, мс"] = round(_best_time(
+                lambda: PolygonClipper.edge_intersections(a_start, a_end, b_start, b_end, grid), repeats), 2)
+        for label, operation in POLYGON_OPERATIONS.items():
+            row[f"{label.split()[0]}, мс"] = round(_best_time(lambda: PolygonClipper.clip(a, b, operation), repeats), 2)
+        rows.append(row)
+        if progress is not None:
+            progress((done + 1) / len(sizes))
+    return rows
+
+def show_polygon_clipping_benchmark():
+    with st.expander("⏱️ Грейнер-Хорман на больших многоугольниках"):
+        sizes = st.multiselect("Вершин в многоугольнике", [1_000, 2_000, 5_000, 10_000, 50_000, 100_000],
+                               default=[1_000, 5_000, 10_000])
+        if st.button("Запустить замеры"):
+            progress = st.progress(0.0)
+            st.session_state.polygon_clipping_benchmark = benchmark_polygon_clipping(sorted(sizes),
+                                                                                     progress=progress.progress)
+            progress.empty()
+        rows = st.session_state.get("polygon_clipping_benchmark")
+        if rows:
+            st.dataframe(rows, use_container_width=True)
+            st.caption("Время — лучшее из трёх запусков. 'Все пары' — проверка каждого ребра A с каждым ребром B "
+                       "(только для небольших многоугольников).")
+
+BENCHMARK_WINDOW = (-10.0, -10.0, 10.0, 10.0)
+# скалярные версии по одному объекту на больших наборах только оцениваются по первым строкам
+BENCHMARK_SCALAR_LIMIT = 20_000
+BENCHMARK_DEGENERACIES = {
+    "Параллельные границам": "parallel",
+    "На границе окна": "collinear",
+    "Конец на границе или в углу": "vertex",
+    "Нулевой длины": "point",
+}
+
+def benchmark_segments(n: int, coverage: float, degenerate: float = 0.0,
+                       kinds: Tuple[str, ...] = ("parallel", "collinear", "vertex", "point"),
+                       seed: int = 0) -> np.ndarray:
+    # окно занимает долю coverage площади квадрата с данными; доля degenerate заменяется
+    # вырожденными случаями выбранных видов по очереди
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = BENCHMARK_WINDOW
+    half = (xmax - xmin) / 2 / math.sqrt(coverage)
+    centers = rng.uniform(-half, half, (n, 2))
+    angle = rng.uniform(0, 2 * np.pi, n)
+    length = rng.uniform(0, xmax - xmin, n)
+    offset = np.column_stack((np.cos(angle), np.sin(angle))) * (length / 2)[:, None]
+    segments = np.hstack((centers - offset, centers + offset))
     
-    except:
-        return None
+    count = int(round(n * degenerate)) if kinds else 0
+    rows = rng.choice(n, count, replace=False)
+    for k, kind in enumerate(kinds):
+        part = rows[k::len(kinds)]
+        m = len(part)
+        a, b = rng.uniform(-half, half, m), rng.uniform(-half, half, m)
+        along = rng.uniform(xmin, xmax, m)
+        side = rng.choice([xmin, xmax], m)
+        horizontal = rng.random(m) < 0.5
+        if kind == "parallel":
+            # горизонтальные и вертикальные, в том числе частично внутри окна
+            segments[part] = np.where(horizontal[:, None], np.column_stack((a, along, b, along)),
+                                      np.column_stack((along, a, along, b)))
+        elif kind == "collinear":
+            # на продолжении стороны окна
+            segments[part] = np.where(horizontal[:, None], np.column_stack((a, side, b, side)),
+                                      np.column_stack((side, a, side, b)))
+        elif kind == "vertex":
+            # первый конец на стороне окна, у части отрезков — в углу
+            corner = rng.random(m) < 0.25
+            start = np.where(horizontal[:, None], np.column_stack((along, side)), np.column_stack((side, along)))
+            start[corner] = np.column_stack((rng.choice([xmin, xmax], m), rng.choice([ymin, ymax], m)))[corner]
+            segments[part] = np.hstack((start, np.column_stack((a, b))))
+        elif kind == "point":
+            segments[part] = np.column_stack((a, b, a, b))
+    return segments
+
+def benchmark_polygon(n: int, coverage: float, degenerate: float = 0.0, seed: int = 0) -> np.ndarray:
+    # волнистый невыпуклый многоугольник; доля degenerate ближайших к границам окна вершин
+    # сдвигается точно на границу — получаются вершины на рёбрах и рёбра вдоль сторон окна;
+    # сдвиг идёт по лучу из центра, поэтому многоугольник остаётся звёздным и без самопересечений
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = BENCHMARK_WINDOW
+    half = (xmax - xmin) / 2 / math.sqrt(coverage)
+    center = rng.uniform(-1, 1, 2)
+    vertices = wavy_polygon(n, tuple(center), half / 1.25, rng)
+    count = int(round(n * degenerate))
+    if count:
+        lines = np.array([xmin, xmax, ymin, ymax])
+        axis = np.array([0, 0, 1, 1])
+        offset = vertices[:, axis] - center[axis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = (lines - center[axis]) / offset
+        move = np.where(scale > 0, np.abs(scale - 1), np.inf)
+        nearest = move.argmin(axis=1)
+        snapped = np.argsort(move.min(axis=1), kind="stable")[:count]
+        snapped = snapped[np.isfinite(move[snapped, nearest[snapped]])]
+        factor = scale[snapped, nearest[snapped]]
+        vertices[snapped] = center + (vertices[snapped] - center) * factor[:, None]
+        # координата на границе — точно значение границы, без ошибки округления
+        vertices[snapped, axis[nearest[snapped]]] = lines[nearest[snapped]]
+    return vertices
+
+def time_call(func, warmup: int = 1, repeats: int = 7, min_sample_time: float = 0.002) -> np.ndarray:
+    for _ in range(warmup):
+        func()
+    # короткие вызовы группируются, чтобы один замер был заметно дольше разрешения таймера
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_sample_time or number >= 1 << 12:
+            break
+        number *= 2
+    samples = np.empty(repeats)
+    for k in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples[k] = (time.perf_counter() - start) / number
+    return samples
+
+def _sample_stats(samples: np.ndarray) -> Tuple[float, float]:
+    q1, median, q3 = np.percentile(samples * 1000, [25, 50, 75])
+    return float(median), float(q3 - q1)
+
+def _liang_barsky_scalar(segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    out = np.full((len(segments), 4), np.nan)
+    for i, (x1, y1, x2, y2) in enumerate(segments.tolist()):
+        result = ClippingAlgorithms.liang_barsky(x1, y1, x2, y2, *BENCHMARK_WINDOW)
+        if result:
+            out[i] = (result[0].x, result[0].y, result[1].x, result[1].y)
+    return out, ~np.isnan(out[:, 0])
+
+def _index_clip(index: SegmentIndex) -> Tuple[np.ndarray, np.ndarray]:
+    indices, clipped = index.clip(*BENCHMARK_WINDOW)
+    out = np.full((len(index.segments), 4), np.nan)
+    out[indices] = clipped
+    visible = np.zeros(len(out), dtype=bool)
+    visible[indices] = True
+    return out, visible
+
+def _window_vertices() -> np.ndarray:
+    xmin, ymin, xmax, ymax = BENCHMARK_WINDOW
+    return np.array([(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)], dtype=np.float64)
+
+def benchmark_segment_clipping(sizes: List[int], coverage: float, degenerate: float, kinds: Tuple[str, ...],
+                               warmup: int = 1, repeats: int = 7, progress=None) -> List[dict]:
+    # эталон — пакетный Лианг-Барски; остальные алгоритмы сравниваются с ним по видимости и координатам
+    rows = []
+    for done, n in enumerate(sizes):
+        segments = benchmark_segments(n, coverage, degenerate, kinds, seed=n)
+        reference, reference_visible = ClippingAlgorithms.liang_barsky_batch(segments, *BENCHMARK_WINDOW)
+        
+        start_time = time.perf_counter()
+        index = SegmentIndex(segments)
+        index_ms = (time.perf_counter() - start_time) * 1000
+        start_time = time.perf_counter()
+        window = ConvexWindow(_window_vertices())
+        window_ms = (time.perf_counter() - start_time) * 1000
+        scalar = segments[:BENCHMARK_SCALAR_LIMIT]
+        
+        cases = [
+            ("Лианг-Барски (по одному)", lambda: _liang_barsky_scalar(scalar), None, len(scalar)),
+            ("Лианг-Барски (пакетный)",
+             lambda: ClippingAlgorithms.liang_barsky_batch(segments, *BENCHMARK_WINDOW), None, n),
+            ("R-дерево + Лианг-Барски", lambda: _index_clip(index), index_ms, n),
+            ("Cyrus-Beck O(log m)", lambda: window.clip(segments), window_ms, n),
+            ("Cyrus-Beck (все рёбра)", lambda: window.clip_all_edges(segments), window_ms, n),
+        ]
+        for name, func, prepare_ms, count in cases:
+            median, iqr = _sample_stats(time_call(func, warmup, repeats))
+            out, visible = func()
+            mismatched = int((visible != reference_visible[:count]).sum())
+            both = visible & reference_visible[:count]
+            expected = reference[:count][both]
+            error = float(np.abs(out[both] - expected).max()) if both.any() else 0.0
+            rows.append({
+                "Алгоритм": name,
+                "Отрезков": n,
+                "Замерено": count,
+                "Медиана, мс": round(median * n / count, 3),
+                "IQR, мс": round(iqr * n / count, 3),
+                "нс на отрезок": round(median * 1e6 / count, 1),
+                "Подготовка, мс": round(prepare_ms, 2) if prepare_ms is not None else None,
+                "Видимых": int(visible.sum()),
+                "Расхождений видимости": mismatched,
+                "Макс. отклонение": error,
+                "Совпадает": bool(mismatched == 0 and error <= 1e-9 * (1 + np.abs(expected).max(initial=0))),
+            })
+        if progress is not None:
+            progress((done + 1) / len(sizes))
+    return rows
+
+def benchmark_polygon_algorithms(sizes: List[int], coverage: float, degenerate: float,
+                                 warmup: int = 1, repeats: int = 7, progress=None) -> List[dict]:
+    # одна и та же операция "многоугольник ∩ окно" четырьмя способами; эталон площади — Сазерленд-Ходгман
+    window = PolygonArray(_window_vertices())
+    rows = []
+    for done, n in enumerate(sizes):
+        subject = PolygonArray(benchmark_polygon(n, coverage, degenerate, seed=n))
+        batch = PolygonBatch.from_rings([subject.vertices])
+        
+        def rings_summary(result: PolygonBatch) -> Tuple[int, float]:
+            return len(result.vertices), sum(abs(result[i].signed_area()) for i in range(len(result)))
+        
+        cases = [
+            ("Сазерленд-Ходгман",
+             lambda: ClippingAlgorithms.sutherland_hodgman_polygon(subject, *BENCHMARK_WINDOW),
+             lambda r: (len(r.vertices), abs(r.signed_area())) if r is not None else (0, 0.0)),
+            ("Сазерленд-Ходгман (пакетный)",
+             lambda: ClippingAlgorithms.sutherland_hodgman_batch(batch, *BENCHMARK_WINDOW), rings_summary),
+            ("Cyrus-Beck", lambda: ClippingAlgorithms.cyrus_beck_polygon(subject, window),
+             lambda r: (len(r.vertices), abs(r.signed_area())) if r is not None else (0, 0.0)),
+            ("Грейнер-Хорман", lambda: PolygonClipper.clip(subject, window, "intersection"),
+             lambda r: (len(r.vertices), PolygonClipper.area(r) if len(r) else 0.0)),
+        ]
+        reference = None
+        for name, func, summary in cases:
+            median, iqr = _sample_stats(time_call(func, warmup, repeats))
+            vertices, area = summary(func())
+            reference = area if reference is None else reference
+            deviation = abs(area - reference) / max(reference, 1e-12) if reference or area else 0.0
+            rows.append({
+                "Алгоритм": name,
+                "Вершин": n,
+                "Медиана, мс": round(median, 3),
+                "IQR, мс": round(iqr, 3),
+                "мкс на вершину": round(median * 1000 / n, 3),
+                "Вершин результата": vertices,
+                "Площадь": round(area, 6),
+                "Отклонение площади": deviation,
+                "Совпадает": deviation <= 1e-6,
+            })
+        if progress is not None:
+            progress((done + 1) / len(sizes))
+    return rows
+
+def benchmark_report(segment_rows: List[dict], polygon_rows: List[dict], **settings) -> dict:
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "settings": settings,
+        "segments": segment_rows,
+        "polygons": polygon_rows,
+    }
+
+def _scaling_chart(rows: List[dict], size_column: str, value_column: str):
+    series = {}
+    for r in rows:
+        series.setdefault(r["Алгоритм"], {})[r[size_column]] = r[value_column]
+    st.line_chart({name: dict(sorted(values.items())) for name, values in series.items()})
+
+def show_clipping_benchmark():
+    with st.expander("🧪 Замеры и проверка всех алгоритмов"):
+        col_s, col_p = st.columns(2)
+        with col_s:
+            segment_sizes = st.multiselect("Отрезков в наборе", [1_000, 10_000, 100_000, 1_000_000],
+                                           default=[1_000, 10_000, 100_000])
+        with col_p:
+            polygon_sizes = st.multiselect("Вершин в многоугольнике ", [100, 1_000, 10_000, 100_000],
+                                           default=[100, 1_000, 10_000])
+        col_c, col_d = st.columns(2)
+        with col_c:
+            coverage = st.select_slider("Доля области данных, занятая окном", [0.01, 0.1, 0.25, 0.5, 1.0], 0.25)
+        with col_d:
+            degenerate = st.slider("Доля вырожденных случаев, %", 0, 50, 10) / 100
+        kinds = st.multiselect("Вырожденные отрезки", list(BENCHMARK_DEGENERACIES), default=list(BENCHMARK_DEGENERACIES))
+        col_w, col_n = st.columns(2)
+        with col_w:
+            warmup = st.number_input("Прогревочных запусков", 0, 10, 1)
+        with col_n:
+            repeats = st.number_input("Замеров на случай", 3, 50, 7)
+        
+        if st.button("Запустить замеры и проверку"):
+            progress = st.progress(0.0)
+            kind_codes = tuple(BENCHMARK_DEGENERACIES[k] for k in kinds)
+            total = max(len(segment_sizes) + len(polygon_sizes), 1)
+            segment_rows = benchmark_segment_clipping(
+                sorted(segment_sizes), coverage, degenerate, kind_codes, int(warmup), int(repeats),
+                lambda p: progress.progress(p * len(segment_sizes) / total))
+            polygon_rows = benchmark_polygon_algorithms(
+                sorted(polygon_sizes), coverage, degenerate, int(warmup), int(repeats),
+                lambda p: progress.progress((len(segment_sizes) + p * len(polygon_sizes)) / total))
+            progress.empty()
+            st.session_state.clipping_benchmark = benchmark_report(
+                segment_rows, polygon_rows, segment_sizes=sorted(segment_sizes), polygon_sizes=sorted(polygon_sizes),
+                coverage=coverage, degenerate=degenerate, kinds=list(kind_codes), window=list(BENCHMARK_WINDOW),
+                warmup=int(warmup), repeats=int(repeats))
+        
+        report = st.session_state.get("clipping_benchmark")
+        if not report:
+            st.info("Нажмите 'Запустить замеры и проверку', чтобы получить таблицы для этой машины")
+            return
+        
+        machine = report["machine"]
+        st.write(f"**Машина:** {machine['processor']}, {machine['cpu_count']} ядер, "
+                 f"Python {machine['python']}, NumPy {machine['numpy']}")
+        failed = [r["Алгоритм"] for r in report["segments"] + report["polygons"] if not r["Совпадает"]]
+        if failed:
+            st.warning(f"Результаты расходятся с эталоном: {', '.join(sorted(set(failed)))}")
+        else:
+            st.success("Все алгоритмы совпадают с эталоном")
+        
+        if report["segments"]:
+            st.write("**Отрезки** (эталон — пакетный Лианг-Барски)")
+            st.dataframe(report["segments"], use_container_width=True)
+            st.write("**Время на отрезок (нс) от размера набора**")
+            _scaling_chart(report["segments"], "Отрезков", "нс на отрезок")
+        if report["polygons"]:
+            st.write("**Многоугольники** (эталон площади — Сазерленд-Ходгман)")
+            st.dataframe(report["polygons"], use_container_width=True)
+            st.write("**Время на вершину (мкс) от размера многоугольника**")
+            _scaling_chart(report["polygons"], "Вершин", "мкс на вершину")
+        st.caption(f"Время — медиана {report['settings']['repeats']} замеров. Скалярный Лианг-Барски замеряется "
+                   f"не более чем на {BENCHMARK_SCALAR_LIMIT} отрезках и пересчитывается на весь набор; "
+                   "подготовка (R-дерево, нормали окна) в замер не входит.")
+        
+        st.download_button("Скачать результаты (JSON)",
+                           json.dumps(report, ensure_ascii=False, indent=2),
+                           file_name="clipping_benchmark.json", mime="application/json")
+
+def segments_to_array(segments: List[Segment]) -> np.ndarray:
+    return SegmentArray.from_segments(segments).coords
+
+def array_to_segments(coords: np.ndarray) -> List[Segment]:
+    return SegmentArray(coords).to_segments()
+
+SEGMENT_MAGIC = b"SEGBIN"
+# заголовок: сигнатура, версия, тип чисел ('f' или 'd'), число отрезков, окно отсечения
+SEGMENT_HEADER = struct.Struct("<6sBcQ4d")
+SEGMENT_DTYPES = {b"f": np.dtype("<f4"), b"d": np.dtype("<f8")}
+DEFAULT_WINDOW = (-10.0, -10.0, 10.0, 10.0)
+PARSE_CHUNK = 1 << 24
+MAX_SEGMENT_OBJECTS = 5000
+MAX_REPORTED_ERRORS = 100
+# отрисовка: сколько отрезков рисовать, до скольких показывать концы маркерами, с какого числа растрировать
+PLOT_MAX_SEGMENTS = 20000
+PLOT_MAX_MARKERS = 2000
+PLOT_RASTERIZE_FROM = 5000
+DETAILS_PAGE_SIZE = 100
+POLYGON_OPERATIONS = {"Пересечение": "intersection", "Объединение": "union", "Разность (окно − многоугольник)": "difference"}
+OPERATION_SIGNS = {"intersection": "∩", "union": "∪", "difference": "−"}
+
+class LoadedSegments:
+    def __init__(self, segments: np.ndarray, window: Tuple[float, float, float, float],
+                 declared: int, errors: List[Tuple[int, str]], error_count: int,
+                 window_found: bool = True, binary: bool = False):
+        self.segments = segments
+        self.window = window
+        self.declared = declared
+        self.errors = errors
+        self.error_count = error_count
+        self.window_found = window_found
+        self.binary = binary
+
+class SegmentTextReader:
+    # потоковый разбор формата "n / X1 Y1 X2 Y2 / Xmin Ymin Xmax Ymax" блоками по chunk_bytes
+    def __init__(self, source, chunk_bytes: int = PARSE_CHUNK, max_errors: int = MAX_REPORTED_ERRORS):
+        self.source = source
+        self.chunk_bytes = chunk_bytes
+        self.max_errors = max_errors
+        self.declared = None
+        self.window = None
+        self.window_found = False
+        self.errors = []
+        self.error_count = 0
+        self.line_no = 0
+
+    def _report(self, line_no: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_no, message))
+
+    def _blocks(self):
+        # блоки всегда заканчиваются переводом строки, хвост переносится в следующий блок
+        source = self.source
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        tail = b""
+        while True:
+            block = source.read(self.chunk_bytes)
+            if not block:
+                break
+            cut = block.rfind(b"\n")
+            if cut < 0:
+                tail += block
+                continue
+            yield tail + block[:cut + 1]
+            tail = block[cut + 1:]
+        if tail:
+            yield tail + b"\n"
 
-def create_plot(segments: List[Segment], polygon: Optional[Polygon] = None,
+    def _parse_rows(self, chunk: bytes, count: int, first_line: int) -> np.ndarray:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                data = np.loadtxt(io.BytesIO(chunk), dtype=np.float64, comments=None, ndmin=2, usecols=range(4))
+            # пустые строки loadtxt пропускает, поэтому совпадение формы значит "в каждой строке есть 4 числа";
+            # лишние столбцы, как и раньше, не учитываются
+            if data.shape == (count, 4) and np.isfinite(data).all():
+                return data
+        except ValueError:
+            pass
+        
+        # медленный путь только для блока с ошибками: построчно, с номерами строк
+        rows = []
+        for offset, line in enumerate(chunk.split(b"\n")[:count]):
+            tokens = line.split()
+            if len(tokens) < 4:
+                self._report(first_line + offset, f"ожидалось 4 числа, получено {len(tokens)}")
+                continue
+            tokens = tokens[:4]
+            try:
+                values = [float(token) for token in tokens]
+            except ValueError:
+                self._report(first_line + offset, f"не число: '{line.decode('utf-8', 'replace').strip()}'")
+                continue
+            if not all(math.isfinite(v) for v in values):
+                self._report(first_line + offset, "координаты должны быть конечными")
+                continue
+            rows.append(values)
+        return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+    def _parse_header(self, line: bytes):
+        try:
+            n = int(line)
+        except ValueError:
+            raise ValueError(f"строка {self.line_no}: ожидалось количество отрезков, получено "
+                             f"'{line.decode('utf-8', 'replace').strip()}'")
+        if n < 0:
+            raise ValueError(f"строка {self.line_no}: количество отрезков не может быть отрицательным")
+        self.declared = n
+
+    def _parse_window(self, line: bytes):
+        tokens = line.split()
+        try:
+            window = tuple(float(token) for token in tokens[:4])
+        except ValueError:
+            window = ()
+        if len(window) == 4 and all(math.isfinite(v) for v in window):
+            self.window = window
+            self.window_found = True
+        else:
+            self._report(self.line_no, "окно отсечения должно задаваться четырьмя числами")
+
+    def raw_chunks(self):
+        # строки отрезков без разбора чисел: (байты, число строк, номер первой строки);
+        # заголовок и окно разбираются здесь же, поэтому разбор кусков можно отдать другим процессам
+        parsed = 0
+        for block in self._blocks():
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            start, k = 0, 0
+            while k < len(newlines):
+                if self.declared is not None and parsed < self.declared:
+                    take = min(self.declared - parsed, len(newlines) - k)
+                    end = int(newlines[k + take - 1]) + 1
+                    first_line = self.line_no + 1
+                    parsed += take
+                    self.line_no += take
+                    yield block[start:end], take, first_line
+                    start, k = end, k + take
+                    continue
+                
+                line = block[start:newlines[k]]
+                start, k = int(newlines[k]) + 1, k + 1
+                self.line_no += 1
+                if self.declared is None:
+                    if line.strip():
+                        self._parse_header(line)
+                    continue
+                # после окна идут данные многоугольника, к отрезкам они не относятся
+                self._parse_window(line)
+                return
+        
+        if self.declared is None:
+            raise ValueError("файл пуст: нет строки с количеством отрезков")
+        if parsed < self.declared:
+            self._report(self.line_no + 1, f"объявлено {self.declared} отрезков, в файле только {parsed} строк")
+
+    def __iter__(self):
+        for chunk, count, first_line in self.raw_chunks():
+            rows = self._parse_rows(chunk, count, first_line)
+            if len(rows):
+                yield rows
+
+    def result(self, segments: np.ndarray) -> LoadedSegments:
+        return LoadedSegments(segments, self.window or DEFAULT_WINDOW, self.declared,
+                              self.errors, self.error_count, self.window_found)
+
+def parse_segments_text(source, chunk_bytes: int = PARSE_CHUNK) -> LoadedSegments:
+    reader = SegmentTextReader(source, chunk_bytes)
+    blocks = list(reader)
+    segments = np.concatenate(blocks) if blocks else np.empty((0, 4))
+    return reader.result(segments)
+
+def write_segment_binary(segments: np.ndarray, window: Tuple[float, float, float, float],
+                         target=None, dtype=np.float32):
+    dtype = np.dtype(dtype).newbyteorder("<")
+    code = {4: b"f", 8: b"d"}[dtype.itemsize]
+    data = np.ascontiguousarray(segments, dtype=dtype).reshape(-1, 4)
+    header = SEGMENT_HEADER.pack(SEGMENT_MAGIC, 1, code, len(data), *window)
+    if target is None:
+        return header + data.tobytes()
+    with open(target, "wb") as f:
+        f.write(header)
+        data.tofile(f)
+
+def convert_segments_text(source, target, dtype=np.float32, chunk_bytes: int = PARSE_CHUNK) -> LoadedSegments:
+    # текст разбирается блоками и сразу дописывается в двоичный файл: в памяти только один блок.
+    # Путь к файлу открывается, как в load_segments
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return convert_segments_text(f, target, dtype, chunk_bytes)
+    dtype = np.dtype(dtype).newbyteorder("<")
+    reader = SegmentTextReader(source, chunk_bytes)
+    count = 0
+    with open(target, "wb") as f:
+        f.write(b"\0" * SEGMENT_HEADER.size)
+        for rows in reader:
+            rows.astype(dtype).tofile(f)
+            count += len(rows)
+        f.seek(0)
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, 1, {4: b"f", 8: b"d"}[dtype.itemsize], count,
+                                    *(reader.window or DEFAULT_WINDOW)))
+    return reader.result(read_segment_binary(target).segments)
+
+def _unpack_segment_header(header: bytes):
+    if len(header) < SEGMENT_HEADER.size or not header.startswith(SEGMENT_MAGIC):
+        raise ValueError("неверный заголовок двоичного файла отрезков")
+    _, version, code, n, *window = SEGMENT_HEADER.unpack(header[:SEGMENT_HEADER.size])
+    if version != 1 or code not in SEGMENT_DTYPES:
+        raise ValueError(f"неподдерживаемый двоичный формат (версия {version}, тип {code!r})")
+    return SEGMENT_DTYPES[code], n, tuple(window)
+
+def read_segment_binary(source) -> LoadedSegments:
+    # путь к файлу открывается через memmap, буфер в памяти читается без копирования
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            dtype, n, window = _unpack_segment_header(f.read(SEGMENT_HEADER.size))
+        available = (os.path.getsize(source) - SEGMENT_HEADER.size) // (4 * dtype.itemsize)
+        if available < n:
+            raise ValueError(f"в заголовке {n} отрезков, в файле данных только на {available}")
+        segments = np.memmap(source, dtype=dtype, mode="r", offset=SEGMENT_HEADER.size, shape=(n, 4))
+    else:
+        buffer = source.getbuffer() if hasattr(source, "getbuffer") else memoryview(source)
+        dtype, n, window = _unpack_segment_header(bytes(buffer[:SEGMENT_HEADER.size]))
+        available = (len(buffer) - SEGMENT_HEADER.size) // (4 * dtype.itemsize)
+        if available < n:
+            raise ValueError(f"в заголовке {n} отрезков, в файле данных только на {available}")
+        segments = np.frombuffer(buffer, dtype=dtype, count=4 * n, offset=SEGMENT_HEADER.size).reshape(n, 4)
+    return LoadedSegments(segments, window, n, [], 0, binary=True)
+
+def load_segments(source) -> LoadedSegments:
+    # формат определяется по сигнатуре: двоичный или текстовый
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            if f.read(len(SEGMENT_MAGIC)) == SEGMENT_MAGIC:
+                return read_segment_binary(source)
+            f.seek(0)
+            return parse_segments_text(f)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:len(SEGMENT_MAGIC)])
+    else:
+        head = source.read(len(SEGMENT_MAGIC))
+        source.seek(0)
+    if head == SEGMENT_MAGIC:
+        return read_segment_binary(source)
+    return parse_segments_text(source)
+
+def _plot_segments(segments, grid_size: int) -> Tuple[np.ndarray, int]:
+    # отрезки как (N, 2, 2) для LineCollection; большой набор прореживается равномерным шагом,
+    # отрезки вне видимой области и строки NaN отбрасываются
+    if segments is None or len(segments) == 0:
+        return np.empty((0, 2, 2)), 0
+    if not isinstance(segments, np.ndarray):
+        segments = segments_to_array(segments)
+    total = len(segments)
+    step = -(-total // PLOT_MAX_SEGMENTS)
+    coords = np.asarray(segments[::step], dtype=np.float64).reshape(-1, 4)
+    lo = np.minimum(coords[:, :2], coords[:, 2:])
+    hi = np.maximum(coords[:, :2], coords[:, 2:])
+    shown = np.all((hi >= -grid_size) & (lo <= grid_size), axis=1)
+    return coords[shown].reshape(-1, 2, 2), total
+
+def _add_segment_layer(ax, segments, grid_size: int, color: str, linewidth: float, alpha: float,
+                       markersize: float, marker_alpha: float, label: str) -> list:
+    # все отрезки — одна LineCollection, все концы — один scatter
+    lines, total = _plot_segments(segments, grid_size)
+    if not total:
+        return []
+    if total > PLOT_MAX_SEGMENTS:
+        label = f"{label} (показано {len(lines)} из {total})"
+    collection = LineCollection(lines, colors=color, linewidths=linewidth, alpha=alpha, label=label,
+                                zorder=2, rasterized=len(lines) >= PLOT_RASTERIZE_FROM)
+    artists = [ax.add_collection(collection, autolim=False)]
+    if len(lines) <= PLOT_MAX_MARKERS:
+        artists.append(ax.scatter(lines[..., 0].ravel(), lines[..., 1].ravel(), s=markersize ** 2,
+                                  color=color, alpha=marker_alpha, linewidths=0, zorder=2))
+    return artists
+
+def _add_polygon_layer(ax, polygon: Polygon, linewidth: float, alpha: float, markersize: float,
+                       label: Optional[str] = None, fill: Optional[str] = None) -> list:
+    vertices = np.array([p.to_tuple() for p in polygon.points], dtype=np.float64).reshape(-1, 2)
+    if polygon.closed:
+        vertices = np.vstack((vertices, vertices[:1]))
+    artists = []
+    if fill:
+        artists.extend(ax.fill(vertices[:, 0], vertices[:, 1], fill, alpha=0.5, label=label))
+        label = None
+    # контур и вершины одной линией; замыкающая вершина маркером не повторяется
+    artists.extend(ax.plot(vertices[:, 0], vertices[:, 1], 'g-', marker='o', markersize=markersize,
+                           markevery=slice(0, len(polygon.points)), linewidth=linewidth, alpha=alpha,
+                           label=label, scalex=False, scaley=False))
+    return artists
+
+def _draw_layers(ax, segments, polygon: Optional[Polygon], clip_window, clipped_segments,
+                 clipped_polygon: Optional[Polygon], clipped_rings: Optional[PolygonBatch], grid_size: int) -> list:
+    artists = []
+    
+    if clip_window:
+        xmin, ymin, xmax, ymax = clip_window
+        rect = patches.Rectangle((xmin, ymin), xmax - xmin, ymax - ymin,
+                               linewidth=2, edgecolor='red', facecolor='none', 
+                               alpha=0.7, label='Отсекающее окно')
+        artists.append(ax.add_patch(rect))
+    
+    artists.extend(_add_segment_layer(ax, segments, grid_size, 'b', 2, 0.5, 6, 0.7, 'Исходный отрезок'))
+    
+    if polygon:
+        artists.extend(_add_polygon_layer(ax, polygon, 2, 0.7, 6, label='Исходный многоугольник'))
+    
+    artists.extend(_add_segment_layer(ax, clipped_segments, grid_size, 'g', 3, 1.0, 8, 1.0, 'Отсеченный отрезок'))
+    
+    if clipped_polygon:
+        artists.extend(_add_polygon_layer(ax, clipped_polygon, 3, 1.0, 8,
+                                          label='Отсеченный многоугольник', fill='yellow'))
+    
+    if clipped_rings is not None and len(clipped_rings):
+        artists.append(ax.add_patch(patches.PathPatch(PolygonClipper.to_path(clipped_rings), facecolor='yellow',
+                                                      alpha=0.5, edgecolor='green', linewidth=3,
+                                                      label='Результат операции')))
+    
+    if artists:
+        artists.append(ax.legend(loc='upper right', fontsize=10))
+    return artists
+
+def create_plot(segments, polygon: Optional[Polygon] = None,
                 clip_window: Optional[Tuple[float, float, float, float]] = None,
-                clipped_segments: List[Segment] = None,
+                clipped_segments=None,
                 clipped_polygon: Optional[Polygon] = None,
+                clipped_rings: Optional[PolygonBatch] = None,
                 algorithm_name: str = "",
                 grid_size: int = 20):
     fig, ax = plt.subplots(figsize=(12, 10))
@@ -301,59 +2025,188 @@ def create_plot(segments: List[Segment], polygon: Optional[Polygon] = None,
     ax.set_ylabel('Y координата', fontsize=12)
     ax.set_title(f"Алгоритм отсечения: {algorithm_name}", fontsize=14, pad=20)
     
-    if clip_window:
-        xmin, ymin, xmax, ymax = clip_window
-        rect = patches.Rectangle((xmin, ymin), xmax - xmin, ymax - ymin,
-                               linewidth=2, edgecolor='red', facecolor='none', 
-                               alpha=0.7, label='Отсекающее окно')
-        ax.add_patch(rect)
+    _draw_layers(ax, segments, polygon, clip_window, clipped_segments, clipped_polygon, clipped_rings, grid_size)
     
-    if segments:
-        for i, segment in enumerate(segments):
-            ax.plot([segment.p1.x, segment.p2.x], [segment.p1.y, segment.p2.y],
-                   'b-', linewidth=2, alpha=0.5, label='Исходный отрезок' if i == 0 else None)
-            ax.plot(segment.p1.x, segment.p1.y, 'bo', markersize=6, alpha=0.7)
-            ax.plot(segment.p2.x, segment.p2.y, 'bo', markersize=6, alpha=0.7)
+    ax.set_aspect('equal', adjustable='box')
+    plt.tight_layout()
     
-    if polygon:
-        poly_points = [p.to_tuple() for p in polygon.points]
-        if polygon.closed:
-            poly_points.append(poly_points[0])
+    return fig
+
+class PlotRenderer:
+    # сетка, оси и подписи рисуются один раз на размер сетки; при каждом выводе восстанавливается
+    # готовый фон и поверх рисуются только слои данных
+    def __init__(self, figsize=(12, 10), dpi=100, max_backgrounds=8):
+        self.figsize = figsize
+        self.dpi = dpi
+        self.max_backgrounds = max_backgrounds
+        self._backgrounds = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build_background(self, grid_size):
+        fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
         
-        x_vals = [p[0] for p in poly_points]
-        y_vals = [p[1] for p in poly_points]
+        ax.set_xticks(np.arange(-grid_size, grid_size + 1, 1))
+        ax.set_yticks(np.arange(-grid_size, grid_size + 1, 1))
+        ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
+        ax.set_axisbelow(True)
         
-        ax.plot(x_vals, y_vals, 'g-', linewidth=2, alpha=0.7, label='Исходный многоугольник')
-        for point in polygon.points:
-            ax.plot(point.x, point.y, 'go', markersize=6, alpha=0.7)
-    
-    if clipped_segments:
-        for i, segment in enumerate(clipped_segments):
-            ax.plot([segment.p1.x, segment.p2.x], [segment.p1.y, segment.p2.y],
-                   'g-', linewidth=3, alpha=1.0, label='Отсеченный отрезок' if i == 0 else None)
-            ax.plot(segment.p1.x, segment.p1.y, 'go', markersize=8, alpha=1.0)
-            ax.plot(segment.p2.x, segment.p2.y, 'go', markersize=8, alpha=1.0)
-    
-    if clipped_polygon:
-        poly_points = [p.to_tuple() for p in clipped_polygon.points]
-        if clipped_polygon.closed:
-            poly_points.append(poly_points[0])
+        ax.axhline(y=0, color='black', linewidth=0.5)
+        ax.axvline(x=0, color='black', linewidth=0.5)
+        
+        ax.set_xlim(-grid_size, grid_size)
+        ax.set_ylim(-grid_size, grid_size)
+        
+        ax.set_xlabel('X координата', fontsize=12)
+        ax.set_ylabel('Y координата', fontsize=12)
+        ax.set_aspect('equal', adjustable='box')
         
-        x_vals = [p[0] for p in poly_points]
-        y_vals = [p[1] for p in poly_points]
+        title = ax.set_title("", fontsize=14, pad=20)
+        canvas.draw()
+        background = canvas.copy_from_bbox(fig.bbox)
+        return fig, canvas, ax, title, background
+
+    def _background(self, grid_size):
+        if grid_size in self._backgrounds:
+            self._backgrounds.move_to_end(grid_size)
+        else:
+            self._backgrounds[grid_size] = self._build_background(grid_size)
+            while len(self._backgrounds) > self.max_backgrounds:
+                self._backgrounds.popitem(last=False)
+        return self._backgrounds[grid_size]
+
+    def render(self, segments, polygon: Optional[Polygon] = None,
+               clip_window: Optional[Tuple[float, float, float, float]] = None,
+               clipped_segments=None,
+               clipped_polygon: Optional[Polygon] = None,
+               clipped_rings: Optional[PolygonBatch] = None,
+               algorithm_name: str = "",
+               grid_size: int = 20) -> bytes:
+        with self._lock:
+            fig, canvas, ax, title_artist, background = self._background(grid_size)
+            canvas.restore_region(background)
+            
+            title_artist.set_text(f"Алгоритм отсечения: {algorithm_name}")
+            fig.draw_artist(title_artist)
+            # слои добавляются на оси только на время рисования, фон остаётся нетронутым
+            artists = _draw_layers(ax, segments, polygon, clip_window, clipped_segments,
+                                   clipped_polygon, clipped_rings, grid_size)
+            for artist in artists:
+                ax.draw_artist(artist)
+            for artist in artists:
+                artist.remove()
+            
+            image = np.asarray(canvas.buffer_rgba()).copy()
         
-        ax.fill(x_vals, y_vals, 'yellow', alpha=0.5, label='Отсеченный многоугольник')
-        ax.plot(x_vals, y_vals, 'g-', linewidth=3, alpha=1.0)
-        for point in clipped_polygon.points:
-            ax.plot(point.x, point.y, 'go', markersize=8, alpha=1.0)
+        buffer = io.BytesIO()
+        plt.imsave(buffer, image, format='png')
+        return buffer.getvalue()
+
+@st.cache_resource
+def get_plot_renderer() -> PlotRenderer:
+    return PlotRenderer()
+
+def _segment_lengths(segments: np.ndarray) -> np.ndarray:
+    coords = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    return np.hypot(coords[:, 2] - coords[:, 0], coords[:, 3] - coords[:, 1])
+
+def clip_scene(algorithm: str, operation: str, segment_array: np.ndarray, segment_key,
+               clip_window: Tuple[float, float, float, float], polygon: Optional[Polygon]) -> dict:
+    # одно отсечение выбранным алгоритмом вместе со сводкой; в session_state хранятся только массивы и
+    # многоугольники, поэтому перелистывание таблицы и перерисовка не повторяют отсечение
+    result = {"clipped": None, "visible": None, "polygon": None, "rings": None, "note": None, "stats": {}}
+    clipped_rings = None
+    updated = None
+    # окно отсечения как многоугольник — данные пользователя для отсечения многоугольником
+    window_polygon = PolygonArray(np.array([(clip_window[0], clip_window[1]), (clip_window[2], clip_window[1]),
+                                            (clip_window[2], clip_window[3]), (clip_window[0], clip_window[3])]))
+    start_time = time.perf_counter()
     
-    if segments or polygon or clipped_segments or clipped_polygon:
-        ax.legend(loc='upper right', fontsize=10)
+    if algorithm == "Лианга-Барски (прямоугольное окно)":
+        # при сдвиге окна пересчитываются только отрезки у сдвинутых сторон; массивы принадлежат
+        # объекту отсечения и обновляются на месте — прошлый результат при этом всё равно заменяется
+        clipper = get_incremental_clipper(segment_array, segment_key, clip_window)
+        result["clipped"], result["visible"] = clipper.clip(clip_window)
+        updated = clipper.last_updated
     
-    ax.set_aspect('equal', adjustable='box')
-    plt.tight_layout()
+    elif algorithm == "Сазерленда-Ходгмана (многоугольник в прямоугольное окно)":
+        if polygon:
+            result["polygon"] = ClippingAlgorithms.sutherland_hodgman_polygon(polygon, *clip_window)
     
-    return fig
+    elif algorithm == "Cyrus-Beck (многоугольник в выпуклый многоугольник)":
+        if polygon and polygon.is_convex():
+            result["polygon"] = ClippingAlgorithms.cyrus_beck_polygon(window_polygon.to_polygon(), polygon)
+            # отрезки отсекаются тем же многоугольником: O(log m) на отрезок
+            convex_window = get_convex_window(PolygonArray.from_polygon(polygon).vertices)
+            result["clipped"], result["visible"] = convex_window.clip(segment_array)
+        elif polygon:
+            result["note"] = "Многоугольник невыпуклый: вместо Cyrus-Beck выполнено пересечение Грейнера-Хормана"
+            clipped_rings = PolygonClipper.clip(window_polygon, polygon, "intersection")
+    
+    elif algorithm == "Грейнера-Хормана (произвольные многоугольники)":
+        if polygon:
+            clipped_rings = PolygonClipper.clip(window_polygon, polygon, operation)
+    
+    result["execution_time"] = (time.perf_counter() - start_time) * 1000
+    
+    stats = result["stats"]
+    if result["visible"] is not None:
+        visible = result["visible"]
+        stats["Видимых отрезков"] = f"{int(visible.sum())} из {len(visible)}"
+        stats["Доля видимых"] = f"{visible.mean() if len(visible) else 0:.1%}"
+        stats["Длина исходных"] = f"{_segment_lengths(segment_array).sum():.2f}"
+        stats["Длина видимых частей"] = f"{_segment_lengths(result['clipped'][visible]).sum():.2f}"
+        if updated is not None:
+            stats["Пересчитано отрезков"] = f"{updated} из {len(visible)}"
+    if polygon:
+        stats["Вершин многоугольника"] = len(polygon.points)
+        stats["Площадь многоугольника"] = f"{abs(PolygonArray.from_polygon(polygon).signed_area()):.2f}"
+    if result["polygon"] is not None:
+        clipped_polygon = PolygonArray.from_polygon(result["polygon"])
+        stats["Вершин результата"] = len(clipped_polygon.vertices)
+        stats["Площадь результата"] = f"{abs(clipped_polygon.signed_area()):.2f}"
+    if clipped_rings is not None:
+        # кольца хранятся массивами: PolygonBatch из прошлого запуска скрипта — уже другой класс
+        result["rings"] = (clipped_rings.vertices, clipped_rings.offsets)
+        result["ring_depth"] = PolygonClipper.nesting_depth(clipped_rings)
+        stats["Колец результата"] = len(clipped_rings)
+        stats["Вершин результата"] = len(clipped_rings.vertices)
+        stats["Площадь результата"] = f"{PolygonClipper.area(clipped_rings):.2f}" if len(clipped_rings) else "0.00"
+    return result
+
+def show_clip_stats(stats: dict, per_row: int = 4):
+    items = list(stats.items())
+    for row in range(0, len(items), per_row):
+        for col, (label, value) in zip(st.columns(per_row), items[row:row + per_row]):
+            col.metric(label, value)
+
+def show_paged_table(total: int, rows, key: str, page_size: int = DETAILS_PAGE_SIZE):
+    # строки собираются только для текущей страницы: rows(lo, hi) возвращает столбцы среза
+    pages = max(-(-total // page_size), 1)
+    page = st.number_input(f"Страница (всего {pages})", 1, pages, 1, key=key) if pages > 1 else 1
+    lo = (page - 1) * page_size
+    st.dataframe(rows(lo, min(lo + page_size, total)), use_container_width=True, hide_index=True)
+
+def _segment_rows(segment_array: np.ndarray, clipped: np.ndarray, visible: np.ndarray):
+    def rows(lo: int, hi: int) -> dict:
+        source = np.asarray(segment_array[lo:hi], dtype=np.float64)
+        part = clipped[lo:hi]
+        columns = {"№": np.arange(lo + 1, hi + 1)}
+        for j, name in enumerate(("X1", "Y1", "X2", "Y2")):
+            columns[name] = np.round(source[:, j], 3)
+        columns["Видим"] = visible[lo:hi]
+        for j, name in enumerate(("X1'", "Y1'", "X2'", "Y2'")):
+            columns[name] = np.round(part[:, j], 3)
+        columns["Длина видимой части"] = np.round(np.where(visible[lo:hi], _segment_lengths(part), 0.0), 3)
+        return columns
+    return rows
+
+def _vertex_rows(vertices: np.ndarray):
+    def rows(lo: int, hi: int) -> dict:
+        return {"№": np.arange(lo + 1, hi + 1), "X": np.round(vertices[lo:hi, 0], 3),
+                "Y": np.round(vertices[lo:hi, 1], 3)}
+    return rows
 
 def main():
     st.title("✂️ Лабораторная работа 5: Алгоритмы отсечения")
@@ -373,28 +2226,63 @@ X1_2 Y1_2 X2_2 Y2_2
 X1_n Y1_n X2_n Y2_n
 Xmin Ymin Xmax Ymax
             """)
+            st.markdown("Двоичный формат (.bin): 48-байтный заголовок `SEGBIN`, версия, тип чисел "
+                        "(`f` — float32, `d` — float64), n, окно отсечения; далее n×4 чисел подряд. "
+                        "Такой файл открывается через memmap без разбора текста.")
         
-        uploaded_file = st.file_uploader("Загрузите файл с данными", type=['txt', 'dat'])
+        uploaded_file = st.file_uploader("Загрузите файл с данными", type=['txt', 'dat', 'bin'])
         
         if uploaded_file is not None:
-            content = uploaded_file.read().decode('utf-8')
-            result = parse_input_file(content)
+            # разбор не повторяется при каждом перезапуске скрипта, пока файл тот же
+            file_key = (uploaded_file.name, uploaded_file.size, getattr(uploaded_file, "file_id", None))
+            cached = st.session_state.get('loaded_file')
+            if cached is None or cached[0] != file_key:
+                start_time = time.perf_counter()
+                try:
+                    loaded = load_segments(uploaded_file)
+                except ValueError as e:
+                    loaded = e
+                cached = (file_key, loaded, (time.perf_counter() - start_time) * 1000)
+                st.session_state.loaded_file = cached
+            _, loaded, load_ms = cached
             
-            if result:
-                segments, clip_window = result
-                st.success(f"✅ Загружено {len(segments)} отрезков")
+            if isinstance(loaded, ValueError):
+                st.error(f"Ошибка при чтении файла: {loaded}")
+            else:
+                segment_array = loaded.segments
+                clip_window = loaded.window
+                st.success(f"✅ Загружено {len(segment_array)} отрезков за {load_ms:.0f} мс"
+                           f"{' (двоичный формат)' if loaded.binary else ''}")
+                if loaded.error_count:
+                    st.warning(f"⚠️ Пропущено строк с ошибками: {loaded.error_count}")
+                    st.dataframe([{"Строка": line_no, "Ошибка": message} for line_no, message in loaded.errors],
+                                 use_container_width=True)
+                if not loaded.window_found:
+                    st.info(f"Отсекающее окно не задано, используется {clip_window}")
                 
-                st.session_state.segments = segments
+                st.session_state.segment_array = segment_array
+                # ключ набора для кэшей результатов: сам массив может быть очень большим и не хэшируется
+                st.session_state.segment_key = ("file",) + file_key
+                st.session_state.segments = array_to_segments(segment_array[:MAX_SEGMENT_OBJECTS])
                 st.session_state.clip_window = clip_window
                 st.session_state.data_source = 'file'
+                if len(segment_array) > MAX_SEGMENT_OBJECTS:
+                    st.info(f"Для просмотра и подробного вывода используются первые {MAX_SEGMENT_OBJECTS} отрезков, "
+                            f"отсечение Лианга-Барски выполняется по всему набору")
+                
+                if not loaded.binary and st.checkbox("Преобразовать в двоичный формат"):
+                    st.download_button("Скачать в двоичном формате (float32)",
+                                       data=write_segment_binary(segment_array, clip_window),
+                                       file_name=f"{os.path.splitext(uploaded_file.name)[0]}.bin",
+                                       mime="application/octet-stream")
                 
                 with st.expander("Просмотр данных"):
                     st.write(f"Отсекающее окно: {clip_window}")
                     st.write("Отрезки:")
-                    for i, seg in enumerate(segments):
+                    for i, seg in enumerate(st.session_state.segments[:100]):
                         st.write(f"{i+1}: ({seg.p1.x:.1f}, {seg.p1.y:.1f}) → ({seg.p2.x:.1f}, {seg.p2.y:.1f})")
-            else:
-                st.error("Ошибка при чтении файла. Проверьте формат.")
+                    if len(segment_array) > 100:
+                        st.write(f"... и ещё {len(segment_array) - 100}")
     
     with tab2:
         st.header("Ручной ввод данных")
@@ -425,11 +2313,10 @@ Xmin Ymin Xmax Ymax
             
             if preset_segments == "Случайные":
                 num_segments = st.slider("Количество отрезков", 1, 10, 3)
-                for i in range(num_segments):
-                    x1 = np.random.randint(-15, 15)
-                    y1 = np.random.randint(-15, 15)
-                    x2 = np.random.randint(-15, 15)
-                    y2 = np.random.randint(-15, 15)
+                # отрезки зависят только от зерна: при движении окна они остаются теми же
+                seed = st.number_input("Зерно генератора", 0, 1_000_000, 0)
+                rng = np.random.default_rng(seed)
+                for x1, y1, x2, y2 in rng.integers(-15, 15, (num_segments, 4)).tolist():
                     segments.append(Segment(Point(x1, y1), Point(x2, y2)))
             
             elif preset_segments == "Горизонтальные":
@@ -470,7 +2357,7 @@ Xmin Ymin Xmax Ymax
                     segments.append(Segment(Point(x1, y1), Point(x2, y2)))
             
             st.subheader("Создание многоугольника для отсечения")
-            create_polygon = st.checkbox("Создать многоугольник для отсечения (алгоритм Cyrus-Beck)")
+            create_polygon = st.checkbox("Создать многоугольник для отсечения (Cyrus-Beck, Грейнер-Хорман)")
             
             polygon = None
             if create_polygon:
@@ -512,10 +2399,14 @@ Xmin Ymin Xmax Ymax
                 if polygon and polygon.is_convex():
                     st.success("Многоугольник выпуклый ✓")
                 elif polygon:
-                    st.warning("Многоугольник невыпуклый. Алгоритм Cyrus-Beck требует выпуклый многоугольник.")
+                    st.warning("Многоугольник невыпуклый. Алгоритм Cyrus-Beck требует выпуклый многоугольник, "
+                               "для него будет выполнено отсечение Грейнера-Хормана.")
         
         if segments:
             st.session_state.segments = segments
+            st.session_state.segment_array = segments_to_array(segments)
+            # вручную задаётся не больше десятка отрезков, их координаты и есть ключ набора
+            st.session_state.segment_key = ("manual",) + tuple(st.session_state.segment_array.ravel().tolist())
             st.session_state.clip_window = clip_window
             st.session_state.polygon = polygon if create_polygon else None
             st.session_state.data_source = 'manual'
@@ -535,183 +2426,216 @@ Xmin Ymin Xmax Ymax
             "Выберите алгоритм отсечения:",
             ["Лианга-Барски (прямоугольное окно)", 
              "Сазерленда-Ходгмана (многоугольник в прямоугольное окно)",
-             "Cyrus-Beck (многоугольник в выпуклый многоугольник)"]
+             "Cyrus-Beck (многоугольник в выпуклый многоугольник)",
+             "Грейнера-Хормана (произвольные многоугольники)"]
         )
         
+        operation = "intersection"
+        if algorithm == "Грейнера-Хормана (произвольные многоугольники)":
+            operation = POLYGON_OPERATIONS[st.radio("Операция", list(POLYGON_OPERATIONS), horizontal=True)]
+        
         col1, col2 = st.columns(2)
         with col1:
             grid_size = st.slider("Размер сетки", 10, 30, 20)
         with col2:
             show_details = st.checkbox("Показать детали вычислений", value=True)
+            fast_render = st.checkbox("Быстрая отрисовка (кэш фона сетки)", value=True)
+        
+        if 'segment_array' in st.session_state:
+            segment_array = st.session_state.segment_array
+            segment_key = st.session_state.segment_key
+        else:
+            segment_array = segments_to_array(segments)
+            segment_key = ("manual",) + tuple(segment_array.ravel().tolist())
+        # результат привязан к данным, окну и алгоритму; сетка, отрисовка и страница таблицы его не меняют
+        scene_key = (algorithm, operation, tuple(clip_window), segment_key,
+                     tuple(p.to_tuple() for p in polygon.points) if polygon else None)
         
         if st.button("Выполнить отсечение", type="primary"):
             with st.spinner("Выполняется отсечение..."):
-                start_time = time.perf_counter()
-                
-                clipped_segments = []
-                clipped_polygon = None
-                
+                st.session_state.clip_result = (scene_key, clip_scene(algorithm, operation, segment_array,
+                                                                      segment_key, clip_window, polygon))
+                st.session_state.pop('details_page', None)
+        
+        cached = st.session_state.get('clip_result')
+        # если с прошлого отсечения сдвинулось только окно, результат обновляется сразу, без кнопки
+        if cached is not None and cached[0] != scene_key and cached[0][:2] == scene_key[:2] \
+                and cached[0][3:] == scene_key[3:]:
+            cached = (scene_key, clip_scene(algorithm, operation, segment_array, segment_key, clip_window, polygon))
+            st.session_state.clip_result = cached
+        if cached is not None and cached[0] == scene_key:
+            result = cached[1]
+            if result["note"]:
+                st.info(result["note"])
+            clipped_array = result["clipped"][result["visible"]] if result["visible"] is not None else None
+            clipped_rings = PolygonBatch(*result["rings"]) if result["rings"] is not None else None
+            
+            # рисуется весь набор отрезков, а не только первые MAX_SEGMENT_OBJECTS
+            layers = dict(
+                segments=segment_array,
+                polygon=polygon,
+                clip_window=clip_window if algorithm != "Cyrus-Beck" else None,
+                clipped_segments=clipped_array,
+                clipped_polygon=result["polygon"],
+                clipped_rings=clipped_rings,
+                algorithm_name=algorithm,
+                grid_size=grid_size
+            )
+            
+            if fast_render:
+                st.image(get_plot_renderer().render(**layers), use_container_width=True)
+            else:
+                st.pyplot(create_plot(**layers))
+            
+            if show_details:
+                with st.expander("📊 Детали вычислений", expanded=True):
+                    st.write(f"**Время выполнения:** {result['execution_time']:.4f} мс")
+                    if algorithm in ("Лианга-Барски (прямоугольное окно)",
+                                     "Сазерленда-Ходгмана (многоугольник в прямоугольное окно)"):
+                        st.write(f"**Отсекающее окно:** ({clip_window[0]}, {clip_window[1]}) - "
+                                 f"({clip_window[2]}, {clip_window[3]})")
+                    elif algorithm == "Грейнера-Хормана (произвольные многоугольники)" and polygon:
+                        st.write(f"**Операция:** окно {OPERATION_SIGNS[operation]} многоугольник "
+                                 f"({'выпуклый' if polygon.is_convex() else 'невыпуклый'})")
+                    elif algorithm != "Лианга-Барски (прямоугольное окно)" and polygon:
+                        st.write("Выпуклый: ✓" if polygon.is_convex() else "Выпуклый: ✗")
+                    
+                    if result["stats"]:
+                        show_clip_stats(result["stats"])
+                    elif not polygon:
+                        st.write("Создайте многоугольник во вкладке 'Ручной ввод'")
+                    
+                    if result["visible"] is not None:
+                        st.write("**Отрезки:**")
+                        show_paged_table(len(result["visible"]),
+                                         _segment_rows(segment_array, result["clipped"], result["visible"]),
+                                         key="details_page")
+                    elif result["polygon"] is not None:
+                        st.write("**Вершины отсеченного многоугольника:**")
+                        vertices = PolygonArray.from_polygon(result["polygon"]).vertices
+                        show_paged_table(len(vertices), _vertex_rows(vertices), key="details_page")
+                    elif clipped_rings is not None and len(clipped_rings):
+                        st.write("**Кольца результата:**")
+                        st.dataframe({"Кольцо": np.arange(1, len(clipped_rings) + 1),
+                                      "Вершин": clipped_rings.counts,
+                                      "Вид": np.where(result["ring_depth"] % 2 == 0, "внешнее", "дыра"),
+                                      "Площадь": [round(abs(clipped_rings[i].signed_area()), 3)
+                                                  for i in range(len(clipped_rings))]},
+                                     use_container_width=True, hide_index=True)
+                    elif polygon:
+                        st.write("Результат пуст")
+            
+            with st.expander("📚 Теоретическая справка"):
                 if algorithm == "Лианга-Барски (прямоугольное окно)":
-                    xmin, ymin, xmax, ymax = clip_window
-                    for segment in segments:
-                        result = ClippingAlgorithms.liang_barsky(
-                            segment.p1.x, segment.p1.y, segment.p2.x, segment.p2.y,
-                            xmin, ymin, xmax, ymax
-                        )
-                        if result:
-                            p1, p2 = result
-                            clipped_segments.append(Segment(p1, p2))
+                    st.markdown("""
+                    ### Алгоритм Лианга-Барски
+                    
+                    **Принцип работы:**
+                    1. Отрезок задается параметрически:  
+                       `x = x1 + u * (x2 - x1)`  
+                       `y = y1 + u * (y2 - y1)`, где `u ∈ [0, 1]`
+                    2. Для каждой границы окна вычисляется параметр u
+                    3. Определяется интервал [u1, u2] видимой части отрезка
+                    
+                    **Формулы для границ:**
+                    - Левая: `u = (xmin - x1) / (x2 - x1)`
+                    - Правая: `u = (xmax - x1) / (x2 - x1)`
+                    - Нижняя: `u = (ymin - y1) / (y2 - y1)`
+                    - Верхняя: `u = (ymax - y1) / (y2 - y1)`
+                    
+                    **Преимущества:**
+                    - Эффективен для прямоугольных окон
+                    - Работает с параметрическим представлением
+                    - Хорошая производительность
+                    """)
                 
                 elif algorithm == "Сазерленда-Ходгмана (многоугольник в прямоугольное окно)":
-                    if polygon:
-                        xmin, ymin, xmax, ymax = clip_window
-                        clipped_polygon = ClippingAlgorithms.sutherland_hodgman_polygon(
-                            polygon, xmin, ymin, xmax, ymax
-                        )
+                    st.markdown("""
+                    ### Алгоритм Сазерленда-Ходгмана
+                    
+                    **Принцип работы:**
+                    1. Многоугольник отсекается последовательно по каждой границе
+                    2. Для каждого ребра проверяется его положение относительно границы
+                    3. Генерируется новый многоугольник после каждой границы
+                    
+                    **Правила для каждой пары вершин:**
+                    - Обе внутри → добавляем вторую вершину
+                    - Внутри → снаружи → добавляем точку пересечения
+                    - Снаружи → внутри → добавляем точку пересечения и вторую вершину
+                    - Обе снаружи → ничего не добавляем
+                    
+                    **Преимущества:**
+                    - Простота реализации
+                    - Работает с произвольными многоугольниками
+                    - Легко расширяется на выпуклые окна
+                    """)
                 
                 elif algorithm == "Cyrus-Beck (многоугольник в выпуклый многоугольник)":
-                    if polygon and st.session_state.get('polygon'):
-                        test_polygon = Polygon([
-                            Point(-8, -6),
-                            Point(-8, 6),
-                            Point(8, 6),
-                            Point(8, -6)
-                        ])
-                        clipped_polygon = ClippingAlgorithms.cyrus_beck_polygon(
-                            test_polygon, polygon
-                        )
-                
-                end_time = time.perf_counter()
-                execution_time = (end_time - start_time) * 1000
-                
-                fig = create_plot(
-                    segments=segments,
-                    polygon=polygon,
-                    clip_window=clip_window if algorithm != "Cyrus-Beck" else None,
-                    clipped_segments=clipped_segments if clipped_segments else None,
-                    clipped_polygon=clipped_polygon,
-                    algorithm_name=algorithm,
-                    grid_size=grid_size
-                )
-                
-                st.pyplot(fig)
-                
-                if show_details:
-                    with st.expander("📊 Детали вычислений", expanded=True):
-                        st.write(f"**Время выполнения:** {execution_time:.4f} мс")
-                        
-                        if algorithm == "Лианга-Барски (прямоугольное окно)":
-                            st.write(f"**Отсекающее окно:** ({xmin}, {ymin}) - ({xmax}, {ymax})")
-                            st.write(f"**Количество видимых отрезков:** {len(clipped_segments)} из {len(segments)}")
-                            
-                            for i, segment in enumerate(segments):
-                                st.write(f"**Отрезок {i+1}:** ({segment.p1.x:.1f}, {segment.p1.y:.1f}) → ({segment.p2.x:.1f}, {segment.p2.y:.1f})")
-                                result = ClippingAlgorithms.liang_barsky(
-                                    segment.p1.x, segment.p1.y, segment.p2.x, segment.p2.y,
-                                    xmin, ymin, xmax, ymax
-                                )
-                                if result:
-                                    p1, p2 = result
-                                    st.write(f"  Отсечен: ({p1.x:.1f}, {p1.y:.1f}) → ({p2.x:.1f}, {p2.y:.1f})")
-                                else:
-                                    st.write(f"  Полностью невидим")
-                        
-                        elif algorithm == "Сазерленда-Ходгмана (многоугольник в прямоугольное окно)":
-                            if polygon:
-                                st.write(f"**Исходный многоугольник:** {len(polygon.points)} вершин")
-                                if clipped_polygon:
-                                    st.write(f"**Отсеченный многоугольник:** {len(clipped_polygon.points)} вершин")
-                                    st.write("Вершины отсеченного многоугольника:")
-                                    for j, point in enumerate(clipped_polygon.points):
-                                        st.write(f"  {j+1}: ({point.x:.2f}, {point.y:.2f})")
-                                else:
-                                    st.write("Многоугольник полностью невидим")
-                        
-                        elif algorithm == "Cyrus-Beck (многоугольник в выпуклый многоугольник)":
-                            if polygon:
-                                st.write(f"**Отсекающий многоугольник:** {len(polygon.points)} вершин")
-                                st.write("Выпуклый: ✓" if polygon.is_convex() else "Выпуклый: ✗")
-                                if clipped_polygon:
-                                    st.write(f"**Отсеченный многоугольник:** {len(clipped_polygon.points)} вершин")
-                                else:
-                                    st.write("Многоугольник полностью невидим")
+                    st.markdown("""
+                    ### Алгоритм Cyrus-Beck
+                    
+                    **Принцип работы:**
+                    1. Использует нормали к ребрам отсекающего многоугольника
+                    2. Для каждой вершины вычисляется скалярное произведение с нормалью
+                    3. Определяются точки пересечения
+                    4. Строится новый отсеченный многоугольник
+                    
+                    **Требования:**
+                    - Отсекающий многоугольник должен быть выпуклым
+                    - Вершины упорядочены против часовой стрелки
+                    
+                    **Отсечение отрезков за O(log m):**
+                    - Рёбра окна упорядочены по углу, нормали вычисляются один раз
+                    - Крайние вершины окна поперёк отрезка находятся бинарным поиском по углам рёбер
+                    - Между ними граница монотонна: рёбра входа и выхода тоже ищутся бинарным поиском
+                    
+                    **Преимущества:**
+                    - Работает с произвольными выпуклыми окнами
+                    - Более общий алгоритм
+                    - Хорошая производительность
+                    """)
                 
-                with st.expander("📚 Теоретическая справка"):
-                    if algorithm == "Лианга-Барски (прямоугольное окно)":
-                        st.markdown("""
-                        ### Алгоритм Лианга-Барски
-                        
-                        **Принцип работы:**
-                        1. Отрезок задается параметрически:  
-                           `x = x1 + u * (x2 - x1)`  
-                           `y = y1 + u * (y2 - y1)`, где `u ∈ [0, 1]`
-                        2. Для каждой границы окна вычисляется параметр u
-                        3. Определяется интервал [u1, u2] видимой части отрезка
-                        
-                        **Формулы для границ:**
-                        - Левая: `u = (xmin - x1) / (x2 - x1)`
-                        - Правая: `u = (xmax - x1) / (x2 - x1)`
-                        - Нижняя: `u = (ymin - y1) / (y2 - y1)`
-                        - Верхняя: `u = (ymax - y1) / (y2 - y1)`
-                        
-                        **Преимущества:**
-                        - Эффективен для прямоугольных окон
-                        - Работает с параметрическим представлением
-                        - Хорошая производительность
-                        """)
+                elif algorithm == "Грейнера-Хормана (произвольные многоугольники)":
+                    st.markdown("""
+                    ### Алгоритм Грейнера-Хормана
                     
-                    elif algorithm == "Сазерленда-Ходгмана (многоугольник в прямоугольное окно)":
-                        st.markdown("""
-                        ### Алгоритм Сазерленда-Ходгмана
-                        
-                        **Принцип работы:**
-                        1. Многоугольник отсекается последовательно по каждой границе
-                        2. Для каждого ребра проверяется его положение относительно границы
-                        3. Генерируется новый многоугольник после каждой границы
-                        
-                        **Правила для каждой пары вершин:**
-                        - Обе внутри → добавляем вторую вершину
-                        - Внутри → снаружи → добавляем точку пересечения
-                        - Снаружи → внутри → добавляем точку пересечения и вторую вершину
-                        - Обе снаружи → ничего не добавляем
-                        
-                        **Преимущества:**
-                        - Простота реализации
-                        - Работает с произвольными многоугольниками
-                        - Легко расширяется на выпуклые окна
-                        """)
+                    **Принцип работы:**
+                    1. Находятся все точки пересечения рёбер двух многоугольников
+                       (сортировка и заметание вдоль оси вместо проверки всех пар)
+                    2. Точки пересечения вставляются в списки вершин обоих многоугольников
+                    3. Каждая точка помечается как вход или выход из другого многоугольника
+                    4. Обход: по входу — вперёд, по выходу — назад, на каждой точке
+                       пересечения переход на другой многоугольник
                     
-                    elif algorithm == "Cyrus-Beck (многоугольник в выпуклый многоугольник)":
-                        st.markdown("""
-                        ### Алгоритм Cyrus-Beck
-                        
-                        **Принцип работы:**
-                        1. Использует нормали к ребрам отсекающего многоугольника
-                        2. Для каждой вершины вычисляется скалярное произведение с нормалью
-                        3. Определяются точки пересечения
-                        4. Строится новый отсеченный многоугольник
-                        
-                        **Требования:**
-                        - Отсекающий многоугольник должен быть выпуклым
-                        - Вершины упорядочены против часовой стрелки
-                        
-                        **Преимущества:**
-                        - Работает с произвольными выпуклыми окнами
-                        - Более общий алгоритм
-                        - Хорошая производительность
-                        """)
-        
+                    **Операции:**
+                    - Пересечение — обход внутренних частей границ
+                    - Объединение — обход внешних частей
+                    - Разность — части первого вне второго и части второго внутри первого
+                    
+                    **Особенности:**
+                    - Многоугольники могут быть невыпуклыми и с дырами (правило чёт-нечет)
+                    - Вершины на рёбрах и совпадающие рёбра устраняются малым возмущением
+                    """)
+    
         else:
             st.info("Нажмите 'Выполнить отсечение' для визуализации")
             
-            fig = create_plot(
-                segments=segments,
+            layers = dict(
+                segments=segment_array,
                 polygon=st.session_state.get('polygon', None),
                 clip_window=clip_window,
                 algorithm_name="Предварительный просмотр",
                 grid_size=grid_size
             )
-            st.pyplot(fig)
+            if fast_render:
+                st.image(get_plot_renderer().render(**layers), use_container_width=True)
+            else:
+                st.pyplot(create_plot(**layers))
+        
+        show_index_demo()
+        show_polygon_batch_demo()
+        show_polygon_clipping_benchmark()
+        show_clipping_benchmark()
     
     with st.sidebar:
         st.header("Примеры файлов")
@@ -784,7 +2708,201 @@ Xmin Ymin Xmax Ymax
         - Сравнение алгоритмов
         """)
 
+# пакетная обработка файлов без Streamlit: python lab5.py входной_файл -o выходной_файл [--window ...]
+CLI_TEXT_FORMAT = "%.17g"
+CLI_HEADER_WIDTH = 20
+
+def read_segment_window(path) -> Tuple[Tuple[float, float, float, float], bool]:
+    # в текстовом файле окно записано после всех отрезков: строки пересчитываются без разбора чисел
+    with open(path, "rb") as f:
+        if f.read(len(SEGMENT_MAGIC)) == SEGMENT_MAGIC:
+            f.seek(0)
+            return _unpack_segment_header(f.read(SEGMENT_HEADER.size))[2], True
+        f.seek(0)
+        reader = SegmentTextReader(f)
+        for _ in reader.raw_chunks():
+            pass
+    return reader.window or DEFAULT_WINDOW, reader.window_found
+
+def _clip_file_chunk(task):
+    # выполняется в процессе пула: разбор куска, отсечение каждым окном и готовые байты для записи
+    data, count, first_line, windows, dtype = task
+    errors, error_count = [], 0
+    if isinstance(data, bytes):
+        reader = SegmentTextReader(None)
+        rows = reader._parse_rows(data, count, first_line)
+        errors, error_count = reader.errors, reader.error_count
+    else:
+        rows = np.asarray(data, dtype=np.float64)
+    outputs = []
+    for window in windows:
+        clipped, visible = ClippingAlgorithms.liang_barsky_batch(rows, *window, workers=1)
+        kept = clipped[visible]
+        if dtype is None:
+            buffer = io.BytesIO()
+            np.savetxt(buffer, kept, fmt=CLI_TEXT_FORMAT)
+            outputs.append((len(kept), buffer.getvalue()))
+        else:
+            outputs.append((len(kept), kept.astype(dtype).tobytes()))
+    return len(rows), outputs, errors, error_count
+
+def _ordered_results(pool, tasks, depth: int):
+    # в работе не больше depth кусков, результаты выдаются в порядке кусков во входном файле
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(_clip_file_chunk, task))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def _output_paths(target: str, count: int) -> List[str]:
+    if count == 1:
+        return [target]
+    stem, ext = os.path.splitext(target)
+    return [f"{stem}_{k + 1}{ext}" for k in range(count)]
+
+def _peak_memory_mb(who) -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss в килобайтах в Linux и в байтах в macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 2 ** 20
+
+def clip_segments_file(source, target: str, windows: Optional[List[Tuple[float, float, float, float]]] = None,
+                       binary: bool = False, dtype=np.float32, workers: Optional[int] = None,
+                       chunk_bytes: int = PARSE_CHUNK, progress=None) -> dict:
+    # входной файл (текст или SEGBIN) читается кусками, куски отсекаются в пуле процессов, результат
+    # пишется в том же порядке, что и при однопроцессной обработке: один выходной файл на окно
+    start_time = time.perf_counter()
+    if not windows:
+        window, found = read_segment_window(source)
+        if not found:
+            print(f"Окно отсечения в файле не задано, используется {window}", file=sys.stderr)
+        windows = [window]
+    windows = [tuple(float(v) for v in w) for w in windows]
+    out_dtype = np.dtype(dtype).newbyteorder("<") if binary else None
+    code = {4: b"f", 8: b"d"}[out_dtype.itemsize] if binary else None
+    paths = _output_paths(target, len(windows))
+    workers = workers or os.cpu_count() or 1
+    
+    with open(source, "rb") as f:
+        is_binary = f.read(len(SEGMENT_MAGIC)) == SEGMENT_MAGIC
+    reader = None
+    if is_binary:
+        segments = read_segment_binary(source).segments
+        rows_per_chunk = max(chunk_bytes // (4 * segments.dtype.itemsize), 1)
+        tasks = ((np.asarray(segments[first:first + rows_per_chunk]), 0, 0, windows, out_dtype)
+                 for first in range(0, len(segments), rows_per_chunk))
+        total_bytes = os.path.getsize(source)
+    else:
+        f = open(source, "rb")
+        reader = SegmentTextReader(f, chunk_bytes)
+        tasks = ((chunk, count, first_line, windows, out_dtype) for chunk, count, first_line in reader.raw_chunks())
+        total_bytes = os.path.getsize(source)
+    
+    outputs = [open(path, "wb") for path in paths]
+    counts = [0] * len(windows)
+    processed = 0
+    try:
+        # место под заголовок резервируется сразу и заполняется в конце, когда известно число отрезков
+        for out in outputs:
+            out.write(b"\0" * SEGMENT_HEADER.size if binary else b" " * CLI_HEADER_WIDTH + b"\n")
+        
+        if workers == 1:
+            results = map(_clip_file_chunk, tasks)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = _ordered_results(pool, tasks, 2 * workers)
+        try:
+            for n, chunk_outputs, errors, error_count in results:
+                processed += n
+                for k, (count, payload) in enumerate(chunk_outputs):
+                    outputs[k].write(payload)
+                    counts[k] += count
+                if reader is not None:
+                    for line_no, message in errors:
+                        reader._report(line_no, message)
+                    reader.error_count += error_count - len(errors)
+                if progress is not None:
+                    progress(processed)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        
+        for out, window, count in zip(outputs, windows, counts):
+            if binary:
+                out.seek(0)
+                out.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, 1, code, count, *window))
+            else:
+                out.write((" ".join(CLI_TEXT_FORMAT % v for v in window) + "\n").encode())
+                out.seek(0)
+                out.write(str(count).ljust(CLI_HEADER_WIDTH).encode())
+    finally:
+        for out in outputs:
+            out.close()
+        if reader is not None:
+            f.close()
+    
+    elapsed = time.perf_counter() - start_time
+    return {
+        "segments": processed,
+        "visible": dict(zip(paths, counts)),
+        "errors": reader.errors if reader is not None else [],
+        "error_count": reader.error_count if reader is not None else 0,
+        "seconds": elapsed,
+        "segments_per_second": processed / elapsed if elapsed > 0 else None,
+        "mb_per_second": total_bytes / 2 ** 20 / elapsed if elapsed > 0 else None,
+        "peak_mb": _peak_memory_mb(resource.RUSAGE_SELF) if resource is not None else None,
+        "peak_worker_mb": _peak_memory_mb(resource.RUSAGE_CHILDREN) if resource is not None else None,
+        "workers": workers,
+    }
+
+def run_cli(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="lab5.py", description="Отсечение отрезков из большого файла прямоугольными окнами (Лианг-Барски)")
+    parser.add_argument("input", help="входной файл: текстовый формат лабораторной или двоичный SEGBIN")
+    parser.add_argument("-o", "--output", required=True,
+                        help="выходной файл; для нескольких окон к имени добавляется номер окна")
+    parser.add_argument("-w", "--window", nargs=4, type=float, action="append",
+                        metavar=("XMIN", "YMIN", "XMAX", "YMAX"),
+                        help="окно отсечения, можно указать несколько раз; по умолчанию — окно из файла")
+    parser.add_argument("--format", choices=["text", "binary"],
+                        help="формат вывода; по умолчанию binary для .bin, иначе text")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32",
+                        help="тип чисел двоичного вывода")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="число процессов (по умолчанию — все ядра)")
+    parser.add_argument("--chunk-mb", type=float, default=PARSE_CHUNK / 2 ** 20, help="размер куска входного файла, МБ")
+    args = parser.parse_args(argv)
+    
+    binary = args.format == "binary" if args.format else args.output.lower().endswith(".bin")
+    try:
+        report = clip_segments_file(args.input, args.output, args.window, binary=binary,
+                                    dtype=np.dtype(args.dtype), workers=args.workers,
+                                    chunk_bytes=max(int(args.chunk_mb * 2 ** 20), 1))
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    
+    for line_no, message in report["errors"]:
+        print(f"строка {line_no}: {message}", file=sys.stderr)
+    if report["error_count"] > len(report["errors"]):
+        print(f"... и ещё {report['error_count'] - len(report['errors'])} строк с ошибками", file=sys.stderr)
+    for path, count in report["visible"].items():
+        print(f"{path}: видимых отрезков {count} из {report['segments']}")
+    print(f"Время: {report['seconds']:.2f} с, {report['segments_per_second']:,.0f} отрезков/с, "
+          f"{report['mb_per_second']:.1f} МБ/с, процессов: {report['workers']}")
+    if report["peak_mb"] is not None:
+        workers_memory = f", {report['peak_worker_mb']:.0f} МБ рабочий процесс" if report["workers"] > 1 else ""
+        print(f"Пиковая память: {report['peak_mb']:.0f} МБ основной процесс{workers_memory}")
+    return 0
+
 if __name__ == "__main__":
+    # без Streamlit (python lab5.py ...) — пакетная обработка файла из командной строки
+    if not st.runtime.exists():
+        sys.exit(run_cli(sys.argv[1:]))
+    
     if 'segments' not in st.session_state:
         st.session_state.segments = []
     if 'clip_window' not in st.session_state: